@@ -0,0 +1,86 @@
+"""
+Throughput and peak memory of the dataset build pipeline as the dataset grows.
+
+For each size, writes a raw dataset directory (a JSON array, a CSV and a
+JSONL file sharing the examples) and runs build_dataset on it in a fresh
+process, reporting wall time, examples/s and that process's peak RSS. With
+the streaming pipeline the peak RSS should stay flat as the size grows; with
+--workers, conversion output is spooled to disk, so that holds there too.
+It then times a rebuild with no changes (served by the build cache without
+converting or writing anything) and one after appending to one file.
+
+    python -m benchmarks.bench_build_dataset
+    python -m benchmarks.bench_build_dataset --sizes 10000 100000 1000000
+    python -m benchmarks.bench_build_dataset --workers 4
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+def write_raw(path: Path, n: int, words: int):
+    path.mkdir(parents=True)
+    text = " ".join(["lorem"] * words)
+    third = n // 3
+    with (path / "a.json").open("w") as f:
+        f.write("[\n")
+        for i in range(third):
+            f.write(("," if i else "") + json.dumps({"messages": [{"role": "user", "content": f"{i} {text}"}, {"role": "assistant", "content": text}]}) + "\n")
+        f.write("]\n")
+    with (path / "b.csv").open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user", "assistant"])
+        for i in range(third):
+            writer.writerow([f"{i} {text}", text])
+    with (path / "c.jsonl").open("w") as f:
+        for i in range(n - 2 * third):
+            f.write(json.dumps({"messages": [{"role": "user", "content": f"{i} {text}"}, {"role": "assistant", "content": text}]}) + "\n")
+
+def build(dataset_dir: Path, output_dir: Path, workers: int, results):
+    from src.lora.orchestrator import build_dataset
+
+    start = time.perf_counter()
+    build_dataset(dataset_dir, output_dir=output_dir, workers=workers)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    # Nothing changed, so this only stats the raw files.
+    start = time.perf_counter()
+    build_dataset(dataset_dir, output_dir=output_dir, workers=workers)
+    rebuild = time.perf_counter() - start
+
+    # One changed file: everything else comes from the build cache.
+    with (dataset_dir / "c.jsonl").open("a") as f:
+        f.write(json.dumps({"messages": [{"role": "user", "content": "one more"}]}) + "\n")
+    start = time.perf_counter()
+    build_dataset(dataset_dir, output_dir=output_dir, workers=workers)
+    results.put((elapsed, peak, rebuild, time.perf_counter() - start))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming dataset build.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--words", type=int, default=50, help="Words per message.")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'examples':>10} {'input MB':>9} {'build s':>8} {'examples/s':>11} {'peak RSS MB':>12} {'no-op s':>8} {'1 changed s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            dataset_dir = Path(tmp) / f"raw_{size}"
+            write_raw(dataset_dir, size, args.words)
+            input_bytes = sum(p.stat().st_size for p in dataset_dir.iterdir())
+
+            results = context.Queue()
+            process = context.Process(target=build, args=(dataset_dir, Path(tmp) / "processed", args.workers, results))
+            process.start()
+            elapsed, peak, rebuild, incremental = results.get()
+            process.join()
+            print(f"{size:>10,} {input_bytes / 1e6:>9.0f} {elapsed:>8.2f} {size / elapsed:>11,.0f} {peak:>12.0f} {rebuild:>8.3f} {incremental:>12.2f}")
+
+if __name__ == "__main__":
+    main()
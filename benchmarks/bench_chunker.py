@@ -0,0 +1,82 @@
+"""
+Throughput of the token-aware chunker in MB/s, and how it scales with input
+size.
+
+Chunks synthetic prose (paragraphs of sentences, plus some paragraphs far
+over the limit), Python and C++ at each size and reports MB/s, chunk counts
+and the largest chunk in tokens. Constant MB/s across sizes means linear
+time. The tokenizer in use (tiktoken or the regex approximation) is printed
+first.
+
+    python -m benchmarks.bench_chunker
+    python -m benchmarks.bench_chunker --sizes 1 4 16 --max-tokens 1024 --overlap 128
+"""
+import argparse
+import io
+import random
+import time
+
+from src.core.tokens import count_tokens_batch, get_encoding
+from src.lora.builder.chunking import LINE_BREAKS, c_blocks, python_blocks, token_chunker
+from src.lora.builder.converters import _paragraphs
+
+def prose(rng: random.Random, size: int) -> str:
+    words = [f"word{i}" for i in range(2000)]
+    paragraphs, total = [], 0
+    while total < size:
+        sentences = rng.randint(200, 400) if rng.random() < 0.02 else rng.randint(1, 8)
+        paragraph = " ".join(" ".join(rng.choices(words, k=rng.randint(5, 25))) + "." for _ in range(sentences))
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+def python_source(rng: random.Random, size: int) -> str:
+    parts, total, i = [], 0, 0
+    while total < size:
+        body = "".join(f"    value_{j} = compute({j}, value_{max(0, j - 1)})\n" for j in range(rng.randint(2, 40)))
+        part = f"# helper {i}\n@decorator\ndef function_{i}(x):\n{body}    return x\n\n"
+        parts.append(part)
+        total += len(part)
+        i += 1
+    return "".join(parts)
+
+def cpp_source(rng: random.Random, size: int) -> str:
+    parts, total, i = [], 0, 0
+    while total < size:
+        body = "".join(f"  int v{j} = f({j}, \"{{\");\n" for j in range(rng.randint(2, 40)))
+        part = f"// helper {i}\nint function_{i}(int x) {{\n{body}  return x;\n}}\n\n"
+        parts.append(part)
+        total += len(part)
+        i += 1
+    return "".join(parts)
+
+def run(kind: str, text: str, max_tokens: int, overlap: int):
+    if kind == "prose":
+        chunker = token_chunker(max_tokens=max_tokens, overlap=overlap)
+        pieces = _paragraphs(io.StringIO(text), "bench.md")
+    else:
+        chunker = token_chunker(max_tokens=max_tokens, overlap=overlap, separator="", breaks=LINE_BREAKS)
+        pieces = (python_blocks if kind == "python" else c_blocks)(io.StringIO(text), f"bench.{kind}")
+    start = time.perf_counter()
+    chunks = [chunk for _, chunk in chunker.chunk(pieces)]
+    elapsed = time.perf_counter() - start
+    largest = max(count_tokens_batch(chunks))
+    mb = len(text.encode()) / 1e6
+    print(f"{kind:>8} {mb:>8.1f} {elapsed:>8.2f} {mb / elapsed:>8.2f} {len(chunks):>8,} {largest:>12,}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the token-aware chunker.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="Input sizes in MB.")
+    parser.add_argument("--max-tokens", type=int, default=4096)
+    parser.add_argument("--overlap", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"tokenizer: {'tiktoken cl100k_base' if get_encoding() is not None else 'regex approximation'}")
+    print(f"{'input':>8} {'MB':>8} {'s':>8} {'MB/s':>8} {'chunks':>8} {'max tokens':>12}")
+    rng = random.Random(0)
+    for size in args.sizes:
+        for kind, make in (("prose", prose), ("python", python_source), ("cpp", cpp_source)):
+            run(kind, make(rng, int(size * 1e6)), args.max_tokens, args.overlap)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput, accuracy and memory of the dedup stage on a synthetic stream.
+
+Generates `--examples` distinct documents and mixes in exact copies and
+near copies (a few words changed) of earlier ones, then streams everything
+through deduplicator and reports examples/s, how many injected duplicates
+were caught, how many distinct documents were wrongly dropped, and the size
+of its hash tables against the process RSS.
+
+    python -m benchmarks.bench_dedup
+    python -m benchmarks.bench_dedup --examples 1000000 --words 100 --threshold 0.8
+"""
+import argparse
+import random
+import resource
+import time
+
+from src.core.schema import Example
+from src.lora.builder.dedup import deduplicator
+
+def stream(rng: random.Random, n: int, words: int, duplicates: float, edits: int):
+    """Yields examples with meta["kind"] "unique", "exact" or "near"."""
+    recent = []
+    for _ in range(n):
+        roll = rng.random()
+        if recent and roll < duplicates:
+            text, kind = rng.choice(recent), "exact"
+        elif recent and roll < 2 * duplicates:
+            tokens = rng.choice(recent).split()
+            for _ in range(edits):
+                tokens[rng.randrange(len(tokens))] = f"edit{rng.randrange(10**6)}"
+            text, kind = " ".join(tokens), "near"
+        else:
+            text, kind = " ".join(f"w{rng.randrange(50_000)}" for _ in range(words)), "unique"
+            recent.append(text)
+            if len(recent) > 1000:
+                recent.pop(rng.randrange(len(recent)))
+        yield Example(messages=[{"role": "user", "content": text}], meta={"kind": kind})
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exact and near-duplicate removal.")
+    parser.add_argument("--examples", type=int, default=200_000)
+    parser.add_argument("--words", type=int, default=100)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Share of exact copies (and again of near copies).")
+    parser.add_argument("--edits", type=int, default=1, help="Words changed in a near copy.")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--num-perm", type=int, default=128)
+    args = parser.parse_args()
+
+    dedup = deduplicator(threshold=args.threshold, num_perm=args.num_perm)
+    print(f"bands x rows: {dedup.bands} x {dedup.rows}")
+    injected = {"unique": 0, "exact": 0, "near": 0}
+    kept = {"unique": 0, "exact": 0, "near": 0}
+
+    generating = 0.0
+
+    def counted(examples):
+        # Streams the input so RSS reflects the dedup state, and times the generator separately.
+        nonlocal generating
+        while True:
+            start = time.perf_counter()
+            example = next(examples, None)
+            generating += time.perf_counter() - start
+            if example is None:
+                return
+            injected[example.meta["kind"]] += 1
+            yield example
+
+    start = time.perf_counter()
+    for example in dedup.filter(counted(stream(random.Random(0), args.examples, args.words, args.duplicates, args.edits))):
+        kept[example.meta["kind"]] += 1
+    elapsed = time.perf_counter() - start - generating
+    caught = {kind: injected[kind] - kept[kind] for kind in injected}
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{args.examples:,} examples in {elapsed:.1f}s: {args.examples / elapsed:,.0f} examples/s")
+    print(f"exact copies caught: {caught['exact']:,}/{injected['exact']:,}")
+    print(f"near copies caught:  {caught['near']:,}/{injected['near']:,} ({args.edits} of {args.words} words changed)")
+    print(f"distinct documents dropped: {caught['unique']:,}/{injected['unique']:,}")
+    print(dedup.summary())
+    print(f"hash tables: {dedup.nbytes() / 1e6:.1f} MB, peak RSS {rss:.0f} MB")
+
+if __name__ == "__main__":
+    main()
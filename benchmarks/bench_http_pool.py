@@ -0,0 +1,64 @@
+"""
+Per-call latency of a fresh httpx.Client per request vs. the pooled transport.
+
+Runs against the local stand-in server from tests/fake_fireworks.py, so the
+numbers measure connection setup overhead only (no TLS, no model latency).
+Real endpoints add a TLS handshake per fresh connection on top of this.
+
+    python -m benchmarks.bench_http_pool --calls 200
+"""
+import argparse
+import os
+import statistics
+import time
+
+import httpx
+from langchain_core.messages import HumanMessage
+
+from src.llm import transport
+from src.llm.fireworks_provider import fireworks_chat
+from tests.fake_fireworks import fake_fireworks
+
+def _fresh_client_call(api_base: str, body: dict):
+    # The pre-pooling behaviour: a new client (and TCP connection) per call.
+    with httpx.Client() as client:
+        response = client.post(f"{api_base}/chat/completions", json=body, timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+def _time(fn, calls: int) -> list:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def _report(label: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<18} mean {statistics.mean(samples):7.3f} ms  p50 {statistics.median(samples):7.3f} ms  p95 {p95:7.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs. per-call HTTP clients.")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("FIREWORKS_API_KEY", "bench")
+    messages = [HumanMessage(content="ping")]
+
+    with fake_fireworks() as server:
+        chat = fireworks_chat(model="bench", api_base=server.api_base)
+        body = chat._body(messages, None)
+
+        fresh = _time(lambda: _fresh_client_call(server.api_base, body), args.calls)
+        connections_before = server.connections
+        pooled = _time(lambda: chat.invoke(messages), args.calls)
+
+        _report("fresh client", fresh)
+        _report("pooled client", pooled)
+        print(f"connections opened: fresh={connections_before}, pooled={server.connections - connections_before}")
+        transport.close_clients()
+
+if __name__ == "__main__":
+    main()
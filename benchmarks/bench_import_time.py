@@ -0,0 +1,67 @@
+"""
+Cold-start import cost of the CLI entry points, measured with -X importtime in
+a fresh interpreter per run so nothing is already in sys.modules.
+
+Reports the best cumulative import time of each module over --repeat runs and
+the heaviest imports it pulled in. With --max-ms the exit status is 1 when any
+module is slower than the threshold, so it can guard against startup
+regressions.
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time src.cli.chat --max-ms 1500 --top 15
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+DEFAULT_MODULES = ["src.cli.chat", "src.cli.run_agent", "src.agent.react_agent"]
+
+# "import time:  self [us] | cumulative | imported package"
+_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+def import_profile(module: str) -> dict:
+    """Cumulative microseconds per imported module for one cold `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            profile[match.group(4)] = int(match.group(2))
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold import time of the CLI entry points.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="Heaviest imports to list per module.")
+    parser.add_argument("--max-ms", type=float, help="Fail if any module takes longer than this.")
+    args = parser.parse_args()
+
+    slow = []
+    for module in args.modules:
+        profiles = [import_profile(module) for _ in range(args.repeat)]
+        best = min(profiles, key=lambda p: p[module])
+        total_ms = best[module] / 1000
+        print(f"{module:<30} {total_ms:9.1f} ms")
+        heaviest = sorted((m for m in best if m != module and "." not in m), key=best.get, reverse=True)
+        for name in heaviest[:args.top]:
+            print(f"    {name:<26} {best[name] / 1000:9.1f} ms")
+        if args.max_ms is not None and total_ms > args.max_ms:
+            slow.append(module)
+
+    if slow:
+        print(f"over {args.max_ms:g} ms: {', '.join(slow)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
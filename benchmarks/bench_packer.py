@@ -0,0 +1,85 @@
+"""
+Throughput of the JSONL packer: examples/s and MB/s (of uncompressed JSONL)
+for plain, sharded and compressed output.
+
+Packs the same synthetic examples (mixed lengths, with meta) once per
+configuration and reports the time, throughput, number of files and their
+size on disk. The first row is the old writer, `json.dumps(model_dump())`
+per example, for comparison. Whether orjson and zstandard are installed is
+printed first; without zstandard the zstd rows are skipped.
+
+    python -m benchmarks.bench_packer
+    python -m benchmarks.bench_packer --examples 500000 --workers 4 --shard-mb 32
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.core.schema import Example
+from src.lora.builder import packer
+from src.lora.builder.packer import write_jsonl
+
+def make_examples(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(5000)]
+    examples = []
+    for i in range(n):
+        user = " ".join(rng.choices(words, k=rng.choice((10, 40, 200, 800))))
+        assistant = " ".join(rng.choices(words, k=rng.randint(10, 300)))
+        examples.append(Example(
+            messages=[{"role": "user", "content": user}, {"role": "assistant", "content": assistant}],
+            meta={"source": f"file{i % 17}.md", "index": i},
+        ))
+    return examples
+
+def write_baseline(examples, output_path: Path):
+    with output_path.open("w", encoding="utf-8") as f:
+        for example in examples:
+            f.write(json.dumps(example.model_dump()) + "\n")
+    return [output_path]
+
+def run(name: str, write, examples, directory: Path, raw_mb: float):
+    directory.mkdir()
+    start = time.perf_counter()
+    paths = write(iter(examples), directory / "out.jsonl")
+    elapsed = time.perf_counter() - start
+    disk_mb = sum(p.stat().st_size for p in paths) / 1e6
+    print(f"{name:<24} {elapsed:>7.2f} {len(examples) / elapsed:>12,.0f} {raw_mb / elapsed:>8.1f} {len(paths):>6} {disk_mb:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSONL packer.")
+    parser.add_argument("--examples", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4, help="Threads writing shards in the parallel rows.")
+    parser.add_argument("--shard-mb", type=float, default=16)
+    parser.add_argument("--shard-tokens", type=int, default=4_000_000)
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if packer.orjson is not None else 'no'}, zstandard: {'yes' if packer.zstandard is not None else 'no'}")
+    examples = make_examples(args.examples)
+    shard_bytes = int(args.shard_mb * 1e6)
+    configs = [
+        ("json.dumps per example", write_baseline),
+        ("packer", lambda e, p: write_jsonl(e, p)),
+        (f"{args.shard_mb:g} MB shards", lambda e, p: write_jsonl(e, p, shard_bytes=shard_bytes)),
+        (f"{args.shard_tokens:,} token shards", lambda e, p: write_jsonl(e, p, shard_tokens=args.shard_tokens)),
+        ("gzip shards", lambda e, p: write_jsonl(e, p, shard_bytes=shard_bytes, compression="gzip")),
+        (f"gzip shards x{args.workers}", lambda e, p: write_jsonl(e, p, shard_bytes=shard_bytes, compression="gzip", workers=args.workers)),
+    ]
+    if packer.zstandard is not None:
+        configs += [
+            ("zstd shards", lambda e, p: write_jsonl(e, p, shard_bytes=shard_bytes, compression="zstd")),
+            (f"zstd shards x{args.workers}", lambda e, p: write_jsonl(e, p, shard_bytes=shard_bytes, compression="zstd", workers=args.workers)),
+        ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_mb = sum(map(len, packer._dumps(examples))) / 1e6
+        print(f"{args.examples:,} examples, {raw_mb:.1f} MB of JSONL")
+        print(f"{'writer':<24} {'s':>7} {'examples/s':>12} {'MB/s':>8} {'files':>6} {'disk MB':>9}")
+        for i, (name, write) in enumerate(configs):
+            run(name, write, examples, Path(tmp) / str(i), raw_mb)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Open time, random access latency, sampling and splitting of the indexed
+dataset reader on a large processed JSONL file.
+
+Writes `--examples` synthetic examples with write_jsonl, then times the
+first open (which builds the .idx sidecar), a reopen (which memory-maps it),
+random reads by example number, sampling and a stratified split. For
+comparison, the first row is a plain pass over the file with json.loads,
+which is what inspecting a dataset used to take.
+
+    python -m benchmarks.bench_reader
+    python -m benchmarks.bench_reader --examples 2000000 --reads 10000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.core.schema import Example
+from src.lora.builder import jsonl_dataset, write_jsonl
+
+def examples(n: int, words: int):
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    for i in range(n):
+        text = " ".join(rng.choices(vocabulary, k=words))
+        yield Example(messages=[{"role": "user", "content": text}, {"role": "assistant", "content": text[::-1]}], meta={"source": f"file{i % 50}.md"})
+
+def timed(label: str, work, note: str = ""):
+    start = time.perf_counter()
+    result = work()
+    print(f"{label:<28} {time.perf_counter() - start:>9.4f}s  {note}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indexed dataset reader.")
+    parser.add_argument("--examples", type=int, default=500_000)
+    parser.add_argument("--words", type=int, default=100)
+    parser.add_argument("--reads", type=int, default=10_000, help="Random reads timed.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "dataset.jsonl"
+        write_jsonl(examples(args.examples, args.words), path)
+        print(f"{args.examples:,} examples, {path.stat().st_size / 1e6:.0f} MB")
+
+        def full_read():
+            with path.open() as f:
+                return sum(1 for line in f if json.loads(line))
+        timed("full read (json.loads)", full_read)
+
+        dataset = timed("first open (build index)", lambda: jsonl_dataset(path))
+        dataset.close()
+        dataset = timed("reopen (mmap index)", lambda: jsonl_dataset(path))
+
+        rng = random.Random(1)
+        picks = [rng.randrange(len(dataset)) for _ in range(args.reads)]
+        start = time.perf_counter()
+        for i in picks:
+            dataset[i]
+        elapsed = time.perf_counter() - start
+        print(f"{'random reads':<28} {elapsed:>9.4f}s  {elapsed / args.reads * 1e6:.1f} us per example")
+
+        sample = timed("sample 1,000", lambda: dataset.sample(1000, seed=0))
+        timed("read the sample", lambda: list(dataset.take(sample)))
+        timed("sources (once)", dataset.sources)
+        train, val = timed("stratified split 10%", lambda: dataset.split(0.1))
+        print(f"train {len(train):,}, validation {len(val):,}")
+        dataset.close()
+
+if __name__ == "__main__":
+    main()
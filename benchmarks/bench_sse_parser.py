@@ -0,0 +1,96 @@
+"""
+Parser overhead of the Fireworks SSE stream: line-based iter_lines + json.loads
+(the previous _stream implementation) vs. src.llm.sse.
+
+Replays a recorded completion body, or a synthetic one shaped like Fireworks'
+chat.completion.chunk events, delivered in network-sized chunks. Reports
+tokens/sec of pure parsing plus message-chunk construction, so the figures
+are an upper bound on what the parser costs per streamed token.
+
+    python -m benchmarks.bench_sse_parser --tokens 20000
+    python -m benchmarks.bench_sse_parser --recording path/to/body.sse
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import httpx
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from src.llm.sse import DONE, iter_content
+
+def synthetic_recording(tokens: int) -> bytes:
+    frames = []
+    for i in range(tokens):
+        event = {
+            "id": "cmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "accounts/fireworks/models/bench",
+            "choices": [{"index": 0, "delta": {"content": f" tok{i % 997}"}, "finish_reason": None}],
+        }
+        frames.append(f"data: {json.dumps(event)}\n\n")
+    frames.append("data: [DONE]\n\n")
+    return "".join(frames).encode()
+
+def network_chunks(body: bytes, size: int) -> list:
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+def legacy_parse(chunks: list) -> int:
+    response = httpx.Response(200, content=iter(chunks))
+    count = 0
+    for line in response.iter_lines():
+        if line.startswith("data: "):
+            line = line[6:]
+            if line.strip() == "[DONE]":
+                break
+            try:
+                delta = json.loads(line)["choices"][0]["delta"]
+                if delta.get("content") is not None:
+                    ChatGenerationChunk(message=AIMessageChunk(content=delta["content"]))
+                    count += 1
+            except json.JSONDecodeError:
+                pass
+    return count
+
+def incremental_parse(chunks: list) -> int:
+    count = 0
+    for content in iter_content(chunks):
+        if content is DONE:
+            continue
+        ChatGenerationChunk(message=AIMessageChunk(content=content))
+        count += 1
+    return count
+
+def parse_only(chunks: list) -> int:
+    return sum(1 for content in iter_content(chunks) if content is not DONE)
+
+def _bench(label: str, fn, chunks: list, repeat: int):
+    best = float("inf")
+    tokens = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<26} {tokens / best:12,.0f} tokens/s  ({best * 1000:8.2f} ms for {tokens} tokens)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE parsing overhead.")
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--recording", type=Path, help="Raw text/event-stream body to replay.")
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = args.recording.read_bytes() if args.recording else synthetic_recording(args.tokens)
+    chunks = network_chunks(body, args.chunk_size)
+    print(f"replaying {len(body) / 1e6:.2f} MB in {len(chunks)} chunks of {args.chunk_size} bytes")
+
+    _bench("iter_lines + json (old)", legacy_parse, chunks, args.repeat)
+    _bench("sse_decoder + chunks", incremental_parse, chunks, args.repeat)
+    _bench("sse_decoder parse only", parse_only, chunks, args.repeat)
+
+if __name__ == "__main__":
+    main()
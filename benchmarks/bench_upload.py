@@ -0,0 +1,77 @@
+"""
+Throughput of the dataset upload against the local stand-in server from
+tests/fake_fireworks.py.
+
+Uploads a synthetic processed dataset as one request (how it used to go up)
+and in parallel parts, then times a re-upload of the same content (skipped
+by its hash) and a resume after a failure half way. `--latency` adds a
+delay to every PUT, standing in for the round trip to the storage service,
+which is where parallel parts pay off; on loopback with no latency the run
+is bound by hashing and copying.
+
+    python -m benchmarks.bench_upload
+    python -m benchmarks.bench_upload --mb 500 --part-mb 16 --workers 8 --latency 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.lora.fireworks.client import fireworks_client
+from src.lora.fireworks.upload import upload_dataset
+from tests.fake_fireworks import fake_fireworks
+
+def write_dataset(path: Path, mb: float):
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(5000)]
+    with path.open("w") as f:
+        while f.tell() < mb * 1e6:
+            text = " ".join(rng.choices(words, k=200))
+            f.write(json.dumps({"messages": [{"role": "user", "content": text}, {"role": "assistant", "content": text[::-1]}]}) + "\n")
+
+def timed(label: str, size: int, work):
+    # The upload prints a line per part; keep the table readable.
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        work()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:>8.2f}s  {size / 1e6 / elapsed:>8.1f} MB/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dataset upload.")
+    parser.add_argument("--mb", type=float, default=100)
+    parser.add_argument("--part-mb", type=float, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds added to every PUT.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, fake_fireworks() as server:
+        path = Path(tmp) / "dataset.jsonl"
+        write_dataset(path, args.mb)
+        size = path.stat().st_size
+        part_bytes = int(args.part_mb * 1e6)
+        client = fireworks_client(api_base=server.api_base + "/v1", account_id="bench", api_key="bench")
+        delays = lambda: [{"delay": args.latency} for _ in range(10_000)]
+        print(f"{size / 1e6:.0f} MB, parts of {args.part_mb:g} MB, {args.workers} workers, {args.latency:g}s per PUT")
+
+        def run(dataset_id: str, **kwargs):
+            server.upload_script = delays()
+            upload_dataset(path, dataset_id, client, **kwargs)
+
+        timed("one request", size, lambda: run("single", workers=1, part_bytes=size + 1))
+        timed(f"parts, {args.workers} workers", size, lambda: run("parallel", workers=args.workers, part_bytes=part_bytes))
+        timed("again (skipped by hash)", size, lambda: run("parallel", workers=args.workers, part_bytes=part_bytes))
+
+        # Fail a PUT half way through, then time the resume.
+        server.upload_script = [{} for _ in range(-(-size // part_bytes) // 2)] + [{"status": 400}]
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(Exception):
+            upload_dataset(path, "resumed", client, workers=1, part_bytes=part_bytes)
+        timed("resume after a failure half way", size, lambda: run("resumed", workers=args.workers, part_bytes=part_bytes))
+        print(f"PUTs served: {len(server.puts)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Throughput of single-pass validation with statistics, on a synthetic stream
+with a share of bad examples.
+
+Times the old check (validate_roles per example, which stops at the first
+error, so it is run on the valid examples only) and validation_report, which
+also token-counts every example and keeps the statistics. Prints
+examples/s, the error counts found and the time to build the report.
+
+    python -m benchmarks.bench_validation
+    python -m benchmarks.bench_validation --examples 2000000 --bad 0.01
+"""
+import argparse
+import random
+import time
+
+from src.core.schema import Example
+from src.core.tokens import get_encoding
+from src.lora.builder.validators import validate_roles, validation_report
+
+def stream(n: int, bad: float, seed: int = 0):
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(2000)]
+    for i in range(n):
+        turns = rng.randint(1, 4)
+        roles = (["system"] if rng.random() < 0.3 else []) + ["user", "assistant"] * turns
+        if rng.random() < bad:
+            roles[0] = "assistant" if rng.random() < 0.5 else roles[0]
+            roles.append(roles[-1])
+        messages = [{"role": role, "content": " ".join(rng.choices(words, k=rng.randint(5, 120)))} for role in roles]
+        yield f"file{i % 20}.jsonl:{i + 1}", Example(messages=messages)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark validation with statistics.")
+    parser.add_argument("--examples", type=int, default=200_000)
+    parser.add_argument("--bad", type=float, default=0.01, help="Share of examples with role errors.")
+    args = parser.parse_args()
+
+    print(f"tokenizer: {'tiktoken cl100k_base' if get_encoding() is not None else 'regex approximation'}")
+    pairs = list(stream(args.examples, args.bad))
+
+    start = time.perf_counter()
+    checked = 0
+    for _, example in pairs:
+        try:
+            validate_roles(example)
+        except ValueError:
+            continue
+        checked += 1
+    elapsed = time.perf_counter() - start
+    print(f"validate_roles per example:  {elapsed:6.2f}s  {checked / elapsed:>10,.0f} examples/s (roles only)")
+
+    report = validation_report()
+    start = time.perf_counter()
+    for _ in report.check(iter(pairs)):
+        pass
+    report.finish()
+    elapsed = time.perf_counter() - start
+    print(f"validation_report:           {elapsed:6.2f}s  {len(pairs) / elapsed:>10,.0f} examples/s (roles, lengths, statistics)")
+
+    start = time.perf_counter()
+    result = report.to_dict()
+    print(f"report:                      {time.perf_counter() - start:6.2f}s")
+    print(f"{result['errors']['total']:,} errors: {result['errors']['by_kind']}")
+    print(f"{len(result['sources'])} sources, {len(report.role_patterns)} role patterns, {result['tokens']['total']:,} tokens")
+
+if __name__ == "__main__":
+    main()
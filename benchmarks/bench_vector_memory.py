@@ -0,0 +1,108 @@
+"""
+Recall latency, accuracy and memory footprint of the vector memory store as it
+grows.
+
+Fills a memory-mapped vector_store with clustered synthetic unit vectors (so
+the IVF lists are meaningful) up to each size, then reports: index training
+time, recall latency percentiles, recall@k against exact search, the store's
+own byte counts and the process RSS, and finally how long reopening takes. The hashing embedder's throughput is
+measured separately on synthetic turns.
+
+    python -m benchmarks.bench_vector_memory
+    python -m benchmarks.bench_vector_memory --sizes 10000 100000 1000000 --nprobe 16
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from src.memory.embeddings import hashing_embedder
+from src.memory.vector_index import vector_store
+
+def clustered(rng, n: int, centers: np.ndarray) -> np.ndarray:
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.5 / np.sqrt(centers.shape[1]) * rng.normal(size=(n, centers.shape[1])).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def bench_embedder(texts: int, dim: int):
+    rng = np.random.default_rng(0)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    turns = [" ".join(rng.choice(vocabulary, size=40)) for _ in range(texts)]
+    embedder = hashing_embedder(dim)
+    start = time.perf_counter()
+    for i in range(0, texts, 256):
+        embedder.embed(turns[i:i + 256])
+    elapsed = time.perf_counter() - start
+    print(f"hashing embedder: {texts / elapsed:,.0f} texts/s (40 words each, batches of 256)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector memory recall as the store grows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--exact-queries", type=int, default=20, help="Queries also answered by brute force to measure recall@k.")
+    parser.add_argument("--embed-texts", type=int, default=20_000)
+    args = parser.parse_args()
+
+    bench_embedder(args.embed_texts, args.dim)
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(1024, args.dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = vector_store(args.dim, path, nprobe=args.nprobe)
+        print(f"{'size':>10} {'train s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>10} {'vectors MB':>11} {'index MB':>9} {'RSS MB':>8}")
+        for size in sorted(args.sizes):
+            while store.count < size:
+                n = min(100_000, size - store.count)
+                store.add(clustered(rng, n, centers), [""] * n)
+
+            queries = clustered(rng, args.queries, centers)
+            start = time.perf_counter()
+            store.wait_for_index()  # add() retrains in the background when the store has grown enough
+            train = time.perf_counter() - start
+
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                store.search(query, args.k)
+                latencies.append(time.perf_counter() - start)
+
+            found = 0
+            for query in queries[: args.exact_queries]:
+                best = []
+                for chunk in range(0, store.count, 100_000):
+                    scores = store._vectors[chunk:min(store.count, chunk + 100_000)] @ query
+                    top = np.argpartition(scores, -args.k)[-args.k:]
+                    best.extend(zip(scores[top], top + chunk))
+                exact = {int(i) for _, i in sorted(best)[-args.k:]}
+                found += len(exact & {i for i, _ in store.search(query, args.k)})
+
+            sizes = store.nbytes()
+            print(
+                f"{store.count:>10,} {train:>8.2f} {np.percentile(latencies, 50) * 1000:>8.2f} {np.percentile(latencies, 95) * 1000:>8.2f}"
+                f" {found / (args.k * args.exact_queries):>10.3f} {sizes['vectors'] / 1e6:>11.0f} {sizes['index'] / 1e6:>9.1f} {rss_mb():>8.0f}"
+            )
+        store.close()
+
+        start = time.perf_counter()
+        reopened = vector_store(args.dim, path, nprobe=args.nprobe)
+        print(f"reopened {len(reopened):,} entries in {(time.perf_counter() - start) * 1000:.0f} ms")
+        reopened.close()
+
+if __name__ == "__main__":
+    main()
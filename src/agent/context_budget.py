@@ -0,0 +1,82 @@
+from typing import List, Sequence, Tuple
+
+from langchain_core.agents import AgentAction
+from langchain_core.messages import BaseMessage
+from omegaconf import DictConfig
+
+from src.core.tokens import count_tokens, truncate_middle
+
+class context_budget:
+    """
+    Keeps the variable part of the agent prompt (ReAct scratchpad and chat
+    history) under a token budget before each LLM call.
+
+    Oversized tool outputs are cut to `max_observation_tokens`, keeping their
+    head and tail. If the total is still over `max_tokens`, the oldest
+    observations are collapsed to their first line, except for the last
+    `keep_recent_steps` steps. The model's own Thought/Action text is never
+    dropped, so the ReAct trace stays well formed. Token counts come from
+    src.core.tokens and are memoised per message, so re-rendering the growing
+    scratchpad on every iteration costs only the new step.
+    """
+    def __init__(self, max_tokens: int = 6000, max_observation_tokens: int = 1500, keep_recent_steps: int = 2):
+        self.max_tokens = max_tokens
+        self.max_observation_tokens = max_observation_tokens
+        self.keep_recent_steps = keep_recent_steps
+        self.tokens_saved = 0
+
+    @classmethod
+    def from_config(cls, cfg: DictConfig) -> "context_budget":
+        budget_cfg = cfg.agent.get("context_budget") or {}
+        return cls(**budget_cfg)
+
+    def reset(self) -> int:
+        """Returns the tokens saved since the last reset and starts a new count."""
+        saved, self.tokens_saved = self.tokens_saved, 0
+        return saved
+
+    def format_scratchpad(self, intermediate_steps: Sequence[Tuple[AgentAction, str]]) -> str:
+        """Budget-aware replacement for langchain's format_log_to_str."""
+        logs = [action.log for action, _ in intermediate_steps]
+        observations = [str(observation) for _, observation in intermediate_steps]
+        original = sum(count_tokens(o) for o in observations)
+
+        observations = [truncate_middle(o, self.max_observation_tokens) for o in observations]
+        used = sum(count_tokens(log) for log in logs) + sum(count_tokens(o) for o in observations)
+
+        collapsible = max(0, len(observations) - self.keep_recent_steps)
+        for i in range(collapsible):
+            if used <= self.max_tokens:
+                break
+            before = count_tokens(observations[i])
+            observations[i] = _collapse(observations[i], before)
+            used -= before - count_tokens(observations[i])
+
+        self.tokens_saved += original - sum(count_tokens(o) for o in observations)
+
+        parts = []
+        for log, observation in zip(logs, observations):
+            parts.append(log)
+            parts.append(f"\nObservation: {observation}\nThought: ")
+        return "".join(parts)
+
+    def trim_history(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Drops the oldest chat-history messages until the rest fit within max_tokens."""
+        kept: List[BaseMessage] = []
+        used = 0
+        for message in reversed(messages):
+            tokens = count_tokens(str(message.content))
+            if used + tokens > self.max_tokens and kept:
+                self.tokens_saved += sum(count_tokens(str(m.content)) for m in messages[: len(messages) - len(kept)])
+                break
+            kept.append(message)
+            used += tokens
+        return list(reversed(kept))
+
+    def stats(self) -> dict:
+        return {"max_tokens": self.max_tokens, "tokens_saved": self.tokens_saved}
+
+def _collapse(observation: str, tokens: int) -> str:
+    first_line = observation.strip().split("\n", 1)[0]
+    first_line = truncate_middle(first_line, 40, marker=" ... ")
+    return f"{first_line} [older observation elided, {tokens} tokens]"
@@ -0,0 +1,187 @@
+import json
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from langchain.agents.agent import AgentOutputParser
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+from langchain_core.tools import BaseTool
+
+PARALLEL_TOOL_NAME = "parallel_tools"
+
+FINAL_ANSWER_ACTION = "Final Answer:"
+
+# One Action/Action Input pair; the input runs up to a blank line or the
+# next "Action:", "Thought:" or "Observation:" line.
+_ACTION = re.compile(
+    r"Action\s*\d*\s*:[\s]*(.*?)[\s]*Action\s*\d*\s*Input\s*\d*\s*:[\s]*(.*?)"
+    r"(?=\n[ \t]*\n|\n\s*(?:Action\s*\d*|Thought|Observation)\s*:|\Z)",
+    re.DOTALL,
+)
+
+class _timed_out(Exception):
+    pass
+
+def _call_in_thread(fn: Callable[..., Any], *args, timeout: Optional[float] = None, slots: Optional[threading.Semaphore] = None) -> Future:
+    """
+    Runs fn(*args) on a new daemon thread, after taking one of `slots` if
+    given. The timeout counts from when the call gets its slot, and the
+    future fails with _timed_out once it passes. Python can't stop a thread,
+    so a call that times out is abandoned and runs on in the background
+    until it returns, but it gives its slot back to the calls queued after it.
+    """
+    future: Future = Future()
+    done = threading.Event()
+    outcome: list = []
+
+    def call():
+        try:
+            outcome.append((True, fn(*args)))
+        except BaseException as e:
+            outcome.append((False, e))
+        done.set()
+
+    def run():
+        if slots is not None:
+            slots.acquire()
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            threading.Thread(target=call, daemon=True, name="agent-tool").start()
+            if not done.wait(timeout):
+                future.set_exception(_timed_out())
+            elif outcome[0][0]:
+                future.set_result(outcome[0][1])
+            else:
+                future.set_exception(outcome[0][1])
+        finally:
+            if slots is not None:
+                slots.release()
+
+    threading.Thread(target=run, daemon=True, name="agent-tool-slot").start()
+    return future
+
+class parallel_react_output_parser(AgentOutputParser):
+    """
+    ReAct parser that accepts several Action/Action Input pairs in one step.
+    A single pair becomes an ordinary AgentAction. Several pairs are bundled
+    into one call of the parallel_tools dispatcher, so AgentExecutor runs them
+    as a single step and gets back one combined observation.
+    """
+    def parse(self, text: str) -> Union[AgentAction, AgentFinish]:
+        calls = [
+            {"tool": tool.strip(), "tool_input": tool_input.strip().strip('"')}
+            for tool, tool_input in _ACTION.findall(text)
+        ]
+        includes_answer = FINAL_ANSWER_ACTION in text
+
+        if calls and includes_answer:
+            raise OutputParserException(f"Parsing LLM output produced both a final answer and a parse-able action: {text}")
+        if includes_answer:
+            return AgentFinish({"output": text.split(FINAL_ANSWER_ACTION)[-1].strip()}, text)
+        if not calls:
+            raise OutputParserException(
+                f"Could not parse LLM output: `{text}`",
+                observation="Invalid Format: Missing 'Action:' or 'Action Input:' after 'Thought:'",
+                llm_output=text,
+                send_to_llm=True,
+            )
+        if len(calls) == 1:
+            return AgentAction(calls[0]["tool"], calls[0]["tool_input"], text)
+        return AgentAction(PARALLEL_TOOL_NAME, json.dumps(calls), text)
+
+    @property
+    def _type(self) -> str:
+        return "parallel_react"
+
+class timed_tool(BaseTool):
+    """
+    Wraps a tool so a single action gets the same timeout as the calls the
+    dispatcher runs (see _call_in_thread for what a timeout can and can't do).
+    """
+    name: str
+    description: str
+    tool: BaseTool
+    timeout: float
+
+    @classmethod
+    def wrap(cls, tool: BaseTool, timeout: float) -> "timed_tool":
+        return cls(name=tool.name, description=tool.description, return_direct=tool.return_direct, tool=tool, timeout=timeout)
+
+    def _run(self, tool_input: str, **kwargs) -> str:
+        try:
+            return _call_in_thread(self.tool.run, tool_input, timeout=self.timeout).result()
+        except _timed_out:
+            return f"{self.name} timed out after {self.timeout:g}s"
+
+class parallel_tools(BaseTool):
+    """
+    Internal dispatcher that runs independent tool calls concurrently, at
+    most `max_workers` at a time, each under its own timeout, and returns
+    their results as one numbered observation. It is handed to AgentExecutor
+    but not listed in the prompt; the model reaches it by writing several
+    actions in one step.
+    """
+    name: str = PARALLEL_TOOL_NAME
+    description: str = "Runs several tool calls at the same time. Used internally by the parallel ReAct agent."
+    tools: Dict[str, BaseTool]
+    max_workers: int = 4
+    tool_timeout: float = 30.0
+    tool_timeouts: Dict[str, float] = {}
+
+    @classmethod
+    def from_tools(cls, tools: Sequence[BaseTool], **settings) -> "parallel_tools":
+        return cls(tools={tool.name: tool for tool in tools}, **settings)
+
+    def timeout_for(self, tool_name: str) -> float:
+        return self.tool_timeouts.get(tool_name, self.tool_timeout)
+
+    def _run(self, tool_input: str, **kwargs) -> str:
+        calls: List[dict] = json.loads(tool_input)
+        # Slots are per step, so calls abandoned by an earlier step don't hold them.
+        slots = threading.Semaphore(self.max_workers)
+        futures = []
+        for call in calls:
+            tool = self.tools.get(call["tool"])
+            if tool is None:
+                futures.append(None)
+                continue
+            futures.append(_call_in_thread(tool.run, call["tool_input"], timeout=self.timeout_for(call["tool"]), slots=slots))
+
+        observations = []
+        for i, (call, future) in enumerate(zip(calls, futures), start=1):
+            label = f"[{i}] {call['tool']}({call['tool_input']})"
+            if future is None:
+                observations.append(f"{label}: {call['tool']} is not a valid tool, try one of [{', '.join(self.tools)}].")
+                continue
+            try:
+                observations.append(f"{label}: {future.result()}")
+            except _timed_out:
+                observations.append(f"{label}: timed out after {self.timeout_for(call['tool']):g}s")
+            except Exception as e:
+                observations.append(f"{label}: error: {e}")
+        return "\n".join(observations)
+
+PARALLEL_REACT_TEMPLATE = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+When several actions do not depend on each other's results, request them in the same step: write one Action/Action Input pair per call, one after another, before the Observation. They run at the same time and their results come back together in a single Observation, numbered in the order you wrote them.
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
@@ -0,0 +1,87 @@
+import argparse
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.prompts import PromptTemplate
+
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+INDEX_PATH = PROMPTS_DIR / "index.json"
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _file_name(name: str) -> str:
+    return name.replace("/", "__") + ".txt"
+
+def _read_index(prompts_dir: Path) -> Dict[str, dict]:
+    index_path = prompts_dir / "index.json"
+    if not index_path.exists():
+        return {}
+    with index_path.open("r") as f:
+        return json.load(f)
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str, prompts_dir: Path = PROMPTS_DIR) -> PromptTemplate:
+    """
+    Loads a prompt from the vendored registry, without touching the network.
+    The file's sha256 must match the index, so a hand-edited or partially
+    written prompt fails loudly instead of silently changing agent behaviour.
+    Memoised per process.
+    """
+    entry = _read_index(prompts_dir).get(name)
+    if entry is None:
+        raise KeyError(f"Prompt '{name}' is not in the registry. Run: python -m src.agent.prompt_registry refresh {name}")
+    template = (prompts_dir / entry["file"]).read_text(encoding="utf-8")
+    if _sha256(template) != entry["sha256"]:
+        raise ValueError(f"Prompt '{name}' does not match its recorded hash. Run: python -m src.agent.prompt_registry refresh {name}")
+    return PromptTemplate.from_template(template)
+
+def refresh(names: Optional[List[str]] = None, prompts_dir: Path = PROMPTS_DIR) -> Dict[str, str]:
+    """
+    Pulls prompts from the LangChain hub into the registry and records their
+    hashes. With no names, every prompt already in the index is refreshed.
+    Returns name -> sha256 for the prompts written.
+    """
+    from langchain import hub
+
+    prompts_dir.mkdir(parents=True, exist_ok=True)
+    index = _read_index(prompts_dir)
+    updated = {}
+    for name in names or list(index):
+        template = hub.pull(name).template
+        entry = {"file": _file_name(name), "sha256": _sha256(template)}
+        (prompts_dir / entry["file"]).write_text(template, encoding="utf-8")
+        index[name] = entry
+        updated[name] = entry["sha256"]
+
+    tmp_path = prompts_dir / "index.json.tmp"
+    with tmp_path.open("w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write("\n")
+    tmp_path.replace(prompts_dir / "index.json")
+    load_prompt.cache_clear()
+    return updated
+
+def main():
+    parser = argparse.ArgumentParser(description="Local prompt registry")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = subparsers.add_parser("refresh", help="Pull prompts from the LangChain hub into the registry.")
+    refresh_parser.add_argument("names", nargs="*", help="Hub prompt names, e.g. hwchase17/react. Defaults to all registered prompts.")
+
+    subparsers.add_parser("list", help="List registered prompts and their hashes.")
+
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        for name, digest in refresh(args.names).items():
+            print(f"{name:<30} {digest}")
+    elif args.command == "list":
+        for name, entry in sorted(_read_index(PROMPTS_DIR).items()):
+            print(f"{name:<30} {entry['sha256']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,80 @@
-from omegaconf import DictConfig
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain import hub
+from omegaconf import DictConfig, OmegaConf
+from langchain.agents import AgentExecutor
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.tools import render_text_description
 from src.llm.llm_factory import get_llm
 from src.core.interfaces import agent
+from src.agent.context_budget import context_budget
+from src.agent.prompt_registry import load_prompt
+from src.agent.parallel_tools import PARALLEL_REACT_TEMPLATE, parallel_react_output_parser, parallel_tools, timed_tool
+from src.agent.tool_cache import get_tool_cache
 from src.agent.tool_loader import load_tools
 from src.memory.memory_factory import get_memory
 
+def create_budgeted_react_agent(llm, tools, prompt, budget: context_budget, output_parser=None):
+    """
+    Same runnable as langchain's create_react_agent, except the scratchpad (and
+    chat history, when the prompt uses one) pass through the context budget
+    before every LLM call.
+    """
+    prompt = prompt.partial(
+        tools=render_text_description(list(tools)),
+        tool_names=", ".join([t.name for t in tools]),
+    )
+    inputs = RunnablePassthrough.assign(
+        agent_scratchpad=lambda x: budget.format_scratchpad(x["intermediate_steps"]),
+    )
+    if "chat_history" in prompt.input_variables:
+        inputs = inputs | RunnablePassthrough.assign(chat_history=lambda x: budget.trim_history(x.get("chat_history") or []))
+    output_parser = output_parser or ReActSingleInputOutputParser()
+    return inputs | prompt | llm.bind(stop=["\nObservation"]) | output_parser
+
 class react_agent(agent):
-    def __init__(self, cfg: DictConfig):
+    def __init__(self, cfg: DictConfig, with_memory: bool = True):
         self.llm = get_llm(cfg)
         self.tools = load_tools(cfg)
-        self.memory = get_memory(cfg)
-        
-        prompt = hub.pull("hwchase17/react")
-        
-        agent = create_react_agent(self.llm, self.tools, prompt)
+        self.tool_cache = get_tool_cache(cfg)
+        # Server workers are built without one; each request attaches its session's.
+        self.memory = get_memory(cfg) if with_memory else None
+        self.context_budget = context_budget.from_config(cfg)
+        self.verbose = cfg.debug
+
+        executor_tools = list(self.tools)
+        if cfg.agent.type == "react_parallel":
+            # The model may emit several actions per step; they are dispatched
+            # together through the (unlisted) parallel_tools tool.
+            prompt = PromptTemplate.from_template(PARALLEL_REACT_TEMPLATE)
+            output_parser = parallel_react_output_parser()
+            settings = OmegaConf.to_container(cfg.agent.parallel) if cfg.agent.get("parallel") else {}
+            dispatcher = parallel_tools.from_tools(self.tools, **settings)
+            # Single actions bypass the dispatcher; give them the same timeouts.
+            executor_tools = [timed_tool.wrap(tool, dispatcher.timeout_for(tool.name)) for tool in self.tools]
+            executor_tools.append(dispatcher)
+        elif cfg.agent.type == "react":
+            prompt = load_prompt("hwchase17/react")
+            output_parser = None
+        else:
+            raise ValueError(f"Unsupported agent type: {cfg.agent.type}")
+
+        agent = create_budgeted_react_agent(self.llm, self.tools, prompt, self.context_budget, output_parser)
 
         self.agent_executor = AgentExecutor(
             agent=agent,
-            tools=self.tools,
+            tools=executor_tools,
             memory=self.memory,
             verbose=cfg.debug,
             max_iterations=cfg.agent.max_iterations,
             handle_parsing_errors=True,
         )
 
-    def run(self, task: str) -> str:
-        result = self.agent_executor.invoke({"input": task})
-        return result["output"]
\ No newline at end of file
+    def run(self, task: str, callbacks=None) -> str:
+        self.context_budget.reset()
+        result = self.agent_executor.invoke({"input": task}, config={"callbacks": callbacks} if callbacks else None)
+        self.last_run_tokens_saved = self.context_budget.reset()
+        if self.verbose:
+            print(f"--- Context budget saved {self.last_run_tokens_saved} prompt tokens this run ---")
+            if self.tool_cache:
+                print(f"--- Tool cache: {self.tool_cache.stats()} ---")
+        return result["output"]
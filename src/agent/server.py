@@ -0,0 +1,218 @@
+"""
+Long-running agent server: a pool of warm react_agent instances behind a small
+HTTP API, on localhost TCP or a Unix socket.
+
+    POST   /run              {"prompt": ..., "session": optional id}
+                             -> NDJSON stream: {"type": "token", "text": ...}...
+                                then {"type": "result", "output": ..., "latency": ...}
+                                or {"type": "error", "error": ...}
+    GET    /health           -> {"workers": ..., "idle": ..., "sessions": ...}
+    DELETE /sessions/<id>    -> forgets a session's conversation memory
+
+Agents are built once at startup, so a request only pays for the model calls.
+Each session gets its own memory, which is attached to whichever agent serves
+the request. Requests for the same session run one at a time, in order.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+class _session:
+    def __init__(self, memory):
+        self.memory = memory
+        self.lock = threading.Lock()
+
+class agent_pool:
+    """
+    Fixed set of pre-built agents plus a bounded LRU of session memories.
+    `agent_factory` builds one agent, without memory of its own; `memory_factory`
+    builds an empty conversation memory for a new session.
+    """
+    def __init__(self, agent_factory: Callable[[], Any], memory_factory: Callable[[], Any], workers: int = 4, max_sessions: int = 256):
+        self.workers = workers
+        self.max_sessions = max_sessions
+        self._memory_factory = memory_factory
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(agent_factory())
+        self._sessions: "OrderedDict[str, _session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: Optional[str]) -> _session:
+        if session_id is None:
+            return _session(self._memory_factory())
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = _session(self._memory_factory())
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def reset(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    @contextmanager
+    def lease(self, session_id: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Checks out an idle agent with the session's memory attached. Raises
+        TimeoutError if none is free (or the session stays busy) for `timeout`
+        seconds.
+        """
+        session = self._session(session_id)
+        if not session.lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError(f"Session '{session_id}' is busy")
+        try:
+            try:
+                agent = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("All agent workers are busy") from None
+            try:
+                agent.memory = session.memory
+                agent.agent_executor.memory = session.memory
+                yield agent
+            finally:
+                agent.memory = agent.agent_executor.memory = None
+                self._idle.put(agent)
+        finally:
+            session.lock.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "idle": self._idle.qsize(), "sessions": len(self._sessions)}
+
+class _token_writer(BaseCallbackHandler):
+    """Forwards every streamed LLM token to `write`."""
+    def __init__(self, write: Callable[[dict], None]):
+        self.write = write
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.write({"type": "token", "text": token})
+
+class _handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def address_string(self) -> str:
+        # Unix-socket peers have no address.
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._json(200, self.server.pool.stats())
+        else:
+            self._json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_DELETE(self):
+        if self.path.startswith("/sessions/"):
+            self._json(200, {"reset": self.server.pool.reset(self.path[len("/sessions/"):])})
+        else:
+            self._json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/run":
+            self._json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            prompt = request["prompt"]
+        except (ValueError, KeyError):
+            self._json(400, {"error": "Expected a JSON body with a 'prompt' field"})
+            return
+
+        self._connected = True
+        started = time.perf_counter()
+        try:
+            with self.server.pool.lease(request.get("session"), timeout=self.server.queue_timeout) as agent:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    output = agent.run(prompt, callbacks=[_token_writer(self._event)])
+                    final = {"type": "result", "output": output, "latency": time.perf_counter() - started}
+                except Exception as e:
+                    final = {"type": "error", "error": str(e)}
+        except TimeoutError as e:
+            self._json(503, {"error": str(e)})
+            return
+        # Sent after the lease ends, so the agent is back in the pool by the
+        # time the client sees the result.
+        self._event(final)
+        if self._connected:
+            try:
+                self._chunk(b"")
+            except OSError:
+                pass
+
+    def _event(self, event: dict):
+        if not self._connected:
+            return
+        try:
+            self._chunk(json.dumps(event).encode() + b"\n")
+        except OSError:
+            # The client went away; let the run finish so the agent and
+            # session memory stay consistent.
+            self._connected = False
+
+    def _json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+class _unix_handler(_handler):
+    disable_nagle_algorithm = False  # TCP_NODELAY does not apply to Unix sockets
+
+class _tcp_server(ThreadingHTTPServer):
+    daemon_threads = True
+
+class _unix_server(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+def make_server(
+    pool: agent_pool,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[str] = None,
+    queue_timeout: Optional[float] = 300.0,
+    verbose: bool = False,
+):
+    """Builds (but does not start) the HTTP server for `pool`. With `socket_path` it listens on a Unix socket instead of TCP."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _unix_server(socket_path, _unix_handler)
+    else:
+        server = _tcp_server((host, port), _handler)
+    server.pool = pool
+    server.queue_timeout = queue_timeout
+    server.verbose = verbose
+    return server
+
+def serve_in_thread(server) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, name="agent-server", daemon=True)
+    thread.start()
+    return thread
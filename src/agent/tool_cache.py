@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.tools import BaseTool
+from omegaconf import DictConfig
+
+from src.llm.response_cache import response_cache
+
+# Config names of tools whose results depend on the file system. Their cache
+# keys include a stat signature of the path they touch, so a changed file or
+# directory is a different key and a stale result is never served.
+FILE_TOOLS = {"file_read", "list_directory", "file_search"}
+# Tools that can change the file system.
+WRITE_TOOLS = {"file_write", "shell"}
+
+class tool_cache:
+    """
+    Result cache shared by the cached_tool wrappers of one agent config.
+
+    Entries live in a response_cache (in-memory LRU plus optional SQLite file,
+    so results survive across sessions). Web results expire after `ttl`
+    seconds. File results are keyed on file mtime/inode/size instead. A
+    recursive file_search can't be validated from one stat, so its keys also
+    carry a generation that every write-type tool call bumps. The generation
+    is seeded per process, so search results are never reused across sessions.
+    """
+    def __init__(self, path: Optional[str] = None, memory_entries: int = 512, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600.0):
+        self.store = response_cache(path, memory_entries=memory_entries, max_bytes=max_bytes)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = f"{os.getpid()}-{time.time_ns()}"
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> str:
+        return f"{self._generation}:{self._counter}"
+
+    def invalidate_file_search(self):
+        with self._lock:
+            self._counter += 1
+            self.invalidations += 1
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        entry = self.store.get(key)
+        if entry is not None and (entry["expires"] is None or entry["expires"] > time.time()):
+            self.hits += 1
+            return True, entry["result"]
+        self.misses += 1
+        return False, None
+
+    def remember(self, key: str, result: Any, expires: bool):
+        self.store.put(key, {"result": result, "expires": time.time() + self.ttl if expires else None})
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls_saved": self.hits, "calls_run": self.misses, "invalidations": self.invalidations}
+
+def _stat_signature(path: Path) -> list:
+    try:
+        st = path.stat()
+    except OSError:
+        return ["missing"]
+    return [st.st_mtime_ns, st.st_ino, st.st_size]
+
+def _call_arguments(tool: BaseTool, args: tuple, kwargs: dict) -> Dict[str, Any]:
+    """Normalises positional and keyword tool arguments into one dict."""
+    fields = list(tool.args)
+    call = dict(zip(fields, args))
+    call.update(kwargs)
+    return call
+
+class cached_tool(BaseTool):
+    """
+    Wraps an idempotent tool so repeated calls with the same arguments are
+    answered from the tool_cache instead of running the tool again.
+    """
+    tool: BaseTool
+    kind: str
+    cache: Any
+
+    def __init__(self, tool: BaseTool, kind: str, cache: tool_cache):
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            tool=tool,
+            kind=kind,
+            cache=cache,
+        )
+
+    def _key(self, call: Dict[str, Any]) -> str:
+        payload: Dict[str, Any] = {"tool": self.kind, "args": call}
+        if self.kind in FILE_TOOLS:
+            root = getattr(self.tool, "root_dir", None)
+            target = call.get("file_path", call.get("dir_path", "."))
+            path = Path(root) / target if root else Path(target)
+            payload["path"] = str(path.resolve())
+            payload["stat"] = _stat_signature(path)
+            if self.kind == "file_search":
+                payload["generation"] = self.cache.generation()
+        return response_cache.key(payload)
+
+    def _run(self, *args, run_manager=None, **kwargs) -> Any:
+        call = _call_arguments(self.tool, args, kwargs)
+        key = self._key(call)
+        hit, result = self.cache.lookup(key)
+        if hit:
+            return result
+        result = self.tool.run(call, callbacks=run_manager.get_child() if run_manager else None)
+        if isinstance(result, str):
+            self.cache.remember(key, result, expires=self.kind not in FILE_TOOLS)
+        return result
+
+class invalidating_tool(BaseTool):
+    """Wraps a write-type tool so each call invalidates cached results it may have changed."""
+    tool: BaseTool
+    cache: Any
+
+    def __init__(self, tool: BaseTool, cache: tool_cache):
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            tool=tool,
+            cache=cache,
+        )
+
+    def _run(self, *args, run_manager=None, **kwargs) -> Any:
+        call = _call_arguments(self.tool, args, kwargs)
+        try:
+            return self.tool.run(call, callbacks=run_manager.get_child() if run_manager else None)
+        finally:
+            # file_read/list_directory entries are already keyed on stat data;
+            # only the recursive searches need an explicit bump.
+            self.cache.invalidate_file_search()
+
+_caches: Dict[tuple, tool_cache] = {}
+_caches_lock = threading.Lock()
+
+def get_tool_cache(cfg: DictConfig) -> Optional[tool_cache]:
+    """The process-wide tool cache for `agent.tool_cache`, or None when it is not configured."""
+    cache_cfg = cfg.agent.get("tool_cache")
+    if not cache_cfg or not cache_cfg.get("tools"):
+        return None
+    settings = (
+        cache_cfg.get("path"),
+        cache_cfg.get("memory_entries", 512),
+        cache_cfg.get("max_bytes", 64 * 1024 * 1024),
+        cache_cfg.get("ttl", 3600.0),
+    )
+    with _caches_lock:
+        cache = _caches.get(settings)
+        if cache is None:
+            cache = tool_cache(*settings)
+            _caches[settings] = cache
+        return cache
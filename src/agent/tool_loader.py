@@ -1,28 +1,33 @@
+import importlib
 from omegaconf import DictConfig
-from langchain_community.tools.ddg_search import DuckDuckGoSearchRun
-from langchain_community.tools.file_management import (
-    ReadFileTool,
-    WriteFileTool,
-    FileSearchTool,
-    ListDirectoryTool,
-)
-from langchain_community.tools.shell import ShellTool
+from src.agent.tool_cache import WRITE_TOOLS, cached_tool, get_tool_cache, invalidating_tool
+
+# Config name -> (module, class). Modules are imported only for the tools
+# listed in agent.tools.
+TOOLS = {
+    "web_search": ("langchain_community.tools.ddg_search", "DuckDuckGoSearchRun"),
+    "shell": ("langchain_community.tools.shell", "ShellTool"),
+    "file_read": ("langchain_community.tools.file_management", "ReadFileTool"),
+    "file_write": ("langchain_community.tools.file_management", "WriteFileTool"),
+    "file_search": ("langchain_community.tools.file_management", "FileSearchTool"),
+    "list_directory": ("langchain_community.tools.file_management", "ListDirectoryTool"),
+}
 
 def load_tools(cfg: DictConfig):
     tools = []
-    
+    cache = get_tool_cache(cfg)
+    cached = set(cfg.agent.tool_cache.tools) if cache else set()
+
     for tool_name in cfg.agent.tools:
-        if tool_name == "web_search":
-            tools.append(DuckDuckGoSearchRun())
-        elif tool_name == "shell":
-            tools.append(ShellTool())
-        elif tool_name == "file_read":
-            tools.append(ReadFileTool())
-        elif tool_name == "file_write":
-            tools.append(WriteFileTool())
-        elif tool_name == "file_search":
-            tools.append(FileSearchTool())
-        elif tool_name == "list_directory":
-            tools.append(ListDirectoryTool())
-            
-    return tools
\ No newline at end of file
+        if tool_name not in TOOLS:
+            continue
+        module_name, class_name = TOOLS[tool_name]
+        tool = getattr(importlib.import_module(module_name), class_name)()
+
+        if tool_name in cached:
+            tool = cached_tool(tool, tool_name, cache)
+        elif cache and tool_name in WRITE_TOOLS:
+            tool = invalidating_tool(tool, cache)
+        tools.append(tool)
+
+    return tools
@@ -2,10 +2,9 @@ import argparse
 import json
 from pathlib import Path
 from omegaconf import OmegaConf
-from src.agent.react_agent import react_agent
 from dotenv import load_dotenv, find_dotenv
 import os
-import langchain
+from typing import Callable, Optional
 
 # Load environment variables
 load_dotenv(find_dotenv('.env.local'))
@@ -25,6 +24,38 @@ def load_lora_config(lora_name: str) -> str:
             
     raise ValueError(f"LoRA '{lora_name}' not found in the registry.")
 
+def run_remote(address: str, prompt: str, session: Optional[str] = None, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Sends a prompt to a running agent server (http://host:port or unix:/path)
+    and returns the final answer. Streamed tokens are passed to `on_token`.
+    """
+    import httpx
+
+    if address.startswith("unix:"):
+        client = httpx.Client(transport=httpx.HTTPTransport(uds=address[len("unix:"):]), base_url="http://agent", timeout=None)
+    else:
+        client = httpx.Client(base_url=address, timeout=None)
+
+    try:
+        with client, client.stream("POST", "/run", json={"prompt": prompt, "session": session}) as response:
+            if response.status_code != 200:
+                response.read()
+                raise RuntimeError(response.json().get("error", f"HTTP {response.status_code}"))
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "token":
+                    if on_token:
+                        on_token(event["text"])
+                elif event["type"] == "result":
+                    return event["output"]
+                elif event["type"] == "error":
+                    raise RuntimeError(event["error"])
+    except httpx.TransportError as e:
+        raise RuntimeError(f"Could not reach the agent server at {address}: {e}") from e
+    raise RuntimeError("Agent server closed the stream without a result.")
+
 def main():
     """
     Runs a single chat prompt with the agent and exits.
@@ -33,13 +64,34 @@ def main():
     parser.add_argument("--prompt", type=str, required=True, help="The prompt to send to the agent.")
     parser.add_argument("--lora", type=str, help="The name of the LoRA model to use.")
     parser.add_argument("--lang_debug", action="store_true", help="Enable langchain debug mode.")
+    parser.add_argument("--server", type=str, help="Send the prompt to a running agent server (http://host:port or unix:/path).")
+    parser.add_argument("--session", type=str, help="Session id on the server, to keep conversation memory between prompts.")
+    parser.add_argument("--stream", action="store_true", help="Print tokens as the server streams them.")
     args = parser.parse_args()
 
+    if args.server:
+        if args.lora:
+            print("Note: --lora is ignored with --server; the server's configured model is used.")
+        on_token = (lambda token: print(token, end="", flush=True)) if args.stream else None
+        try:
+            result = run_remote(args.server, args.prompt, session=args.session, on_token=on_token)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            return
+        if args.stream:
+            print()
+        print(result)
+        return
+
     # Load base config
     cfg = OmegaConf.load(Path(__file__).parent.parent.parent / "config/settings.yaml")
 
+    # Heavy imports are deferred until the arguments are known to be valid
+    from langchain_core.globals import set_debug
+    from src.agent.react_agent import react_agent
+
     # Set langchain debug mode
-    langchain.debug = args.lang_debug
+    set_debug(args.lang_debug)
     
     # Check for LoRA override
     if args.lora:
@@ -2,10 +2,8 @@ import hydra
 import json
 from pathlib import Path
 from omegaconf import DictConfig, OmegaConf
-from src.agent.react_agent import react_agent
 from dotenv import load_dotenv, find_dotenv
 import os
-import langchain
 load_dotenv(find_dotenv('.env.local'))
 
 def load_lora_config(lora_name: str) -> str:
@@ -25,8 +23,12 @@ def load_lora_config(lora_name: str) -> str:
 
 @hydra.main(config_path="../../config", config_name="settings", version_base=None)
 def main(cfg: DictConfig) -> None:
+    # Heavy imports are deferred until hydra has parsed the config
+    from langchain_core.globals import set_debug
+    from src.agent.react_agent import react_agent
+
     # Set langchain debug mode based on the command-line argument
-    langchain.debug = cfg.get('lang_debug', False)
+    set_debug(cfg.get('lang_debug', False))
     
     # Check for LoRA override
     lora_name = cfg.get("lora")
@@ -0,0 +1,51 @@
+import argparse
+from pathlib import Path
+from omegaconf import OmegaConf
+from dotenv import load_dotenv, find_dotenv
+
+# Load environment variables
+load_dotenv(find_dotenv('.env.local'))
+
+def main():
+    """
+    Runs the agent server: a pool of warm agents that chat.py --server talks to.
+    """
+    cfg = OmegaConf.load(Path(__file__).parent.parent.parent / "config/settings.yaml")
+    server_cfg = cfg.get("server") or {}
+
+    parser = argparse.ArgumentParser(description="Serve warm agents over localhost HTTP or a Unix socket.")
+    parser.add_argument("--host", type=str, default=server_cfg.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=server_cfg.get("port", 8765))
+    parser.add_argument("--socket", type=str, default=server_cfg.get("socket"), help="Listen on this Unix socket instead of TCP.")
+    parser.add_argument("--workers", type=int, default=server_cfg.get("workers", 4), help="Number of warm agents.")
+    parser.add_argument("--max_sessions", type=int, default=server_cfg.get("max_sessions", 256))
+    args = parser.parse_args()
+
+    from src.agent.react_agent import react_agent
+    from src.agent.server import agent_pool, make_server
+    from src.memory.memory_factory import get_memory
+
+    # Session memories stay in RAM, so sessions never share a persisted store
+    session_cfg = cfg.copy()
+    session_cfg.memory.persist_path = None
+
+    print(f"--- Warming {args.workers} agents ---")
+    pool = agent_pool(lambda: react_agent(cfg, with_memory=False), lambda: get_memory(session_cfg), workers=args.workers, max_sessions=args.max_sessions)
+    server = make_server(
+        pool,
+        host=args.host,
+        port=args.port,
+        socket_path=args.socket,
+        queue_timeout=server_cfg.get("queue_timeout", 300.0),
+        verbose=cfg.debug,
+    )
+    print(f"--- Serving on {'unix:' + args.socket if args.socket else f'http://{args.host}:{args.port}'} ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n--- Server Stopped ---")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
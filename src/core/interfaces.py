@@ -1,11 +1,34 @@
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
+
+from src.core.schema import chat_result
 
 class llm(ABC):
     @abstractmethod
     def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
         ...
 
+    def chat_batch(
+        self,
+        conversations: Iterable[List[Dict[str, str]]],
+        max_concurrency: int = 16,
+        ordered: bool = False,
+        **kwargs,
+    ) -> Iterator[chat_result]:
+        """
+        Runs many conversations and yields a chat_result for each as it finishes.
+        This fallback runs them one at a time; providers override it to fan out.
+        """
+        for index, messages in enumerate(conversations):
+            started = time.perf_counter()
+            try:
+                content = self.chat(messages, **kwargs)
+            except Exception as e:
+                yield chat_result(index=index, error=str(e), latency=time.perf_counter() - started)
+                continue
+            yield chat_result(index=index, content=content, latency=time.perf_counter() - started)
+
 class agent(ABC):
     @abstractmethod
     def run(self, task: str) -> str:
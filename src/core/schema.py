@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class agent_task(BaseModel):
     description: str
@@ -9,6 +9,19 @@ class agent_result(BaseModel):
     output: str
     iterations: int
 
+class chat_result(BaseModel):
+    """One conversation's outcome from llm.chat_batch."""
+    index: int
+    content: Optional[str] = None
+    error: Optional[str] = None
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+
+# One chat message of a training example: {"role": ..., "content": ...}.
+Message = Dict[str, str]
+
 class Example(BaseModel):
     messages: List[dict]
     meta: dict = Field(default_factory=dict)
\ No newline at end of file
@@ -0,0 +1,76 @@
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+# Used when tiktoken is unavailable: one token per word or punctuation mark,
+# which tracks BPE counts closely enough for budgeting English text and code.
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None
+_encoding_loaded = False
+
+def get_encoding():
+    """
+    The local BPE tokenizer (tiktoken cl100k_base), or None when tiktoken is
+    not installed or its vocabulary file cannot be loaded (e.g. offline with an
+    empty cache). Callers fall back to the regex approximation.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+def tokenizer_name() -> str:
+    """Which tokenizer counts are made with: the tiktoken encoding's name, or "regex"."""
+    encoding = get_encoding()
+    return encoding.name if encoding is not None else "regex"
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Token count of `text`; memoised, since agent prompts resend the same messages."""
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN.findall(text))
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """Token counts for many texts at once, using tiktoken's batched encoder when available."""
+    encoding = get_encoding()
+    if encoding is not None:
+        return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
+    return [len(_APPROX_TOKEN.findall(text)) for text in texts]
+
+def token_offsets(text: str) -> List[int]:
+    """Character offset in `text` at which each of its tokens starts."""
+    encoding = get_encoding()
+    if encoding is not None:
+        _, offsets = encoding.decode_with_offsets(encoding.encode(text, disallowed_special=()))
+        return offsets
+    return [m.start() for m in _APPROX_TOKEN.finditer(text)]
+
+def truncate_middle(text: str, max_tokens: int, marker: Optional[str] = None) -> str:
+    """
+    Shortens `text` to about `max_tokens` by keeping its head and tail and
+    replacing the middle with a marker noting how many tokens were dropped.
+    """
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    head = max_tokens * 2 // 3
+    tail = max_tokens - head
+    note = marker or f"\n... [{total - max_tokens} tokens truncated] ...\n"
+
+    encoding = get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:head]) + note + (encoding.decode(tokens[-tail:]) if tail else "")
+
+    spans = [m.span() for m in _APPROX_TOKEN.finditer(text)]
+    head_end = spans[head - 1][1] if head else 0
+    tail_start = spans[-tail][0] if tail else len(text)
+    return text[:head_end] + note + text[tail_start:]
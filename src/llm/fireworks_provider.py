@@ -1,14 +1,28 @@
 import os
+import re
+import asyncio
+import contextlib
+import queue
+import threading
+import time
 import httpx
-import json
-from typing import Any, List, Iterator, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Iterator, Optional, Tuple, TypeVar
 
-from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage, AIMessageChunk
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage, AIMessageChunk, convert_to_messages
 from langchain_core.outputs import ChatResult, ChatGeneration, ChatGenerationChunk
 
 from src.core.interfaces import llm
+from src.core.schema import chat_result
+from src.llm import transport
+from src.llm.rate_limit import rate_limiter
+from src.llm.response_cache import get_response_cache, response_cache
+from src.llm.retry import backoff_delay, get_latency_tracker, is_retryable, latency_tracker
+from src.llm.sse import DONE, aiter_content, iter_content
+
+T = TypeVar("T")
 
 def convert_message_to_dict(message: BaseMessage) -> dict:
     """Convert a LangChain message to a dictionary."""
@@ -21,6 +35,80 @@ def convert_message_to_dict(message: BaseMessage) -> dict:
     else:
         raise TypeError(f"Unsupported message type: {type(message)}")
 
+# Word-sized pieces (with their trailing whitespace) used to replay a cached
+# completion as a stream; joining them reproduces the content exactly.
+_REPLAY_PIECE = re.compile(r"\S+\s*|\s+")
+
+class _stream_attempt:
+    """
+    An open streaming response whose first content delta has already been read,
+    so hedged attempts can race on time-to-first-token.
+    """
+    def __init__(self, stack: contextlib.ExitStack, chunks: Iterator[bytes]):
+        self._stack = stack
+        self._contents = iter_content(chunks)
+        self._buffered: List[str] = []
+        self.complete = False
+
+    def read_first(self):
+        for content in self._contents:
+            if content is DONE:
+                self.complete = True
+            else:
+                self._buffered.append(content)
+            return
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._buffered
+        for content in self._contents:
+            if content is DONE:
+                self.complete = True
+            else:
+                yield content
+
+    def close(self):
+        self._stack.close()
+
+class _astream_attempt:
+    """Async counterpart of _stream_attempt."""
+    def __init__(self, stack: contextlib.AsyncExitStack, chunks: AsyncIterator[bytes]):
+        self._stack = stack
+        self._contents = aiter_content(chunks)
+        self._buffered: List[str] = []
+        self.complete = False
+
+    async def read_first(self):
+        async for content in self._contents:
+            if content is DONE:
+                self.complete = True
+            else:
+                self._buffered.append(content)
+            return
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        for content in self._buffered:
+            yield content
+        async for content in self._contents:
+            if content is DONE:
+                self.complete = True
+            else:
+                yield content
+
+    async def aclose(self):
+        await self._stack.aclose()
+
+# Threads for hedged attempts on the sync path, created on first use. Losing
+# attempts finish here in the background and their results are discarded.
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="fireworks-hedge")
+        return _hedge_pool
+
 class fireworks_chat(BaseChatModel, llm):
     """
     A custom chat model provider for Fireworks AI that inherits from BaseChatModel.
@@ -29,55 +117,318 @@ class fireworks_chat(BaseChatModel, llm):
     temperature: float = 0.2
     streaming: bool = False
     api_base: str = "https://api.fireworks.ai/inference/v1"
+    # Connection pool settings, shared by every provider with the same values.
+    http2: bool = False
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+    # Upper bound on in-flight async requests per event loop.
+    max_concurrency: int = 64
+    # Opt-in response cache keyed by a hash of the request payload. Not named
+    # `cache`, which is BaseLanguageModel's hook into LangChain's global cache.
+    cache_responses: bool = False
+    cache_path: Optional[str] = "data/llm_cache.sqlite"
+    cache_ttl: Optional[float] = None
+    cache_memory_entries: int = 1024
+    cache_max_bytes: int = 256 * 1024 * 1024
+    # Retries with jittered exponential backoff (Retry-After is honoured).
+    max_retries: int = 3
+    retry_backoff: float = 0.5
+    retry_backoff_max: float = 30.0
+    # Hedged requests: if no first token has arrived after the recent p95
+    # time-to-first-token (or hedge_after seconds until hedge_min_samples calls
+    # have been seen), a duplicate request is sent and the first to answer wins.
+    hedge: bool = False
+    hedge_after: float = 2.0
+    hedge_min_samples: int = 20
 
-    def _generate(
-        self,
-        messages: List[BaseMessage],
-        stop: Optional[List[str]] = None,
-        run_manager: Optional[CallbackManagerForLLMRun] = None,
-        **kwargs: Any,
-    ) -> ChatResult:
-        """
-        Generate a chat response from the Fireworks AI API.
-        """
-        if self.streaming:
-            completion = ""
-            for chunk in self._stream(messages, stop, run_manager, **kwargs):
-                completion += chunk.message.content
-            message = AIMessage(content=completion)
-            return ChatResult(generations=[ChatGeneration(message=message)])
+    @property
+    def client(self) -> httpx.Client:
+        """The process-wide keep-alive client for this provider's transport settings."""
+        return transport.get_client(self._transport_key())
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """The keep-alive async client shared on the running event loop."""
+        return transport.get_async_client(self._transport_key())
 
+    def _transport_key(self) -> tuple:
+        return transport.transport_key(
+            self.http2,
+            self.max_connections,
+            self.max_keepalive_connections,
+            self.keepalive_expiry,
+            self.timeout,
+            self.connect_timeout,
+        )
+
+    def _headers(self) -> dict:
         api_key = os.getenv("FIREWORKS_API_KEY")
         if not api_key:
             raise ValueError("Fireworks API key not set. Please set the FIREWORKS_API_KEY environment variable.")
 
-        headers = {
+        return {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
-        
-        message_dicts = [convert_message_to_dict(m) for m in messages]
 
-        body = {
+    def _body(self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> dict:
+        return {
             "model": self.model,
-            "messages": message_dicts,
+            "messages": [convert_message_to_dict(m) for m in messages],
             "temperature": self.temperature,
             "stop": stop,
             **kwargs,
         }
 
-        with httpx.Client() as client:
-            response = client.post(
-                f"{self.api_base}/chat/completions",
-                headers=headers,
-                json=body,
-                timeout=60,
+    def _cache(self) -> Optional[response_cache]:
+        if not self.cache_responses:
+            return None
+        return get_response_cache(self.cache_path, self.cache_memory_entries, self.cache_max_bytes, self.cache_ttl)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the response cache (empty when caching is off)."""
+        cache = self._cache()
+        return cache.stats() if cache else {}
+
+    @staticmethod
+    def _cache_key(body: dict) -> str:
+        # Streaming and non-streaming requests for the same payload share an entry.
+        return response_cache.key({k: v for k, v in body.items() if k != "stream"})
+
+    @staticmethod
+    def _cached_response(content: str, usage: Optional[dict] = None) -> dict:
+        return {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage or {}}
+
+    def _replay(self, cached: dict) -> Iterator[ChatGenerationChunk]:
+        for piece in _REPLAY_PIECE.findall(cached["choices"][0]["message"]["content"]):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    def _tracker(self) -> latency_tracker:
+        return get_latency_tracker((self.api_base, self.model))
+
+    def request_stats(self) -> dict:
+        """Request, retry and hedge counters plus recent time-to-first-token percentiles."""
+        return self._tracker().stats()
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        return self._tracker().hedge_delay(self.hedge_after, self.hedge_min_samples)
+
+    def _call(self, attempt: Callable[[], T], discard: Callable[[T], None]) -> Tuple[T, dict]:
+        """
+        Runs `attempt` until it produces its first token, retrying failures that
+        are worth retrying and hedging slow attempts. Returns the result with the
+        call's time-to-first-token, retry count and whether it was hedged.
+        """
+        started = time.perf_counter()
+        retries = 0
+        while True:
+            try:
+                result, hedged = self._hedged(attempt, discard)
+                break
+            except Exception as e:
+                if retries >= self.max_retries or not is_retryable(e):
+                    self._tracker().record(None, retries)
+                    raise
+                time.sleep(backoff_delay(retries, e, self.retry_backoff, self.retry_backoff_max))
+                retries += 1
+        ttft = time.perf_counter() - started
+        self._tracker().record(ttft, retries)
+        return result, {"ttft": ttft, "retries": retries, "hedged": hedged}
+
+    def _hedged(self, attempt: Callable[[], T], discard: Callable[[T], None]) -> Tuple[T, bool]:
+        delay = self._hedge_delay()
+        if delay is None:
+            return attempt(), False
+
+        pool = _get_hedge_pool()
+        primary = pool.submit(attempt)
+        if wait([primary], timeout=delay).done:
+            return primary.result(), False
+
+        tracker = self._tracker()
+        tracker.hedges += 1
+        backup = pool.submit(attempt)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = None
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                elif winner is None:
+                    winner = future
+                else:
+                    discard(future.result())
+            if winner is not None:
+                for loser in pending:
+                    loser.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+                if winner is backup:
+                    tracker.hedge_wins += 1
+                return winner.result(), True
+        raise error
+
+    async def _acall(self, attempt: Callable[[], Awaitable[T]], discard: Callable[[T], Awaitable[None]]) -> Tuple[T, dict]:
+        """Async counterpart of _call."""
+        started = time.perf_counter()
+        retries = 0
+        while True:
+            try:
+                result, hedged = await self._ahedged(attempt, discard)
+                break
+            except Exception as e:
+                if retries >= self.max_retries or not is_retryable(e):
+                    self._tracker().record(None, retries)
+                    raise
+                await asyncio.sleep(backoff_delay(retries, e, self.retry_backoff, self.retry_backoff_max))
+                retries += 1
+        ttft = time.perf_counter() - started
+        self._tracker().record(ttft, retries)
+        return result, {"ttft": ttft, "retries": retries, "hedged": hedged}
+
+    async def _ahedged(self, attempt: Callable[[], Awaitable[T]], discard: Callable[[T], Awaitable[None]]) -> Tuple[T, bool]:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await attempt(), False
+
+        primary = asyncio.ensure_future(attempt())
+        pending = {primary}
+        error = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result(), False
+
+            tracker = self._tracker()
+            tracker.hedges += 1
+            backup = asyncio.ensure_future(attempt())
+            pending.add(backup)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = None
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    elif winner is None:
+                        winner = task
+                    else:
+                        await discard(task.result())
+                if winner is not None:
+                    if winner is backup:
+                        tracker.hedge_wins += 1
+                    return winner.result(), True
+            raise error
+        finally:
+            # Losing attempts, and every attempt if the caller is cancelled, are
+            # cancelled; their stream contexts close themselves.
+            for task in pending:
+                task.cancel()
+
+    def _post(self, body: dict) -> dict:
+        response = self.client.post(f"{self.api_base}/chat/completions", headers=self._headers(), json=body)
+        response.raise_for_status()
+        return response.json()
+
+    def _open_stream(self, body: dict) -> _stream_attempt:
+        stack = contextlib.ExitStack()
+        try:
+            response = stack.enter_context(
+                self.client.stream("POST", f"{self.api_base}/chat/completions", headers=self._headers(), json=body)
             )
             response.raise_for_status()
+            attempt = _stream_attempt(stack, response.iter_bytes())
+            attempt.read_first()
+            return attempt
+        except BaseException:
+            stack.close()
+            raise
+
+    async def _apost(self, body: dict) -> dict:
+        headers = self._headers()
+        async with transport.get_semaphore(self._transport_key(), self.max_concurrency):
+            response = await self.async_client.post(f"{self.api_base}/chat/completions", headers=headers, json=body)
+            response.raise_for_status()
+        return response.json()
+
+    async def _aopen_stream(self, body: dict) -> _astream_attempt:
+        headers = self._headers()
+        stack = contextlib.AsyncExitStack()
+        try:
+            # The semaphore slot is held for the life of the stream.
+            await stack.enter_async_context(transport.get_semaphore(self._transport_key(), self.max_concurrency))
+            response = await stack.enter_async_context(
+                self.async_client.stream("POST", f"{self.api_base}/chat/completions", headers=headers, json=body)
+            )
+            response.raise_for_status()
+            attempt = _astream_attempt(stack, response.aiter_bytes())
+            await attempt.read_first()
+            return attempt
+        except BaseException:
+            await stack.aclose()
+            raise
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        Generate a chat response from the Fireworks AI API.
+        """
+        if self.streaming:
+            parts = [chunk.message.content for chunk in self._stream(messages, stop, run_manager, **kwargs)]
+            message = AIMessage(content="".join(parts))
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        return self._create_chat_result(*self._completion(messages, stop, **kwargs))
 
-        response_json = response.json()
+    def _completion(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> Tuple[dict, dict]:
+        """
+        Performs one non-streaming completion request and returns the response
+        JSON together with the call stats from _call.
+        """
+        body = self._body(messages, stop, **kwargs)
+        cache = self._cache()
+        if cache:
+            key = self._cache_key(body)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached, {"ttft": 0.0, "retries": 0, "hedged": False, "cached": True}
+
+        response_json, call_stats = self._call(lambda: self._post(body), lambda _: None)
+
+        if cache:
+            cache.put(key, self._cached_response(response_json["choices"][0]["message"]["content"], response_json.get("usage")))
+        return response_json, call_stats
+
+    def _create_chat_result(self, response_json: dict, call_stats: dict) -> ChatResult:
         message = AIMessage(content=response_json["choices"][0]["message"]["content"])
-        return ChatResult(generations=[ChatGeneration(message=message)])
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={"token_usage": response_json.get("usage") or {}, "model_name": self.model, **call_stats},
+        )
+
+    def _combine_llm_outputs(self, llm_outputs: List[Optional[dict]]) -> dict:
+        outputs = [output for output in llm_outputs if output]
+        if len(outputs) == 1:
+            return outputs[0]
+        token_usage: Dict[str, int] = {}
+        for output in outputs:
+            for name, count in output.get("token_usage", {}).items():
+                token_usage[name] = token_usage.get(name, 0) + count
+        return {
+            "token_usage": token_usage,
+            "model_name": self.model,
+            "retries": sum(output.get("retries", 0) for output in outputs),
+            "hedged": any(output.get("hedged") for output in outputs),
+        }
 
     def _stream(
         self,
@@ -86,45 +437,112 @@ class fireworks_chat(BaseChatModel, llm):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> Iterator[ChatGenerationChunk]:
-        api_key = os.getenv("FIREWORKS_API_KEY")
-        if not api_key:
-            raise ValueError("Fireworks API key not set. Please set the FIREWORKS_API_KEY environment variable.")
+        body = self._body(messages, stop, stream=True, **kwargs)
+        cache = self._cache()
+        if cache:
+            key = self._cache_key(body)
+            cached = cache.get(key)
+            if cached is not None:
+                for chunk in self._replay(cached):
+                    yield chunk
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.message.content)
+                return
 
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        
-        message_dicts = [convert_message_to_dict(m) for m in messages]
+        attempt, call_stats = self._call(lambda: self._open_stream(body), _stream_attempt.close)
+        parts = []
+        try:
+            for content in attempt:
+                # The first chunk carries the call stats (ttft, retries, hedged).
+                chunk = ChatGenerationChunk(
+                    message=AIMessageChunk(content=content),
+                    generation_info=None if parts else call_stats,
+                )
+                parts.append(content)
+                yield chunk
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.message.content)
+        finally:
+            attempt.close()
 
-        body = {
-            "model": self.model,
-            "messages": message_dicts,
-            "temperature": self.temperature,
-            "stop": stop,
-            "stream": True,
-            **kwargs,
-        }
+        # Only complete streams are cached; an interrupted one would replay truncated.
+        if cache and attempt.complete:
+            cache.put(key, self._cached_response("".join(parts)))
 
-        with httpx.stream("POST", f"{self.api_base}/chat/completions", headers=headers, json=body, timeout=60) as response:
-            response.raise_for_status()
-            for line in response.iter_lines():
-                if line.startswith("data: "):
-                    line = line[6:]
-                    if line.strip() == "[DONE]":
-                        break
-                    try:
-                        chunk_data = json.loads(line)
-                        delta = chunk_data["choices"][0]["delta"]
-                        if "content" in delta and delta["content"] is not None:
-                            message = AIMessageChunk(content=delta["content"])
-                            chunk = ChatGenerationChunk(message=message)
-                            yield chunk
-                            if run_manager:
-                                run_manager.on_llm_new_token(chunk.message.content)
-                    except json.JSONDecodeError:
-                        # Skip empty or malformed lines
-                        pass
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        Native async counterpart of _generate, run on the shared AsyncClient.
+        """
+        if self.streaming:
+            parts = []
+            async for chunk in self._astream(messages, stop, run_manager, **kwargs):
+                parts.append(chunk.message.content)
+            message = AIMessage(content="".join(parts))
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        return self._create_chat_result(*await self._acompletion(messages, stop, **kwargs))
+
+    async def _acompletion(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> Tuple[dict, dict]:
+        """Async counterpart of _completion."""
+        body = self._body(messages, stop, **kwargs)
+        cache = self._cache()
+        if cache:
+            key = self._cache_key(body)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached, {"ttft": 0.0, "retries": 0, "hedged": False, "cached": True}
+
+        async def discard(_):
+            pass
+
+        response_json, call_stats = await self._acall(lambda: self._apost(body), discard)
+
+        if cache:
+            cache.put(key, self._cached_response(response_json["choices"][0]["message"]["content"], response_json.get("usage")))
+        return response_json, call_stats
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        body = self._body(messages, stop, stream=True, **kwargs)
+        cache = self._cache()
+        if cache:
+            key = self._cache_key(body)
+            cached = cache.get(key)
+            if cached is not None:
+                for chunk in self._replay(cached):
+                    yield chunk
+                    if run_manager:
+                        await run_manager.on_llm_new_token(chunk.message.content)
+                return
+
+        attempt, call_stats = await self._acall(lambda: self._aopen_stream(body), _astream_attempt.aclose)
+        parts = []
+        try:
+            async for content in attempt:
+                chunk = ChatGenerationChunk(
+                    message=AIMessageChunk(content=content),
+                    generation_info=None if parts else call_stats,
+                )
+                parts.append(content)
+                yield chunk
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.message.content)
+        finally:
+            await attempt.aclose()
+
+        if cache and attempt.complete:
+            cache.put(key, self._cached_response("".join(parts)))
 
     @property
     def _llm_type(self) -> str:
@@ -132,4 +550,147 @@ class fireworks_chat(BaseChatModel, llm):
 
     def chat(self, messages: list, **kwargs) -> str:
         response = self.invoke(messages, **kwargs)
-        return response.content
\ No newline at end of file
+        return response.content
+
+    def chat_batch(
+        self,
+        conversations: Iterable[List[Dict[str, str]]],
+        max_concurrency: int = 16,
+        ordered: bool = False,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Iterator[chat_result]:
+        """
+        Fans conversations out concurrently and yields a chat_result for each one,
+        in completion order, or in input order when `ordered` is set.
+
+        The requests run on an event loop in a background thread, so this can be
+        called from plain synchronous code. At most `max_concurrency` results
+        wait for a slow consumer; until it catches up no new requests are sent.
+        Stopping iteration early cancels the requests that are still outstanding.
+        """
+        results: queue.Queue = queue.Queue()
+        finished = object()
+        started = threading.Event()
+        running: Dict[str, Any] = {}
+
+        async def pump():
+            # One credit per result waiting in the queue; the consumer gives it back.
+            credits = asyncio.Semaphore(max_concurrency)
+            running.update(loop=asyncio.get_running_loop(), task=asyncio.current_task(), credits=credits)
+            started.set()
+            try:
+                async for result in self.achat_batch(
+                    conversations,
+                    max_concurrency=max_concurrency,
+                    ordered=ordered,
+                    requests_per_minute=requests_per_minute,
+                    tokens_per_minute=tokens_per_minute,
+                    **kwargs,
+                ):
+                    await credits.acquire()
+                    results.put(result)
+            finally:
+                await transport.aclose_clients()
+
+        def run():
+            try:
+                asyncio.run(pump())
+            except BaseException as e:
+                results.put(e)
+            finally:
+                started.set()
+            results.put(finished)
+
+        worker = threading.Thread(target=run, name="fireworks-chat-batch", daemon=True)
+        worker.start()
+        done = False
+        try:
+            while True:
+                item = results.get()
+                if item is finished:
+                    done = True
+                    break
+                if isinstance(item, BaseException):
+                    done = True
+                    raise item
+                try:
+                    running["loop"].call_soon_threadsafe(running["credits"].release)
+                except RuntimeError:
+                    pass  # the batch has finished and its loop is closed
+                yield item
+        finally:
+            if not done:
+                # Stopped early: cancel the batch, which cancels its in-flight requests.
+                started.wait()
+                try:
+                    running["loop"].call_soon_threadsafe(running["task"].cancel)
+                except (KeyError, RuntimeError):
+                    pass  # it never started, or has already finished
+            worker.join()
+
+    async def achat_batch(
+        self,
+        conversations: Iterable[List[Dict[str, str]]],
+        max_concurrency: int = 16,
+        ordered: bool = False,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[chat_result]:
+        """
+        Async form of chat_batch. At most `max_concurrency` requests are in flight
+        and, when `ordered`, at most that many finished results are held back
+        waiting for an earlier one, so memory stays bounded for any input size.
+        """
+        limiter = rate_limiter(requests_per_minute, tokens_per_minute)
+
+        async def run_one(index: int, conversation) -> chat_result:
+            await limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response_json, call_stats = await self._acompletion(convert_to_messages(conversation), **kwargs)
+            except Exception as e:
+                return chat_result(index=index, error=str(e), latency=time.perf_counter() - started)
+            usage = response_json.get("usage") or {}
+            limiter.consume(usage.get("total_tokens", 0))
+            return chat_result(
+                index=index,
+                content=response_json["choices"][0]["message"]["content"],
+                latency=time.perf_counter() - started,
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                retries=call_stats["retries"],
+            )
+
+        pending = set()
+        finished: Dict[int, chat_result] = {}
+        next_index = 0
+        source = enumerate(conversations)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) + len(finished) < max_concurrency:
+                    try:
+                        index, conversation = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(run_one(index, conversation)))
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if not ordered:
+                        yield result
+                        continue
+                    finished[result.index] = result
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in pending:
+                task.cancel()
@@ -1,12 +1,20 @@
+import importlib
 from omegaconf import DictConfig
 from src.core.interfaces import llm
-from src.llm.fireworks_provider import fireworks_chat
+
+# Provider name -> (module, class). The module is only imported when the
+# provider is selected.
+PROVIDERS = {
+    "fireworks": ("src.llm.fireworks_provider", "fireworks_chat"),
+}
 
 def get_llm(cfg: DictConfig) -> llm:
     provider = cfg.llm.provider
     
-    if provider == "fireworks":
-        # Pass the entire fireworks config to the constructor
-        return fireworks_chat(**cfg.llm.fireworks)
+    if provider in PROVIDERS:
+        module_name, class_name = PROVIDERS[provider]
+        provider_cls = getattr(importlib.import_module(module_name), class_name)
+        # Pass the provider's config section to the constructor
+        return provider_cls(**cfg.llm[provider])
     else:
-        raise ValueError(f"Unsupported LLM provider: {provider}")
\ No newline at end of file
+        raise ValueError(f"Unsupported LLM provider: {provider}")
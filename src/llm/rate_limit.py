@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import Optional
+
+class _bucket:
+    """A token bucket refilled continuously at `per_minute` units per minute."""
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self.refill()
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+class rate_limiter:
+    """
+    Async limiter for provider per-minute quotas.
+
+    Requests are admitted against `requests_per_minute` up front. Token usage is
+    only known once a response arrives, so it is debited afterwards through
+    `consume`; a bucket driven below zero holds back later requests until it
+    has refilled.
+    """
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self._requests = _bucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _bucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                delay = 0.0
+                if self._requests:
+                    delay = max(delay, self._requests.wait_time(1))
+                if self._tokens:
+                    delay = max(delay, self._tokens.wait_time(0))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            if self._requests:
+                self._requests.level -= 1
+
+    def consume(self, tokens: int):
+        if self._tokens:
+            self._tokens.refill()
+            self._tokens.level -= tokens
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+class response_cache:
+    """
+    A two-tier, content-addressed cache for LLM responses.
+
+    Lookups go to an in-memory LRU first and then to an optional SQLite file,
+    promoting disk hits into memory. Entries older than `ttl` seconds are
+    treated as misses and dropped. The disk tier is kept under `max_bytes` by
+    evicting the least recently used rows.
+    """
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_entries: int = 1024,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_bytes = 0
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def key(payload: Dict[str, Any]) -> str:
+        """Hashes a request payload (model, messages, temperature, stop, extra kwargs)."""
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, size, created FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, size, created = row
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                        value = json.loads(value)
+                        self._remember(key, created, value)
+                        self.hits += 1
+                        return value
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._disk_bytes -= size
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is None:
+                return
+            blob = json.dumps(value, separators=(",", ":")).encode("utf-8")
+            previous = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._disk_bytes += len(blob) - (previous[0] if previous else 0)
+            self._evict_disk()
+
+    def _remember(self, key: str, created: float, value: Any):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_bytes:
+            rows = self._db.execute("SELECT key, size FROM entries ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in rows])
+            self._disk_bytes -= sum(size for _, size in rows)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.hits - self.memory_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._disk_bytes = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+_caches: Dict[Tuple, response_cache] = {}
+_caches_lock = threading.Lock()
+
+def get_response_cache(path: Optional[str], memory_entries: int, max_bytes: int, ttl: Optional[float]) -> response_cache:
+    """Returns the process-wide cache for the given settings, so providers share one SQLite handle."""
+    settings = (path, memory_entries, max_bytes, ttl)
+    with _caches_lock:
+        cache = _caches.get(settings)
+        if cache is None:
+            cache = response_cache(path, memory_entries, max_bytes, ttl)
+            _caches[settings] = cache
+        return cache
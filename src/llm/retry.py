@@ -0,0 +1,96 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, server errors and transport failures are worth another attempt."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, httpx.TransportError)
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """Parses a Retry-After header given either as seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, error: BaseException, base: float, cap: float) -> float:
+    """
+    Full-jitter exponential backoff for the given retry attempt (0-based). A
+    server-supplied Retry-After wins when present, even beyond the cap.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        delay = retry_after(error.response)
+        if delay is not None:
+            return delay
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class latency_tracker:
+    """
+    Rolling time-to-first-token samples and retry/hedge counters for one
+    provider configuration. The p95 of recent samples sets the hedge delay.
+    """
+    def __init__(self, window: int = 256):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, ttft: Optional[float], retries: int):
+        """Records one call; `ttft` is None when the call ultimately failed."""
+        with self._lock:
+            if ttft is not None:
+                self._samples.append(ttft)
+            self.requests += 1
+            self.retries += retries
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def hedge_delay(self, fallback: float, min_samples: int) -> float:
+        with self._lock:
+            enough = len(self._samples) >= min_samples
+        return self.percentile(0.95) if enough else fallback
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "ttft_p50": self.percentile(0.5),
+            "ttft_p95": self.percentile(0.95),
+        }
+
+_trackers: Dict[tuple, latency_tracker] = {}
+_trackers_lock = threading.Lock()
+
+def get_latency_tracker(key: tuple) -> latency_tracker:
+    """Returns the process-wide tracker for an endpoint, so p95 history outlives provider instances."""
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = latency_tracker()
+            _trackers[key] = tracker
+        return tracker
@@ -0,0 +1,115 @@
+import json
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib parser accepts bytes too
+    _loads = json.loads
+
+DONE = object()
+
+class sse_decoder:
+    """
+    Incremental decoder for `text/event-stream` bodies.
+
+    Bytes are fed as they arrive off the socket, in whatever sizes the
+    transport delivers. A frame split across chunks is held until its line
+    ends, multi-line `data:` fields are joined with newlines as the SSE spec
+    requires, and comments and other fields (`event:`, `id:`, `retry:`) are
+    skipped. Works on bytes throughout, so payloads go to the JSON parser
+    without an intermediate str decode.
+    """
+    def __init__(self):
+        self._partial = b""
+        self._data: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Consumes a chunk and returns the data payloads of the events it completed."""
+        if self._partial:
+            chunk = self._partial + chunk
+        lines = chunk.split(b"\n")
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            if not line:
+                if self._data:
+                    events.append(self._data[0] if len(self._data) == 1 else b"\n".join(self._data))
+                    self._data = []
+            elif line.startswith(b"data:"):
+                value = line[5:]
+                self._data.append(value[1:] if value.startswith(b" ") else value)
+        return events
+
+    def flush(self) -> List[bytes]:
+        """Returns the final event of a body that ended without a blank line."""
+        events = self.feed(b"\n\n") if (self._partial or self._data) else []
+        self._partial = b""
+        return events
+
+def _content(payload: bytes):
+    if payload == b"[DONE]":
+        return DONE
+    try:
+        data = _loads(payload)
+    except ValueError as e:
+        raise ValueError(f"Malformed event in Fireworks stream: {payload[:200]!r}") from e
+    if "error" in data:
+        raise ValueError(f"Fireworks stream error: {data['error']}")
+    choices = data.get("choices")
+    if not choices:
+        return None
+    return choices[0].get("delta", {}).get("content")
+
+def iter_content(chunks: Iterable[bytes]) -> Iterator[object]:
+    """
+    Yields the content deltas of a chat completion stream, then DONE once the
+    `[DONE]` marker arrives. Keeps consuming the body after DONE without
+    yielding, so the connection is drained and can return to the pool.
+    """
+    decoder = sse_decoder()
+    done = False
+    for chunk in chunks:
+        if done:
+            continue
+        for payload in decoder.feed(chunk):
+            content = _content(payload)
+            if content is DONE:
+                done = True
+                yield DONE
+                break
+            if content:
+                yield content
+    if not done:
+        for payload in decoder.flush():
+            content = _content(payload)
+            if content is DONE:
+                yield DONE
+            elif content:
+                yield content
+
+async def aiter_content(chunks: AsyncIterable[bytes]) -> AsyncIterator[object]:
+    """Async counterpart of iter_content."""
+    decoder = sse_decoder()
+    done = False
+    async for chunk in chunks:
+        if done:
+            continue
+        for payload in decoder.feed(chunk):
+            content = _content(payload)
+            if content is DONE:
+                done = True
+                yield DONE
+                break
+            if content:
+                yield content
+    if not done:
+        for payload in decoder.flush():
+            content = _content(payload)
+            if content is DONE:
+                yield DONE
+            elif content:
+                yield content
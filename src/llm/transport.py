@@ -0,0 +1,108 @@
+import asyncio
+import atexit
+import threading
+import warnings
+import weakref
+from typing import Dict, Tuple
+
+import httpx
+
+# One pooled client per distinct transport configuration, shared by every
+# provider instance in the process so keep-alive connections survive across
+# agent iterations and across agents.
+_clients: Dict[Tuple, httpx.Client] = {}
+_lock = threading.Lock()
+
+# Async clients and concurrency semaphores are bound to the event loop that
+# created them, so they are pooled per loop and dropped with it.
+_loop_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def transport_key(
+    http2: bool,
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry: float,
+    timeout: float,
+    connect_timeout: float,
+) -> Tuple:
+    """Normalises transport settings into a hashable pool key."""
+    if http2 and not _http2_available():
+        warnings.warn("http2 requested but the 'h2' package is not installed; falling back to HTTP/1.1.")
+        http2 = False
+    return (http2, max_connections, max_keepalive_connections, keepalive_expiry, timeout, connect_timeout)
+
+def client_options(key: Tuple) -> dict:
+    """Builds the keyword arguments shared by httpx.Client and httpx.AsyncClient."""
+    http2, max_connections, max_keepalive_connections, keepalive_expiry, timeout, connect_timeout = key
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(timeout, connect=connect_timeout),
+    }
+
+def get_client(key: Tuple) -> httpx.Client:
+    """Returns the process-wide pooled client for the given transport key."""
+    client = _clients.get(key)
+    if client is not None and not client.is_closed:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(**client_options(key))
+            _clients[key] = client
+        return client
+
+def _current_loop_state() -> dict:
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        state = {"clients": {}, "semaphores": {}}
+        _loop_state[loop] = state
+    return state
+
+def get_async_client(key: Tuple) -> httpx.AsyncClient:
+    """Returns the pooled async client for the given transport key on the running event loop."""
+    clients = _current_loop_state()["clients"]
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**client_options(key))
+        clients[key] = client
+    return client
+
+def get_semaphore(key: Tuple, limit: int) -> asyncio.Semaphore:
+    """Returns the request semaphore shared by providers with the same transport key and limit."""
+    semaphores = _current_loop_state()["semaphores"]
+    semaphore = semaphores.get((key, limit))
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(limit)
+        semaphores[(key, limit)] = semaphore
+    return semaphore
+
+async def aclose_clients():
+    """Closes the async clients pooled on the running event loop."""
+    clients = _current_loop_state()["clients"]
+    pending = list(clients.values())
+    clients.clear()
+    for client in pending:
+        await client.aclose()
+
+def close_clients():
+    """Closes every pooled client. Safe to call more than once."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+atexit.register(close_clients)
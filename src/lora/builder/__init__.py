@@ -1,4 +1,5 @@
 # This file makes the 'builder' directory a Python package.
 
 from .packer import write_jsonl
-from .validators import validate_examples
\ No newline at end of file
+from .reader import jsonl_dataset
+from .validators import ValidationError, validate_examples, validate_stream, validation_report
@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from src.core.schema import Example
+
+def encode_item(location: str, example: Example) -> str:
+    return json.dumps([location, example.model_dump()], separators=(",", ":")) + "\n"
+
+def decode_item(line: str) -> Tuple[str, Example]:
+    location, example = json.loads(line)
+    return location, Example(**example)
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class _entry_writer:
+    """Writes one cache entry under a temporary name; commit() renames it into place."""
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".tmp")
+        self._file = gzip.open(self.tmp_path, "wt", encoding="utf-8", compresslevel=1)
+
+    def write(self, location: str, example: Example):
+        self._file.write(encode_item(location, example))
+
+    def commit(self):
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+class build_cache:
+    """
+    Converted examples of one dataset's raw files, keyed by file name,
+    content hash and converter version.
+
+    Each entry is a gzip-compressed JSONL file of (location, example) pairs.
+    `index.json` remembers each raw file's size, mtime and sha256, so
+    unchanged files are recognised from a stat() without being read, and the
+    key of the inputs the last output was built from, so a build with no
+    changes can skip conversion and writing altogether.
+    """
+    def __init__(self, path: Path, version: str):
+        self.path = path
+        self.version = version
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._index = self._load()
+        if self._index.get("version") != version:
+            self._index = {"version": version, "files": {}, "output": None}
+
+    def _load(self) -> dict:
+        index_path = self.path / "index.json"
+        if not index_path.exists():
+            return {}
+        try:
+            with index_path.open("r") as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def save(self):
+        tmp_path = self.path / "index.json.tmp"
+        with tmp_path.open("w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.path / "index.json")
+
+    def key(self, file_path: Path) -> str:
+        """Cache key of a raw file; only rehashes it if its size or mtime changed."""
+        stat = file_path.stat()
+        record = self._index["files"].get(file_path.name)
+        if record is None or record["size"] != stat.st_size or record["mtime_ns"] != stat.st_mtime_ns:
+            record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _sha256(file_path)}
+            self._index["files"][file_path.name] = record
+        # Locations and meta name the file, so a renamed file gets a new key.
+        return hashlib.sha256(f"{self.version}\0{file_path.name}\0{record['sha256']}".encode()).hexdigest()[:32]
+
+    def _entry(self, key: str) -> Path:
+        return self.path / f"{key}.jsonl.gz"
+
+    def has(self, key: str) -> bool:
+        return self._entry(key).exists()
+
+    def read(self, key: str) -> Iterator[Tuple[str, Example]]:
+        with gzip.open(self._entry(key), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield decode_item(line)
+
+    def writer(self, key: str) -> _entry_writer:
+        return _entry_writer(self._entry(key))
+
+    def build_key(self, keys: Iterable[str]) -> str:
+        return hashlib.sha256("\0".join([self.version, *keys]).encode()).hexdigest()
+
+    def output_current(self, output_path: Path, build_key: str) -> bool:
+        """Whether `output_path` is still the file built from the inputs with `build_key`."""
+        output = self._index.get("output")
+        if not output or output["path"] != str(output_path) or output["key"] != build_key or not output_path.exists():
+            return False
+        stat = output_path.stat()
+        return output["size"] == stat.st_size and output["mtime_ns"] == stat.st_mtime_ns
+
+    def record_output(self, output_path: Path, build_key: str):
+        stat = output_path.stat()
+        self._index["output"] = {"path": str(output_path), "key": build_key, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def evict(self, files: List[Path], keys: List[str]) -> int:
+        """Drops entries and file records not belonging to `files`; returns the number of entries removed."""
+        names = {f.name for f in files}
+        self._index["files"] = {name: record for name, record in self._index["files"].items() if name in names}
+        keep = {self._entry(key).name for key in keys}
+        removed = 0
+        for entry in self.path.iterdir():
+            if entry.name.endswith((".jsonl.gz", ".jsonl.gz.tmp")) and entry.name not in keep:
+                entry.unlink()
+                removed += 1
+        return removed
@@ -0,0 +1,185 @@
+import re
+from collections import deque
+from itertools import islice
+from typing import Deque, Iterable, Iterator, List, NamedTuple, TextIO, Tuple
+
+from src.core.tokens import count_tokens_batch, token_offsets
+from .validators import MAX_CONTEXT_LENGTH
+
+# Where an oversize piece may be cut: after a sentence end or a run of line
+# breaks in prose, after every line in code.
+SENTENCE_BREAKS = re.compile(r"(?<=[.!?])\s+|\n+")
+LINE_BREAKS = re.compile(r"\n")
+
+# Top-level Python lines that start a new block.
+_PY_BOUNDARY = re.compile(r"(?:async\s+def|def|class)\b|@")
+# String and character literals and comments, which may hold stray braces.
+_C_NOISE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|//.*|/\*.*?\*/')
+
+class _piece(NamedTuple):
+    location: str
+    text: str
+    tokens: int
+    separator: str  # joins it to the piece before it in a chunk
+
+class token_chunker:
+    """
+    Packs a stream of (location, text) paragraphs or code blocks into chunks
+    of at most `max_tokens` tokens, as counted by src.core.tokens.
+
+    Pieces are token-counted in batches of `batch_size`. A piece longer than
+    the limit is cut at `breaks` (sentence ends and line breaks by default)
+    and anything still too long is cut at token offsets, so every chunk fits.
+    Consecutive chunks repeat up to `overlap` tokens of whole pieces. Each
+    piece is measured once and joined once, so the work is linear in the
+    size of the input.
+    """
+    def __init__(
+        self,
+        max_tokens: int = MAX_CONTEXT_LENGTH,
+        overlap: int = 0,
+        separator: str = "\n\n",
+        breaks: re.Pattern = SENTENCE_BREAKS,
+        batch_size: int = 256,
+    ):
+        if max_tokens < 1 or not 0 <= overlap <= max_tokens // 2:
+            raise ValueError(f"Need max_tokens >= 1 and 0 <= overlap <= max_tokens / 2, got {max_tokens} and {overlap}")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.separator = separator
+        self.breaks = breaks
+        self.batch_size = batch_size
+        self._separator_tokens = count_tokens_batch([separator])[0] if separator else 0
+
+    def chunk(self, paragraphs: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+        """Yields (location of its first piece, text) for each chunk."""
+        parts: Deque[_piece] = deque()
+        used = 0
+        for piece in self._pieces(paragraphs):
+            if parts and used + self._cost(piece, True) > self.max_tokens:
+                chunk = self._join(parts)
+                if chunk[1]:
+                    yield chunk
+                parts, used = self._carry(parts)
+                # Drop overlap that would not leave room for the new piece.
+                while parts and used + self._cost(piece, True) > self.max_tokens:
+                    used -= parts.popleft().tokens
+                    if parts:
+                        used -= self._cost(parts[0], True) - self._cost(parts[0], False)
+            used += self._cost(piece, bool(parts))
+            parts.append(piece)
+        if parts:
+            chunk = self._join(parts)
+            if chunk[1]:
+                yield chunk
+
+    def _cost(self, piece: _piece, joined: bool) -> int:
+        return piece.tokens + (self._separator_tokens if joined and piece.separator else 0)
+
+    def _join(self, parts: Deque[_piece]) -> Tuple[str, str]:
+        texts = [parts[0].text]
+        for piece in islice(parts, 1, None):
+            texts.append(piece.separator)
+            texts.append(piece.text)
+        return parts[0].location, "".join(texts).lstrip("\n").rstrip()
+
+    def _carry(self, parts: Deque[_piece]) -> Tuple[Deque[_piece], int]:
+        """The trailing pieces of a finished chunk that fit in `overlap` tokens."""
+        carried: Deque[_piece] = deque()
+        used = 0
+        while self.overlap and parts:
+            piece = parts[-1]
+            cost = piece.tokens + (self._separator_tokens if carried and carried[0].separator else 0)
+            if used + cost > self.overlap:
+                break
+            carried.appendleft(parts.pop())
+            used += cost
+        return carried, used
+
+    def _pieces(self, paragraphs: Iterable[Tuple[str, str]]) -> Iterator[_piece]:
+        paragraphs = iter(paragraphs)
+        while True:
+            batch = list(islice(paragraphs, self.batch_size))
+            if not batch:
+                return
+            counts = count_tokens_batch([text for _, text in batch])
+            for (location, text), tokens in zip(batch, counts):
+                if tokens <= self.max_tokens:
+                    yield _piece(location, text, tokens, self.separator)
+                else:
+                    yield from self._split(location, text)
+
+    def _split(self, location: str, text: str) -> Iterator[_piece]:
+        """Cuts an oversize paragraph at `breaks`, then at token offsets; the cuts keep every character."""
+        cuts = [m.end() for m in self.breaks.finditer(text) if 0 < m.end() < len(text)]
+        slices = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+        separator = self.separator
+        for part, tokens in zip(slices, count_tokens_batch(slices)):
+            if tokens <= self.max_tokens:
+                yield _piece(location, part, tokens, separator)
+            else:
+                offsets = token_offsets(part)
+                for first in range(0, len(offsets), self.max_tokens):
+                    last = first + self.max_tokens
+                    end = offsets[last] if last < len(offsets) else len(part)
+                    yield _piece(location, part[offsets[first] if first else 0 : end], min(self.max_tokens, len(offsets) - first), separator)
+                    separator = ""
+            separator = ""
+
+def python_blocks(f: TextIO, name: str) -> Iterator[Tuple[str, str]]:
+    """
+    Top-level blocks of a Python file: each def or class with its decorators
+    and the comment lines right above it, and the code between them.
+    """
+    block: List[str] = []
+    start = 1
+    comments = 0  # trailing top-level comment lines of the block
+    decorated = False
+    for number, line in enumerate(f, start=1):
+        top_level = line[:1] not in ("", " ", "\t", "\r", "\n")
+        if top_level and block and not decorated and _PY_BOUNDARY.match(line) and len(block) > comments:
+            carry = block[len(block) - comments:]
+            yield f"{name}:{start}", "".join(block[: len(block) - comments])
+            block, start = carry, number - len(carry)
+        if top_level:
+            decorated = line.startswith("@")
+            comments = comments + 1 if line.startswith("#") else 0
+        else:
+            comments = 0
+        block.append(line)
+    if block:
+        yield f"{name}:{start}", "".join(block)
+
+def c_blocks(f: TextIO, name: str) -> Iterator[Tuple[str, str]]:
+    """
+    Top-level blocks of a C or C++ file: a new block starts at the first
+    line after a declaration or definition closes at brace depth 0, so
+    functions, classes and the comments above them stay together.
+    """
+    block: List[str] = []
+    start = 1
+    depth = 0
+    complete = False
+    in_comment = False
+    for number, line in enumerate(f, start=1):
+        stripped = line.strip()
+        if block and complete and depth == 0 and stripped:
+            yield f"{name}:{start}", "".join(block)
+            block, start, complete = [], number, False
+        block.append(line)
+
+        code = line
+        if in_comment:
+            end = code.find("*/")
+            code = "" if end < 0 else code[end + 2 :]
+            in_comment = end < 0
+        code = _C_NOISE.sub("", code)
+        if "/*" in code:
+            code = code[: code.index("/*")]
+            in_comment = True
+        depth = max(0, depth + code.count("{") - code.count("}"))
+        code = code.strip()
+        if depth == 0 and code and (code.endswith(("}", ";")) or code.startswith("#")):
+            complete = True
+    if block:
+        yield f"{name}:{start}", "".join(block)
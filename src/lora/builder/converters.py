@@ -1,81 +1,252 @@
 import csv
 import json
+import re
 import pdfplumber
 from pathlib import Path
-from typing import Dict, List, Protocol
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, TextIO, Tuple
+
+import pydantic
 
 from src.core.schema import Example, Message
-from .validators import MAX_CONTEXT_LENGTH
+from .chunking import LINE_BREAKS, c_blocks, python_blocks, token_chunker
+from .validators import MAX_CONTEXT_LENGTH, ValidationError
+
+# Bump when a converter's output changes; invalidates the build cache.
+CONVERTER_VERSION = 2
+
+# Text is read in blocks of this many characters; a single JSON item may not
+# be larger than _MAX_JSON_ITEM characters.
+_READ_CHARS = 1 << 16
+_MAX_JSON_ITEM = 64 << 20
+
+# What the item scanner stops at outside and inside JSON strings.
+_JSON_STRUCTURE = re.compile(r'[][{}",\s]')
+_JSON_STRING = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
 
 class RawFileConverter(Protocol):
-    def __call__(self, file_path: Path) -> List[Example]:
+    def __call__(self, file_path: Path, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
+        """
+        Yields (location, example) pairs, location being "file:line" (or
+        "file:page N"). Converters that chunk text keep chunks to `max_tokens`.
+        """
         ...
 
+def _example(item, location: str) -> Example:
+    if not isinstance(item, dict):
+        raise ValidationError(f"Expected an object, got {type(item).__name__}.", location)
+    try:
+        return Example(**item)
+    except pydantic.ValidationError as e:
+        raise ValidationError(f"Invalid example: {e}", location) from e
+
+def _text_example(text: str, source_name: str) -> Example:
+    messages: List[Message] = [{"role": "user", "content": text}]
+    return Example(messages=messages, meta={"source": source_name})
+
+def chunk_paragraphs(paragraphs: Iterable[Tuple[str, str]], source_name: str, chunker: Optional[token_chunker] = None) -> Iterator[Tuple[str, Example]]:
+    """Packs (location, paragraph) pairs into Example chunks of at most the chunker's max_tokens (MAX_CONTEXT_LENGTH by default)."""
+    for location, text in (chunker or token_chunker()).chunk(paragraphs):
+        yield location, _text_example(text, source_name)
+
 def chunk_text(text: str, source_name: str) -> List[Example]:
     """Splits a long text into multiple smaller Example chunks."""
-    # Simple split by paragraphs. A more sophisticated method could use a proper tokenizer.
-    paragraphs = text.split('\n\n')
-    chunks = []
-    current_chunk = ""
-
-    for p in paragraphs:
-        if len(current_chunk) + len(p) + 2 > MAX_CONTEXT_LENGTH:
-            if current_chunk:
-                messages: List[Message] = [{"role": "user", "content": current_chunk.strip()}]
-                chunks.append(Example(messages=messages, meta={"source": source_name}))
-            current_chunk = p
-        else:
-            current_chunk += "\n\n" + p
-
-    if current_chunk.strip():
-        messages: List[Message] = [{"role": "user", "content": current_chunk.strip()}]
-        chunks.append(Example(messages=messages, meta={"source": source_name}))
-
-    return chunks
-
-def _from_json(file_path: Path) -> List[Example]:
+    return [example for _, example in chunk_paragraphs(((source_name, p) for p in text.split("\n\n")), source_name)]
+
+def _paragraphs(f: TextIO, name: str) -> Iterator[Tuple[str, str]]:
+    """Blank-line separated paragraphs of a text file, read line by line."""
+    lines: List[str] = []
+    start = 1
+    for number, line in enumerate(f, start=1):
+        if line.strip():
+            if not lines:
+                start = number
+            lines.append(line)
+        elif lines:
+            yield f"{name}:{start}", "".join(lines).rstrip("\n")
+            lines = []
+    if lines:
+        yield f"{name}:{start}", "".join(lines).rstrip("\n")
+
+class _item_scanner:
+    """
+    Finds where a JSON value ends as its text arrives a block at a time, by
+    tracking bracket depth and whether it is inside a string, so a large item
+    is scanned once and decoded once.
+    """
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, text: str, i: int = 0) -> Optional[int]:
+        """Index in `text` just past the end of the value, or None if it continues."""
+        if self.escape:
+            i, self.escape = i + 1, False
+        while True:
+            if self.in_string:
+                i = _JSON_STRING.match(text, i).end()
+                if i == len(text):
+                    return None
+                if text[i] == "\\":
+                    # A backslash at the end of the block escapes the next one's first character.
+                    self.escape = True
+                    return None
+                self.in_string = False
+                i += 1
+                if self.depth == 0:
+                    return i
+                continue
+            match = _JSON_STRUCTURE.search(text, i)
+            if match is None:
+                return None
+            char = match.group()
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                self.depth += 1
+            elif char in "]}":
+                if self.depth == 0:
+                    return match.start()  # a bare value followed by the list's "]"
+                self.depth -= 1
+                if self.depth == 0:
+                    return match.end()
+            elif self.depth == 0:
+                return match.start()  # a bare value followed by "," or whitespace
+            i = match.end()
+
+def _json_array(f: TextIO, name: str) -> Iterator[Tuple[str, object]]:
+    """
+    Items of a top-level JSON list, decoded one at a time from blocks of the
+    file, with the line each item starts on.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, line = "", 0, 1
+    state = "start"
+    while True:
+        # Skip whitespace, reading the next block when the buffer runs out.
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                line += buffer[pos] == "\n"
+                pos += 1
+            if pos < len(buffer):
+                break
+            buffer, pos = f.read(_READ_CHARS), 0
+            if not buffer:
+                if state == "start":
+                    raise ValidationError("JSON file must contain a list of objects.", f"{name}:{line}")
+                raise ValidationError("Unexpected end of file.", f"{name}:{line}")
+
+        char = buffer[pos]
+        if state == "start":
+            if char != "[":
+                raise ValidationError("JSON file must contain a list of objects.", f"{name}:{line}")
+            pos += 1
+            state = "first"
+            continue
+        if state in ("first", "next") and char == "]":
+            return
+        if state == "next":
+            if char != ",":
+                raise ValidationError(f"Expected ',' or ']', got {char!r}.", f"{name}:{line}")
+            pos += 1
+            state = "item"
+            continue
+
+        # Collect the blocks the item spans, then decode it once.
+        scanner = _item_scanner()
+        if scanner.feed(buffer, pos) is None:
+            blocks, size = [buffer[pos:]], len(buffer) - pos
+            while True:
+                block = f.read(_READ_CHARS)
+                if not block or scanner.feed(block) is not None:
+                    break
+                size += len(block)
+                if size > _MAX_JSON_ITEM:
+                    raise ValidationError(f"JSON item is larger than {_MAX_JSON_ITEM} characters.", f"{name}:{line}")
+                blocks.append(block)
+            blocks.append(block)
+            buffer, pos = "".join(blocks), 0
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            raise ValidationError(f"Invalid JSON: {e.msg}", f"{name}:{line}") from e
+        yield f"{name}:{line}", item
+        line += buffer.count("\n", pos, end)
+        pos = end
+        state = "next"
+
+def _from_json(file_path: Path, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
     with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    if not isinstance(data, list):
-        raise ValueError("JSON file must contain a list of objects.")
+        for location, item in _json_array(f, file_path.name):
+            yield location, _example(item, location)
 
-    return [Example(**item) for item in data]
+def _from_jsonl(file_path: Path, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
+    with file_path.open("r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            location = f"{file_path.name}:{number}"
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValidationError(f"Invalid JSON: {e.msg}", location) from e
+            yield location, _example(item, location)
 
-def _from_csv(file_path: Path) -> List[Example]:
-    examples = []
+def _from_csv(file_path: Path, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
     with file_path.open("r", newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
+        start = reader.line_num + 1
         for row in reader:
-            messages = [
-                {"role": "user", "content": row["user"]},
-                {"role": "assistant", "content": row["assistant"]},
-            ]
-            examples.append(Example(messages=messages, meta={"source": file_path.name}))
-    return examples
-
-def _from_markdown(file_path: Path) -> List[Example]:
-    content = file_path.read_text(encoding="utf-8")
-    return chunk_text(content, file_path.name)
-
-def _from_pdf(file_path: Path) -> List[Example]:
-    """Extracts text from a PDF file and chunks it."""
-    text = ""
-    with pdfplumber.open(file_path) as pdf:
+            location = f"{file_path.name}:{start}"
+            start = reader.line_num + 1
+            try:
+                messages = [
+                    {"role": "user", "content": row["user"]},
+                    {"role": "assistant", "content": row["assistant"]},
+                ]
+            except KeyError as e:
+                raise ValidationError(f"Missing column: {e}", location) from e
+            yield location, Example(messages=messages, meta={"source": file_path.name})
+
+def _from_markdown(file_path: Path, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
+    with file_path.open("r", encoding="utf-8") as f:
+        yield from chunk_paragraphs(_paragraphs(f, file_path.name), file_path.name, token_chunker(max_tokens))
+
+def _pdf_paragraphs(file_path: Path, pages: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[str, str]]:
+    """Paragraphs of a PDF, optionally only of the 0-based page range [first, last)."""
+    numbers = list(range(pages[0] + 1, pages[1] + 1)) if pages else None
+    with pdfplumber.open(file_path, pages=numbers) as pdf:
         for page in pdf.pages:
             page_text = page.extract_text()
             if page_text:
-                text += page_text + "\n\n"
-    return chunk_text(text, file_path.name)
+                for p in page_text.split("\n\n"):
+                    yield f"{file_path.name}:page {page.page_number}", p
+            # Parsed page objects hold on to their layout; release them as we go.
+            page.close()
 
-def _from_code(file_path: Path) -> List[Example]:
-    """Loads content from a source code file and chunks it."""
-    content = file_path.read_text(encoding="utf-8")
-    return chunk_text(content, file_path.name)
+def pdf_page_count(file_path: Path) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+def _from_pdf(file_path: Path, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
+    """Extracts text from a PDF file page by page and chunks it."""
+    yield from chunk_paragraphs(_pdf_paragraphs(file_path), file_path.name, token_chunker(max_tokens))
+
+def iter_pdf_pages(file_path: Path, first: int, last: int, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
+    """Like _from_pdf for pages [first, last) only, so ranges of one PDF can be converted in parallel."""
+    yield from chunk_paragraphs(_pdf_paragraphs(file_path, (first, last)), file_path.name, token_chunker(max_tokens))
+
+def _from_code(file_path: Path, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
+    """Loads a source code file and chunks it at function and class boundaries."""
+    blocks = python_blocks if file_path.suffix.lower() == ".py" else c_blocks
+    chunker = token_chunker(max_tokens, separator="", breaks=LINE_BREAKS)
+    with file_path.open("r", encoding="utf-8") as f:
+        yield from chunk_paragraphs(blocks(f, file_path.name), file_path.name, chunker)
 
 
 CONVERTERS: Dict[str, RawFileConverter] = {
     ".json": _from_json,
+    ".jsonl": _from_jsonl,
     ".csv": _from_csv,
     ".md": _from_markdown,
     ".pdf": _from_pdf,
@@ -83,8 +254,12 @@ CONVERTERS: Dict[str, RawFileConverter] = {
     ".cpp": _from_code,
 }
 
-def convert_file(file_path: Path) -> List[Example]:
+def iter_file(file_path: Path, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
+    """Streams (location, example) pairs from one raw file, text chunks of at most `max_tokens` tokens."""
     ext = file_path.suffix.lower()
     if ext not in CONVERTERS:
         raise ValueError(f"Unsupported file type: {ext}")
-    return CONVERTERS[ext](file_path)
\ No newline at end of file
+    return CONVERTERS[ext](file_path, max_tokens)
+
+def convert_file(file_path: Path) -> Iterator[Example]:
+    return (example for _, example in iter_file(file_path))
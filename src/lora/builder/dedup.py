@@ -0,0 +1,277 @@
+import hashlib
+import json
+import re
+import zlib
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.schema import Example
+from src.core.tokens import count_tokens_batch
+
+_WORD = re.compile(r"\w+")
+_LOW_BITS = np.uint64(0xFFFFFFFF)
+_SHIFT = np.uint64(32)
+# Word hashes are memoised up to this many distinct words, then the memo restarts.
+_WORD_CACHE_ENTRIES = 1 << 18
+# Shingles permuted per numpy call; bounds the (rows x num_perm) scratch matrix.
+_BLOCK_ROWS = 1 << 14
+# Examples hashed together in filter().
+_BATCH = 256
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser: spreads band hashes over all 64 bits."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+class hash_set:
+    """
+    Set of 64-bit hashes in one numpy array (open addressing, linear
+    probing, grown at half load): about 16 bytes per entry, against ~70 for
+    a Python set of ints.
+    """
+    def __init__(self, capacity: int = 1 << 16):
+        size = 1 << max(4, (capacity * 2 - 1).bit_length())
+        self._table = np.zeros(size, dtype=np.uint64)
+        self._mask = size - 1
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, key: int) -> bool:
+        key = key or 1  # 0 marks an empty slot
+        table, i = self._table, key & self._mask
+        while True:
+            slot = table.item(i)
+            if slot == key:
+                return True
+            if slot == 0:
+                return False
+            i = (i + 1) & self._mask
+
+    def add(self, key: int) -> bool:
+        """Adds `key`; returns False if it was already present."""
+        key = key or 1
+        table, i = self._table, key & self._mask
+        while True:
+            slot = table.item(i)
+            if slot == key:
+                return False
+            if slot == 0:
+                break
+            i = (i + 1) & self._mask
+        table[i] = key
+        self.count += 1
+        if self.count * 2 > len(table):
+            self._grow()
+        return True
+
+    def _grow(self):
+        keys = self._table[self._table != 0]
+        self._table = np.zeros(len(self._table) * 2, dtype=np.uint64)
+        self._mask = len(self._table) - 1
+        self.count = 0
+        for key in keys.tolist():
+            self.add(key)
+
+    def nbytes(self) -> int:
+        return self._table.nbytes
+
+# np.trapz was renamed np.trapezoid in NumPy 2.0 (and removed later).
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    The (bands, rows) split of `num_perm` MinHash values that minimises the
+    summed false positive and false negative probability mass around
+    `threshold`.
+    """
+    s = np.linspace(0.0, 1.0, 1001)
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        candidate = 1 - (1 - s**rows) ** bands
+        below = s <= threshold
+        error = _trapezoid(candidate[below], s[below]) + _trapezoid(1 - candidate[~below], s[~below])
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+class deduplicator:
+    """
+    Streaming duplicate filter for training examples; the first occurrence
+    is kept.
+
+    Exact duplicates (same messages, whatever their meta) are found by a
+    64-bit hash of the messages. Near duplicates are found with MinHash over
+    `shingle`-word shingles of the message text and LSH: the `num_perm`
+    values are split into bands sized for `threshold` (estimated Jaccard
+    similarity), and an example sharing any band with a kept example is
+    dropped. Only hashes are kept (one per kept example plus one per band)
+    in compact hash_sets, so memory is a few hundred bytes per kept example
+    however long the examples are.
+    """
+    def __init__(
+        self,
+        threshold: Optional[float] = 0.8,
+        num_perm: int = 128,
+        shingle: int = 5,
+        seed: int = 0,
+    ):
+        if threshold is not None and not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.bands, self.rows = optimal_bands(threshold, num_perm) if threshold is not None else (0, 0)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self._word_hashes: Dict[str, int] = {}
+        self._buffer: Optional[np.ndarray] = None
+        self._shingle_weights = rng.integers(1, 1 << 63, size=shingle, dtype=np.uint64) | np.uint64(1)
+        self._band_weights = rng.integers(1, 1 << 63, size=max(1, self.rows), dtype=np.uint64) | np.uint64(1)
+        self._exact = hash_set()
+        self._buckets = hash_set()
+        self.stats: Dict[str, int] = {"seen": 0, "exact": 0, "near": 0, "exact_tokens": 0, "near_tokens": 0}
+
+    def config_key(self) -> str:
+        """Settings that change the output, for build-cache keys."""
+        return f"dedup:{self.threshold}:{self.num_perm}:{self.shingle}"
+
+    @staticmethod
+    def _text(example: Example) -> str:
+        return "\n".join(str(message.get("content", "")) for message in example.messages)
+
+    def _shingles(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        32-bit hashes of the `shingle`-word windows of each of `texts` (one
+        hash for a text with fewer words), concatenated, and the number of
+        shingles of each text.
+        """
+        words = [_WORD.findall(text.lower()) for text in texts]
+        memo = self._word_hashes
+        if len(memo) > _WORD_CACHE_ENTRIES:
+            memo.clear()
+        for word in set(chain.from_iterable(words)).difference(memo):
+            memo[word] = zlib.crc32(word.encode())
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        hashes = np.fromiter(map(memo.__getitem__, chain.from_iterable(words)), dtype=np.uint64, count=int(lengths.sum()))
+
+        k = self.shingle
+        windows = np.zeros(max(0, len(hashes) - k + 1), dtype=np.uint64)
+        for j in range(k):
+            windows += hashes[j : j + len(windows)] * self._shingle_weights[j]
+        # Keep the windows that lie inside one text.
+        starts = np.cumsum(lengths) - lengths
+        counts = np.maximum(lengths - k + 1, 1)
+        first = np.cumsum(counts) - counts
+        owner = np.repeat(np.arange(len(texts)), counts)
+        full = lengths[owner] >= k
+        shingles = np.zeros(int(counts.sum()), dtype=np.uint64)
+        shingles[full] = windows[(starts[owner] + np.arange(len(owner)) - first[owner])[full]]
+        for t in np.flatnonzero(lengths < k).tolist():
+            # A text shorter than a shingle is one shingle of all its words.
+            shingles[first[t]] = (hashes[starts[t] : starts[t] + lengths[t]] * self._shingle_weights[: lengths[t]]).sum()
+        return (shingles >> _SHIFT) ^ (shingles & _LOW_BITS), counts
+
+    def _permute(self, shingles: np.ndarray) -> np.ndarray:
+        """
+        (num_perm x len(shingles)) hashes of `shingles` under each permutation:
+        multiply-shift, the top 32 bits of a * x + b (mod 2^64). Laid out
+        permutation-major, in a reused buffer, so the minimum per example is
+        a contiguous reduction.
+        """
+        if self._buffer is None:
+            self._buffer = np.empty((self.num_perm, _BLOCK_ROWS), dtype=np.uint64)
+        out = self._buffer[:, : len(shingles)]
+        np.multiply(self._a[:, None], shingles[None, :], out=out)
+        out += self._b[:, None]
+        out >>= _SHIFT
+        return out
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """MinHash signatures (len(texts) x num_perm) of the word shingles of `texts`."""
+        shingles, counts = self._shingles(texts)
+        offsets = np.cumsum(counts) - counts
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        start = 0
+        while start < len(texts):
+            end, rows = start + 1, int(counts[start])
+            while end < len(texts) and rows + counts[end] <= _BLOCK_ROWS:
+                rows += int(counts[end])
+                end += 1
+            block = shingles[offsets[start] : offsets[start] + rows]
+            if rows > _BLOCK_ROWS:
+                # One long text: keep a running minimum over blocks of its shingles.
+                signature = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+                for first in range(0, rows, _BLOCK_ROWS):
+                    signature = np.minimum(signature, self._permute(block[first : first + _BLOCK_ROWS]).min(axis=1))
+                out[start] = signature
+            else:
+                out[start:end] = np.minimum.reduceat(self._permute(block), offsets[start:end] - offsets[start], axis=1).T
+            start = end
+        return out
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.signatures([text])[0]
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """One 64-bit key per (example, band)."""
+        bands = signatures[:, : self.bands * self.rows].reshape(len(signatures), self.bands, self.rows)
+        combined = (bands * self._band_weights).sum(axis=2)
+        return _mix(combined ^ (np.arange(self.bands, dtype=np.uint64) << np.uint64(56)))
+
+    def _exact_key(self, example: Example) -> int:
+        canonical = json.dumps(example.messages, sort_keys=True, ensure_ascii=False).encode()
+        return int.from_bytes(hashlib.blake2b(canonical, digest_size=8).digest(), "little")
+
+    def _decide(self, exact_key: int, band_keys: Optional[List[int]]) -> Optional[str]:
+        self.stats["seen"] += 1
+        if not self._exact.add(exact_key):
+            return "exact"
+        if band_keys is None:
+            return None
+        if any(key in self._buckets for key in band_keys):
+            return "near"
+        for key in band_keys:
+            self._buckets.add(key)
+        return None
+
+    def check(self, example: Example) -> Optional[str]:
+        """Records `example`; returns "exact" or "near" if it duplicates an earlier one, else None."""
+        band_keys = self._band_keys(self.signatures([self._text(example)]))[0].tolist() if self.bands else None
+        return self._decide(self._exact_key(example), band_keys)
+
+    def filter(self, examples: Iterable[Example]) -> Iterator[Example]:
+        """
+        Yields the examples that are not duplicates, counting what was
+        removed. Examples are hashed in batches; decisions are still made
+        one by one in order.
+        """
+        examples = iter(examples)
+        while True:
+            batch = list(islice(examples, _BATCH))
+            if not batch:
+                return
+            band_keys = self._band_keys(self.signatures([self._text(e) for e in batch])).tolist() if self.bands else [None] * len(batch)
+            for example, keys in zip(batch, band_keys):
+                kind = self._decide(self._exact_key(example), keys)
+                if kind is None:
+                    yield example
+                    continue
+                self.stats[kind] += 1
+                self.stats[f"{kind}_tokens"] += count_tokens_batch([self._text(example)])[0]
+
+    def nbytes(self) -> int:
+        return self._exact.nbytes() + self._buckets.nbytes()
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"Removed {s['exact']} exact and {s['near']} near duplicates of {s['seen']} examples "
+            f"({s['exact_tokens'] + s['near_tokens']} tokens)."
+        )
@@ -1,34 +1,295 @@
+import hashlib
 import json
+import os
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
 from src.core.schema import Example
+from src.core.tokens import count_tokens_batch
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder writes the same compact JSON
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # only needed for compression="zstd"
+    zstandard = None
+
+# Examples serialised per write; bounds what the writer holds in memory.
+BUFFER_EXAMPLES = 256
+
+# File name suffix and default level of each compression.
+COMPRESSIONS: Dict[Optional[str], Tuple[str, int]] = {None: ("", 0), "gzip": (".gz", 6), "zstd": (".zst", 3)}
 
 def write_jsonl(
-    examples: List[Example],
+    examples: Iterable[Example],
     output_path: Path,
-    shard_size: Optional[int] = None
-):
+    shard_size: Optional[int] = None,
+    shard_bytes: Optional[int] = None,
+    shard_tokens: Optional[int] = None,
+    compression: Optional[str] = None,
+    compression_level: Optional[int] = None,
+    workers: int = 1,
+) -> List[Path]:
+    """
+    Streams `examples` into `output_path` and returns the files written.
+
+    With `shard_size` (examples), `shard_bytes` (uncompressed bytes) or
+    `shard_tokens`, the output is split into shards named
+    `<stem>_<i><suffix>`, each cut before it would pass a limit (an example
+    over the limit on its own gets a shard to itself). `compression`
+    ("gzip" or "zstd") compresses every file and adds `.gz` or `.zst` to its
+    name. With `workers` > 1 and a shard limit, finished shards are
+    compressed and written by a thread pool while the next ones are
+    serialised; up to `workers` + 1 shards are held in memory. Unsharded
+    output is always streamed to disk.
+
+    A manifest, `<stem>.manifest.json`, lists every file with its example and
+    byte counts (and token counts when sharding by tokens), its size on disk
+    and its sha256.
+
+    Files are written under a temporary name and renamed into place only once
+    the whole stream has been consumed, so a failure part way through (e.g. a
+    validation error in a later file) leaves any previous output untouched.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}; expected one of gzip, zstd")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package")
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    if shard_size:
-        _write_sharded_jsonl(examples, output_path, shard_size)
-    else:
-        _write_single_jsonl(examples, output_path)
+    sharded = bool(shard_size or shard_bytes or shard_tokens)
+    suffix, default_level = COMPRESSIONS[compression]
 
-def _write_single_jsonl(examples: List[Example], output_path: Path):
-    with output_path.open("w", encoding="utf-8") as f:
-        for example in examples:
-            # Using asdict() if Example is a dataclass
-            f.write(json.dumps(example.dict()) + "\n")
+    def path_for(i: int) -> Path:
+        path = _shard_path(output_path, i) if sharded else output_path
+        return path.with_name(path.name + suffix)
 
-def _write_sharded_jsonl(
-    examples: List[Example],
-    output_path: Path,
-    shard_size: int
-):
-    for i in range(0, len(examples), shard_size):
-        shard_examples = examples[i : i + shard_size]
-        shard_path = output_path.with_name(
-            f"{output_path.stem}_{i // shard_size}{output_path.suffix}"
-        )
-        _write_single_jsonl(shard_examples, shard_path)
\ No newline at end of file
+    writer = _shard_writer(
+        path_for,
+        (shard_size, shard_bytes, shard_tokens),
+        compression,
+        default_level if compression_level is None else compression_level,
+        workers,
+    )
+    examples = iter(examples)
+    try:
+        while True:
+            batch = list(islice(examples, BUFFER_EXAMPLES))
+            if not batch:
+                break
+            tokens = count_tokens_batch([_text(example) for example in batch]) if shard_tokens else None
+            writer.add(_dumps(batch), tokens)
+        entries = writer.finish(empty_file=not sharded)
+    except BaseException:
+        writer.discard()
+        raise
+    return _commit(output_path, entries, compression)
+
+def manifest_path(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.stem}.manifest.json")
+
+def read_manifest(output_path: Path) -> Optional[dict]:
+    """The manifest of the last write to `output_path`, or None if there is none (or it is unreadable)."""
+    try:
+        with manifest_path(output_path).open("r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _text(example: Example) -> str:
+    return "\n".join(str(message.get("content", "")) for message in example.messages)
+
+def _dumps(examples: List[Example]) -> List[bytes]:
+    """One compact JSON line per example."""
+    # The fields directly, rather than model_dump(), which deep-copies them.
+    rows = [{"messages": example.messages, "meta": example.meta} for example in examples]
+    if orjson is not None:
+        return [orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS) for row in rows]
+    return [(json.dumps(row, separators=(",", ":"), ensure_ascii=False) + "\n").encode() for row in rows]
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.tmp")
+
+def _shard_path(output_path: Path, i: int) -> Path:
+    return output_path.with_name(f"{output_path.stem}_{i}{output_path.suffix}")
+
+def _compressor(compression: Optional[str], level: int):
+    if compression == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    return None
+
+class _shard_file:
+    """
+    One output file under its temporary name, compressed and checksummed
+    as it is written. A buffered file keeps its data until finish(), so a
+    worker thread can do the compressing and writing.
+    """
+    def __init__(self, path: Path, compression: Optional[str], level: int, buffered: bool):
+        self.path = path
+        self.compression = compression
+        self.level = level
+        self._chunks: Optional[List[bytes]] = [] if buffered else None
+        self._file = None
+        self._compressor = None
+        self._sha256 = hashlib.sha256()
+        self._size = 0
+
+    def write(self, data: bytes):
+        if self._chunks is not None:
+            self._chunks.append(data)
+        else:
+            self._write(data)
+
+    def _write(self, data: bytes):
+        if self._file is None:
+            self._file = _tmp_path(self.path).open("wb")
+            self._compressor = _compressor(self.compression, self.level)
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        self._emit(data)
+
+    def _emit(self, data: bytes):
+        if data:
+            self._sha256.update(data)
+            self._file.write(data)
+            self._size += len(data)
+
+    def finish(self, counts: dict) -> dict:
+        """Writes out any buffered data and closes the file; returns its manifest entry."""
+        chunks, self._chunks = self._chunks or [], None
+        for data in chunks:
+            self._write(data)
+        self._write(b"")
+        if self._compressor is not None:
+            self._emit(self._compressor.flush())
+        self._file.close()
+        return {"path": self.path.name, **counts, "size": self._size, "sha256": self._sha256.hexdigest()}
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+        _tmp_path(self.path).unlink(missing_ok=True)
+
+class _shard_writer:
+    """Cuts a stream of serialised examples into shards at the size limits and writes them."""
+    def __init__(self, path_for, limits: Tuple[Optional[int], ...], compression: Optional[str], level: int, workers: int):
+        self._path_for = path_for
+        self._limited = any(limits)
+        self._max_examples, self._max_bytes, self._max_tokens = (limit or float("inf") for limit in limits)
+        self._counted_tokens = bool(limits[2])
+        self._compression = compression
+        self._level = level
+        self._workers = workers
+        # Only shards are handed to the pool: a single unsharded file would
+        # otherwise be buffered whole until the end.
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 and self._limited else None
+        self._shards: List[Tuple[_shard_file, Future]] = []
+        self._in_flight: Deque[Future] = deque()
+        self._file: Optional[_shard_file] = None
+        self._counts = {"examples": 0, "bytes": 0, "tokens": 0}
+
+    def add(self, lines: List[bytes], tokens: Optional[List[int]]):
+        if self._file is None:
+            self._open()
+        if not self._limited:
+            self._file.write(b"".join(lines))
+            self._counts["examples"] += len(lines)
+            self._counts["bytes"] += sum(map(len, lines))
+            return
+        counts = self._counts
+        start = 0
+        for i, line in enumerate(lines):
+            size, count = len(line), tokens[i] if tokens is not None else 0
+            if counts["examples"] and (
+                counts["examples"] + 1 > self._max_examples
+                or counts["bytes"] + size > self._max_bytes
+                or counts["tokens"] + count > self._max_tokens
+            ):
+                self._file.write(b"".join(lines[start:i]))
+                start = i
+                self._close()
+                self._open()
+                counts = self._counts
+            counts["examples"] += 1
+            counts["bytes"] += size
+            counts["tokens"] += count
+        self._file.write(b"".join(lines[start:]))
+
+    def _open(self):
+        self._file = _shard_file(self._path_for(len(self._shards)), self._compression, self._level, self._pool is not None)
+        self._counts = {"examples": 0, "bytes": 0, "tokens": 0}
+
+    def _close(self):
+        counts = dict(self._counts)
+        if not self._counted_tokens:
+            del counts["tokens"]
+        future: Future
+        if self._pool is None:
+            future = Future()
+            future.set_result(self._file.finish(counts))
+        else:
+            while len(self._in_flight) >= self._workers:
+                self._in_flight.popleft().result()
+            future = self._pool.submit(self._file.finish, counts)
+            self._in_flight.append(future)
+        self._shards.append((self._file, future))
+        self._file = None
+
+    def finish(self, empty_file: bool) -> List[dict]:
+        """Closes the last shard and waits for all of them; returns their manifest entries in order."""
+        if self._file is None and empty_file:
+            self._open()
+        if self._file is not None:
+            self._close()
+        entries = [future.result() for _, future in self._shards]
+        if self._pool is not None:
+            self._pool.shutdown()
+        return entries
+
+    def discard(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        for shard, _ in self._shards:
+            shard.discard()
+        if self._file is not None:
+            self._file.discard()
+
+def _commit(output_path: Path, entries: List[dict], compression: Optional[str]) -> List[Path]:
+    """Renames the new files into place, then replaces the manifest and removes files of the previous write."""
+    previous = read_manifest(output_path)
+    paths = [output_path.with_name(entry["path"]) for entry in entries]
+    for path in paths:
+        os.replace(_tmp_path(path), path)
+
+    manifest = {
+        "format": "jsonl",
+        "compression": compression,
+        "examples": sum(entry["examples"] for entry in entries),
+        "bytes": sum(entry["bytes"] for entry in entries),
+        "files": entries,
+    }
+    target = manifest_path(output_path)
+    with _tmp_path(target).open("w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(_tmp_path(target), target)
+
+    # Drop files left over from an earlier, larger or differently named build.
+    names = {path.name for path in paths}
+    stale = [output_path.with_name(entry["path"]) for entry in (previous or {}).get("files", [])]
+    i = len(paths)
+    while _shard_path(output_path, i).exists():
+        stale.append(_shard_path(output_path, i))
+        i += 1
+    for path in stale:
+        if path.name not in names:
+            path.unlink(missing_ok=True)
+    return paths
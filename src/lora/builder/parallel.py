@@ -0,0 +1,186 @@
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.core.schema import Example
+from src.core.tokens import tokenizer_name
+from .cache import build_cache, decode_item, encode_item
+from .converters import CONVERTER_VERSION, iter_file, iter_pdf_pages, pdf_page_count
+from .validators import MAX_CONTEXT_LENGTH
+
+# PDFs are converted in ranges of this many pages. The split does not depend
+# on the worker count, so every worker count produces the same output.
+PDF_PAGES_PER_TASK = 32
+
+# One unit of conversion work: a file, or a (first, last) page range of a PDF.
+Unit = Tuple[Path, Optional[Tuple[int, int]]]
+
+class _task(NamedTuple):
+    unit: Unit
+    part: int
+    parts: int
+    key: Optional[str]  # cache key of the file, when caching
+    cached: bool
+
+def cache_version(pages_per_task: int = PDF_PAGES_PER_TASK, max_tokens: int = MAX_CONTEXT_LENGTH) -> str:
+    """Everything besides a file's content that decides what it converts to, including the tokenizer that sizes chunks."""
+    return f"{CONVERTER_VERSION}.{max_tokens}.{pages_per_task}.{tokenizer_name()}"
+
+def plan_units(files: Iterable[Path], pages_per_task: int = PDF_PAGES_PER_TASK, cache: Optional[build_cache] = None) -> Iterator[_task]:
+    """Yields the tasks for `files` in order; a cached file is a single task."""
+    for path in files:
+        key = cache.key(path) if cache is not None else None
+        if key is not None and cache.has(key):
+            yield _task((path, None), 0, 1, key, True)
+            continue
+        if path.suffix.lower() != ".pdf":
+            yield _task((path, None), 0, 1, key, False)
+            continue
+        pages = pdf_page_count(path)
+        ranges = [(first, min(first + pages_per_task, pages)) for first in range(0, pages, pages_per_task)] or [(0, 0)]
+        for part, pages_range in enumerate(ranges):
+            yield _task((path, pages_range), part, len(ranges), key, False)
+
+def iter_unit(unit: Unit, max_tokens: int = MAX_CONTEXT_LENGTH) -> Iterator[Tuple[str, Example]]:
+    path, pages = unit
+    return iter_file(path, max_tokens) if pages is None else iter_pdf_pages(path, *pages, max_tokens)
+
+def _spool_unit(unit: Unit, spool_path: Path, max_tokens: int) -> Tuple[int, float]:
+    """Worker: converts one unit into a JSONL spool file; returns (examples, seconds)."""
+    start = time.perf_counter()
+    count = 0
+    with spool_path.open("w", encoding="utf-8") as f:
+        for location, example in iter_unit(unit, max_tokens):
+            f.write(encode_item(location, example))
+            count += 1
+    return count, time.perf_counter() - start
+
+def _read_spool(spool_path: Path) -> Iterator[Tuple[str, Example]]:
+    with spool_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            yield decode_item(line)
+    spool_path.unlink()
+
+def _timed(items: Iterator[Tuple[str, Example]], stats: dict) -> Iterator[Tuple[str, Example]]:
+    """Passes `items` through, recording their count and the time spent producing them."""
+    while True:
+        start = time.perf_counter()
+        item = next(items, None)
+        stats["elapsed"] += time.perf_counter() - start
+        if item is None:
+            return
+        stats["count"] += 1
+        yield item
+
+class _progress:
+    """Prints one line per finished file: examples, conversion time and parts."""
+    def __init__(self, files: int, verbose: bool):
+        self.files = files
+        self.verbose = verbose
+        self.done = 0
+        self._count = 0
+        self._elapsed = 0.0
+
+    def task_done(self, task: _task, count: int, elapsed: float):
+        if task.part == 0:
+            self._count, self._elapsed = 0, 0.0
+        self._count += count
+        self._elapsed += elapsed
+        if task.part == task.parts - 1:
+            self.done += 1
+            if self.verbose:
+                note = " (cached)" if task.cached else f" ({task.parts} parts)" if task.parts > 1 else ""
+                print(f"[{self.done}/{self.files}] {task.unit[0].name}: {self._count} examples in {self._elapsed:.2f}s{note}")
+
+def _serial(tasks: Iterator[_task], cache: Optional[build_cache], max_tokens: int):
+    for task in tasks:
+        stats = {"count": 0, "elapsed": 0.0}
+        items = cache.read(task.key) if task.cached else iter_unit(task.unit, max_tokens)
+        yield task, _timed(items, stats), stats
+
+def _pooled(tasks: Iterator[_task], cache: Optional[build_cache], workers: int, max_tokens: int):
+    """
+    Converts tasks in a process pool. Each one is spooled to a temporary
+    JSONL file and read back in submission order, with at most 2 * workers
+    conversions in flight, so memory stays bounded however large the files.
+    """
+    spool_dir = Path(tempfile.mkdtemp(prefix="lora-build-"))
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    in_flight = submitted = 0
+
+    def fill():
+        nonlocal in_flight, submitted
+        while in_flight < 2 * workers:
+            task = next(tasks, None)
+            if task is None:
+                return
+            if task.cached:
+                # Read in order by the consumer; doesn't occupy a worker.
+                pending.append((task, None, None))
+                continue
+            spool_path = spool_dir / f"{submitted}.jsonl"
+            pending.append((task, spool_path, pool.submit(_spool_unit, task.unit, spool_path, max_tokens)))
+            in_flight += 1
+            submitted += 1
+
+    try:
+        fill()
+        while pending:
+            task, spool_path, future = pending.popleft()
+            if future is None:
+                stats = {"count": 0, "elapsed": 0.0}
+                yield task, _timed(cache.read(task.key), stats), stats
+            else:
+                count, elapsed = future.result()
+                in_flight -= 1
+                fill()
+                yield task, _read_spool(spool_path), {"count": count, "elapsed": elapsed}
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+def convert_files(
+    files: List[Path],
+    workers: int = 1,
+    verbose: bool = False,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+    cache: Optional[build_cache] = None,
+    max_tokens: int = MAX_CONTEXT_LENGTH,
+) -> Iterator[Tuple[str, Example]]:
+    """
+    Streams (location, example) pairs from `files` in order, text chunked to
+    at most `max_tokens` tokens. A `cache` must have been opened with the
+    cache_version for the same `max_tokens`.
+
+    With `workers` > 1 the files (and page ranges of large PDFs) are
+    converted by a process pool; the output is the same as a serial run.
+    With a `cache`, files it already holds are read back from it instead of
+    being converted, and every other file is added to it once all of its
+    examples have streamed past.
+    """
+    progress = _progress(len(files), verbose)
+    tasks = plan_units(files, pages_per_task, cache)
+    results = _serial(tasks, cache, max_tokens) if workers <= 1 else _pooled(tasks, cache, workers, max_tokens)
+
+    writer = None
+    try:
+        for task, items, stats in results:
+            if cache is not None and not task.cached and task.part == 0:
+                writer = cache.writer(task.key)
+            for location, example in items:
+                if writer is not None:
+                    writer.write(location, example)
+                yield location, example
+            progress.task_done(task, stats["count"], stats["elapsed"])
+            if writer is not None and task.part == task.parts - 1:
+                writer.commit()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.discard()
+        results.close()
@@ -0,0 +1,222 @@
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.schema import Example
+from .packer import manifest_path
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib parser accepts bytes too
+    _loads = json.loads
+
+# Bytes scanned for line breaks per numpy call while indexing.
+_SCAN_BYTES = 64 << 20
+# Index rows converted to Python ints at a time when iterating.
+_SPANS_PER_BLOCK = 1 << 16
+# Compact JSON puts "meta" after "messages"; a quote outside a string is never
+# escaped, so these only match the key itself.
+_META_KEYS = (b',"meta":', b'{"meta":')
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+class _indexed_file:
+    """
+    One JSONL file, memory-mapped, with the (start, end) byte span of each
+    non-blank line.
+
+    The spans are saved to a `.idx` sidecar (a .npy array whose first row
+    holds the file's size and mtime) and memory-mapped from there on later
+    opens, so opening is instant whatever the file size. A sidecar that no
+    longer matches the file is rebuilt.
+    """
+    def __init__(self, path: Path, rebuild_index: bool = False):
+        self.path = path
+        stat = path.stat()
+        self._file = path.open("rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else None
+        spans = None if rebuild_index else self._load_index(stat)
+        if spans is None:
+            spans = self._build_index(stat)
+        self.spans = spans
+
+    def _load_index(self, stat: os.stat_result) -> Optional[np.ndarray]:
+        try:
+            table = np.load(index_path(self.path), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if table.ndim != 2 or table.shape[1] != 2 or len(table) == 0 or tuple(table[0]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return table[1:]
+
+    def _build_index(self, stat: os.stat_result) -> np.ndarray:
+        size = stat.st_size
+        starts = ends = np.zeros(0, dtype=np.int64)
+        if self._map is not None:
+            data = np.frombuffer(self._map, dtype=np.uint8)
+            breaks = np.concatenate(
+                [np.flatnonzero(data[pos : pos + _SCAN_BYTES] == 10) + pos for pos in range(0, size, _SCAN_BYTES)]
+            )
+            starts = np.concatenate(([0], breaks + 1))
+            ends = np.concatenate((breaks, [size]))
+            # Drop blank lines (and the "\r" of a blank CRLF line).
+            lengths = ends - starts
+            keep = (lengths > 1) | ((lengths == 1) & (data[np.minimum(starts, size - 1)] != 13))
+            starts, ends = starts[keep], ends[keep]
+            del data  # the mmap can't be closed while an array views it
+        table = np.empty((len(starts) + 1, 2), dtype=np.uint64)
+        table[0] = (size, stat.st_mtime_ns)
+        table[1:, 0] = starts
+        table[1:, 1] = ends
+        tmp_path = index_path(self.path).with_name(f".{index_path(self.path).name}.tmp")
+        try:
+            with tmp_path.open("wb") as f:
+                np.save(f, table)
+            os.replace(tmp_path, index_path(self.path))
+        except OSError:
+            # Read-only directory: keep the index in memory for this session.
+            tmp_path.unlink(missing_ok=True)
+        return table[1:]
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def raw(self, i: int) -> bytes:
+        start, end = self.spans[i].tolist()
+        return self._map[start:end]
+
+    def lines(self) -> Iterator[bytes]:
+        """Every line in order, reading the index in blocks."""
+        for first in range(0, len(self.spans), _SPANS_PER_BLOCK):
+            for start, end in self.spans[first : first + _SPANS_PER_BLOCK].tolist():
+                yield self._map[start:end]
+
+    def close(self):
+        self.spans = np.zeros((0, 2), dtype=np.uint64)
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+class jsonl_dataset:
+    """
+    Random access to a processed dataset: a JSONL file written by
+    write_jsonl, or all the files of its manifest when it is sharded (pass
+    either the `.jsonl` path or the manifest). Compressed files can't be
+    memory-mapped and are rejected.
+
+    Each file gets an offset index on first open (see _indexed_file), after
+    which `dataset[i]` reads and parses only example i. Iteration streams
+    through the files in order without loading them.
+    """
+    def __init__(self, path: Path, rebuild_index: bool = False):
+        path = Path(path)
+        self.path = path
+        self.files = [_indexed_file(p, rebuild_index) for p in self._data_files(path)]
+        self._ends = np.cumsum([len(f) for f in self.files], dtype=np.int64)
+        self._sources: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _data_files(path: Path) -> List[Path]:
+        if path.name.endswith(".manifest.json") or not path.exists():
+            manifest_file = path if path.name.endswith(".manifest.json") else manifest_path(path)
+            with manifest_file.open("r") as f:
+                manifest = json.load(f)
+            if manifest.get("compression"):
+                raise ValueError(f"{manifest_file.name}: {manifest['compression']}-compressed files can't be memory-mapped")
+            return [manifest_file.with_name(entry["path"]) for entry in manifest["files"]]
+        if path.suffix in (".gz", ".zst"):
+            raise ValueError(f"{path.name}: compressed files can't be memory-mapped")
+        return [path]
+
+    def __enter__(self) -> "jsonl_dataset":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+    def __len__(self) -> int:
+        return int(self._ends[-1]) if len(self._ends) else 0
+
+    def _locate(self, i: int) -> Tuple[_indexed_file, int]:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"Example {i} out of range for {n} examples")
+        part = int(np.searchsorted(self._ends, i, side="right"))
+        return self.files[part], i - (int(self._ends[part - 1]) if part else 0)
+
+    def raw(self, i: int) -> bytes:
+        """The JSON line of example `i`, without parsing it."""
+        f, j = self._locate(i)
+        return f.raw(j)
+
+    def __getitem__(self, i: int) -> Example:
+        return Example(**_loads(self.raw(i)))
+
+    def __iter__(self) -> Iterator[Example]:
+        for f in self.files:
+            for line in f.lines():
+                yield Example(**_loads(line))
+
+    def take(self, indices: Sequence[int]) -> Iterator[Example]:
+        for i in indices:
+            yield self[int(i)]
+
+    def sample(self, k: int, seed: Optional[int] = None) -> np.ndarray:
+        """`k` distinct example numbers drawn uniformly, in file order (for sequential reads)."""
+        k = min(k, len(self))
+        return np.sort(np.random.default_rng(seed).choice(len(self), size=k, replace=False))
+
+    def sources(self) -> np.ndarray:
+        """meta["source"] of every example ("" when missing); read once and kept."""
+        if self._sources is None:
+            self._sources = np.array([self._source(line) for f in self.files for line in f.lines()], dtype=object)
+        return self._sources
+
+    @staticmethod
+    def _source(line: bytes) -> str:
+        # Parse only the trailing meta object when the line ends with it.
+        line = line.rstrip()
+        for key in _META_KEYS:
+            at = line.rfind(key)
+            if at >= 0:
+                try:
+                    meta = _loads(line[at + len(key) : -1])
+                except ValueError:
+                    break
+                if isinstance(meta, dict):
+                    return str(meta.get("source", ""))
+                break
+        meta = _loads(line).get("meta") or {}
+        return str(meta.get("source", "")) if isinstance(meta, dict) else ""
+
+    def split(self, validation: float = 0.1, seed: int = 0, indices: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (train, validation) example numbers, in file order, of all examples
+        or of `indices`. Stratified by meta["source"]: each source
+        contributes round(`validation` * its size) examples, chosen at
+        random, to the validation split.
+        """
+        if not 0 <= validation <= 1:
+            raise ValueError(f"validation must be in [0, 1], got {validation}")
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices, dtype=np.int64)
+        _, codes = np.unique(self.sources()[indices].astype(str), return_inverse=True)
+        n = len(codes)
+        shuffled = np.random.default_rng(seed).permutation(n)
+        order = shuffled[np.argsort(codes[shuffled], kind="stable")]
+        counts = np.bincount(codes, minlength=int(codes.max()) + 1 if n else 0)
+        rank = np.arange(n) - np.repeat(np.cumsum(counts) - counts, counts)
+        chosen = rank < np.repeat(np.round(counts * validation), counts)
+        return np.sort(indices[order[~chosen]]), np.sort(indices[order[chosen]])
@@ -1,34 +1,268 @@
-from typing import List
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
 from src.core.schema import Example
+from src.core.tokens import count_tokens_batch
 
 MIN_EXAMPLES = 3
-MAX_CONTEXT_LENGTH = 4096  # Example value, should be configurable
+MAX_CONTEXT_LENGTH = 4096  # Tokens per chunk. Example value, should be configurable
+
+# Errors kept with their location in a report; the rest are only counted.
+MAX_REPORTED_ERRORS = 100
 
 class ValidationError(ValueError):
-    pass
+    def __init__(self, message: str, location: Optional[str] = None):
+        self.message = message
+        self.location = location
+        super().__init__(f"{location}: {message}" if location else message)
 
-def validate_roles(example: Example):
-    roles = [msg["role"] for msg in example.messages]
+    def __reduce__(self):
+        # Keeps the location when the error crosses a process boundary.
+        return type(self), (self.message, self.location)
+
+_role_errors: Dict[Tuple[str, ...], Optional[str]] = {}
+
+def _role_error(roles: Tuple[str, ...]) -> Optional[str]:
+    """What is wrong with a sequence of roles, or None; memoised, as datasets repeat a few patterns."""
+    if roles in _role_errors:
+        return _role_errors[roles]
+    error = None
     if not roles:
-        raise ValidationError("Example has no messages.")
-    
+        error = "Example has no messages."
     # Check for valid starting role (system or user)
-    if roles[0] not in ["system", "user"]:
-        raise ValidationError(f"Invalid starting role: {roles[0]}")
+    elif roles[0] not in ["system", "user"]:
+        error = f"Invalid starting role: {roles[0]}"
+    else:
+        # Check for alternating user/assistant roles
+        for i in range(1, len(roles)):
+            if roles[i] == roles[i-1]:
+                error = f"Consecutive roles found: {roles[i]}"
+                break
+            if roles[i] not in ["user", "assistant"]:
+                error = f"Invalid role in conversation: {roles[i]}"
+                break
+    if len(_role_errors) < 4096:
+        _role_errors[roles] = error
+    return error
 
-    # Check for alternating user/assistant roles
-    for i in range(1, len(roles)):
-        if roles[i] == roles[i-1]:
-            raise ValidationError(f"Consecutive roles found: {roles[i]}")
-        if roles[i] not in ["user", "assistant"]:
-            raise ValidationError(f"Invalid role in conversation: {roles[i]}")
+def validate_roles(example: Example):
+    error = _role_error(tuple(str(msg.get("role")) for msg in example.messages))
+    if error:
+        raise ValidationError(error)
+
+class validation_report:
+    """
+    Validates a stream of (location, example) pairs in one pass and gathers
+    statistics about it, without stopping at the first error.
+
+    Checks the roles of every example (each distinct role sequence is
+    checked once) and that its messages fit in `max_context_length` tokens.
+    The first `max_errors` errors are kept with their locations and all of
+    them are counted by kind. Token counts, message counts and per-source
+    totals are kept in numpy arrays, a few bytes per example, and turned
+    into histograms and percentiles by to_dict().
+    """
+    def __init__(self, max_context_length: Optional[int] = None, max_errors: int = MAX_REPORTED_ERRORS, batch_size: int = 256):
+        self.max_context_length = max_context_length or MAX_CONTEXT_LENGTH
+        self.max_errors = max_errors
+        self.batch_size = batch_size
+        self.examples = 0
+        self.aborted = False
+        self.errors: List[Tuple[Optional[str], str]] = []
+        self.error_counts: Dict[str, int] = {}
+        self.role_patterns: Dict[Tuple[str, ...], int] = {}
+        self._sources: Dict[str, int] = {}
+        self._tokens: List[np.ndarray] = []
+        self._messages: List[np.ndarray] = []
+        self._source_codes: List[np.ndarray] = []
+        self._failed: List[np.ndarray] = []
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.error_counts.values())
+
+    def add_error(self, message: str, location: Optional[str] = None, kind: Optional[str] = None):
+        """Counts an error under `kind` (by default the message up to its specifics) and keeps the first few."""
+        kind = kind or message.split(":")[0].rstrip(".")
+        self.error_counts[kind] = self.error_counts.get(kind, 0) + 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((location, message))
+
+    def check(self, examples: Iterable[Tuple[str, Example]]) -> Iterator[Tuple[str, Example]]:
+        """
+        Records every pair and passes on the valid ones. A ValidationError
+        from the stream itself (a file that can't be parsed further) is
+        recorded too, and ends the pass.
+        """
+        batch: List[Tuple[str, Example]] = []
+        try:
+            for pair in examples:
+                batch.append(pair)
+                if len(batch) == self.batch_size:
+                    yield from self._check_batch(batch)
+                    batch = []
+        except ValidationError as e:
+            yield from self._check_batch(batch)
+            self.add_error(e.message, e.location)
+            self.aborted = True
+            return
+        yield from self._check_batch(batch)
+
+    def _check_batch(self, batch: List[Tuple[str, Example]]) -> List[Tuple[str, Example]]:
+        if not batch:
+            return []
+        tokens = np.array(
+            count_tokens_batch(["\n".join(str(m.get("content", "")) for m in e.messages) for _, e in batch]), dtype=np.int64
+        )
+        failed = np.zeros(len(batch), dtype=bool)
+        codes = np.empty(len(batch), dtype=np.int32)
+        valid = []
+        for i, (location, example) in enumerate(batch):
+            roles = tuple(str(m.get("role")) for m in example.messages)
+            self.role_patterns[roles] = self.role_patterns.get(roles, 0) + 1
+            source = str(example.meta.get("source") or location.split(":")[0])
+            codes[i] = self._sources.setdefault(source, len(self._sources))
+
+            error = _role_error(roles)
+            if error is None and any("content" not in m for m in example.messages):
+                error = "Message without content."
+            if error is None and tokens[i] > self.max_context_length:
+                error = f"Example is too long: {tokens[i]} tokens, over the max context length of {self.max_context_length}."
+            if error is not None:
+                failed[i] = True
+                self.add_error(error, location)
+            else:
+                valid.append((location, example))
+        self.examples += len(batch)
+        self._tokens.append(tokens.astype(np.int32))
+        self._messages.append(np.fromiter((len(e.messages) for _, e in batch), dtype=np.int32, count=len(batch)))
+        self._source_codes.append(codes)
+        self._failed.append(failed)
+        return valid
+
+    def finish(self):
+        """Adds the errors only known once the stream is exhausted."""
+        if self.aborted:
+            return
+        valid = self.examples - int(sum(f.sum() for f in self._failed))
+        if valid < MIN_EXAMPLES:
+            self.add_error(f"Requires at least {MIN_EXAMPLES} examples, found {valid}.", kind="Too few examples")
+
+    def raise_for_errors(self):
+        """Raises a ValidationError naming the first error (and a few more) if there were any."""
+        if not self.errors:
+            return
+        location, message = self.errors[0]
+        rest = [f"{loc}: {msg}" if loc else msg for loc, msg in self.errors[1:10]]
+        if self.error_count > 1:
+            message += "\n" + "".join(f"  {line}\n" for line in rest) + f"{self.error_count} errors in total."
+        raise ValidationError(message, location)
+
+    def _arrays(self):
+        concat = lambda parts, dtype: np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+        return (
+            concat(self._tokens, np.int32),
+            concat(self._messages, np.int32),
+            concat(self._source_codes, np.int32),
+            concat(self._failed, bool),
+        )
+
+    def to_dict(self) -> dict:
+        tokens, messages, codes, failed = self._arrays()
+        # Powers of two up to the limit, then one bin for everything over it.
+        limit, longest = self.max_context_length, int(tokens.max(initial=0))
+        edges = sorted({0, limit + 1, *(2**k for k in range(6, (limit - 1).bit_length()))})
+        if longest > limit:
+            edges.append(longest + 1)
+        histogram, _ = np.histogram(tokens, bins=edges)
+        percentiles = np.percentile(tokens, [50, 90, 99]).tolist() if len(tokens) else [0, 0, 0]
+
+        names = list(self._sources)
+        sources = {
+            name: {"examples": int(n), "tokens": int(t), "errors": int(e)}
+            for name, n, t, e in zip(
+                names,
+                np.bincount(codes, minlength=len(names)),
+                np.bincount(codes, weights=tokens, minlength=len(names)),
+                np.bincount(codes, weights=failed, minlength=len(names)),
+            )
+        }
+        patterns = sorted(self.role_patterns.items(), key=lambda item: -item[1])
+        return {
+            "examples": self.examples,
+            "valid": self.examples - int(failed.sum()),
+            "complete": not self.aborted,
+            "max_context_length": self.max_context_length,
+            "errors": {
+                "total": self.error_count,
+                "by_kind": dict(sorted(self.error_counts.items(), key=lambda item: -item[1])),
+                "first": [{"location": location, "message": message} for location, message in self.errors],
+            },
+            "tokens": {
+                "total": int(tokens.sum()),
+                "mean": float(tokens.mean()) if len(tokens) else 0.0,
+                "p50": percentiles[0],
+                "p90": percentiles[1],
+                "p99": percentiles[2],
+                "max": int(tokens.max(initial=0)),
+                "over_max_context_length": int((tokens > self.max_context_length).sum()),
+                "histogram": {"edges": edges, "counts": histogram.tolist()},
+            },
+            "messages": {"mean": float(messages.mean()) if len(messages) else 0.0, "max": int(messages.max(initial=0))},
+            "role_patterns": {" ".join(roles) or "(none)": count for roles, count in patterns[:20]},
+            "sources": sources,
+        }
+
+    def write(self, path: Path):
+        with path.open("w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def summary(self) -> str:
+        report = self.to_dict()
+        tokens, errors = report["tokens"], report["errors"]
+        lines = [
+            f"{report['examples']} examples, {report['valid']} valid, {errors['total']} errors.",
+            f"Tokens per example: mean {tokens['mean']:.0f}, p50 {tokens['p50']:.0f}, p90 {tokens['p90']:.0f}, "
+            f"p99 {tokens['p99']:.0f}, max {tokens['max']} (limit {report['max_context_length']}).",
+            "Token histogram:",
+        ]
+        edges, counts = tokens["histogram"]["edges"], tokens["histogram"]["counts"]
+        for low, high, count in zip(edges, edges[1:], counts):
+            lines.append(f"  {low:>7}-{high - 1:<7} {count}")
+        lines.append("Role patterns:")
+        lines += [f"  {count:>8}  {pattern}" for pattern, count in report["role_patterns"].items()]
+        lines.append("Sources:")
+        lines += [f"  {s['examples']:>8} examples {s['tokens']:>10} tokens {s['errors']:>6} errors  {name}" for name, s in report["sources"].items()]
+        if errors["total"]:
+            lines.append("Errors by kind:")
+            lines += [f"  {count:>8}  {kind}" for kind, count in errors["by_kind"].items()]
+            lines.append(f"First {len(errors['first'])} errors:")
+            lines += [f"  {e['location']}: {e['message']}" if e["location"] else f"  {e['message']}" for e in errors["first"]]
+        return "\n".join(lines)
+
+def validate_stream(examples: Iterable[Tuple[str, Example]], report: Optional[validation_report] = None) -> Iterator[Example]:
+    """
+    Validates (location, example) pairs as they stream past and yields the
+    valid examples. Errors are collected in `report` rather than raised one
+    at a time; once the stream is exhausted (and the minimum count checked),
+    a ValidationError names the first error, with its file and line, and
+    how many there were.
+    """
+    report = report or validation_report()
+    for _, example in report.check(examples):
+        yield example
+    report.finish()
+    report.raise_for_errors()
 
 def validate_examples(examples: List[Example]):
     if len(examples) < MIN_EXAMPLES:
         raise ValidationError(f"Requires at least {MIN_EXAMPLES} examples, found {len(examples)}.")
-    
+
     for i, example in enumerate(examples):
         try:
             validate_roles(example)
         except ValidationError as e:
-            raise ValidationError(f"Error in example {i}: {e}") from e
\ No newline at end of file
+            raise ValidationError(f"Error in example {i}: {e}") from e
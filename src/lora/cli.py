@@ -1,9 +1,17 @@
 import argparse
+import asyncio
 import json
 import shutil
+import sys
+import time
 from pathlib import Path
-from .orchestrator import build_dataset, train_lora
+from .builder import ValidationError, jsonl_dataset, write_jsonl
+from .builder.packer import read_manifest
+from .orchestrator import PROCESSED_DIR, build_dataset, sweep_lora, train_lora, validate_dataset
+from .fireworks.client import fireworks_client
 from .fireworks.config_schema import TrainingParams, LoRAParams
+from .fireworks.sft_job import sft_job_manager
+from .fireworks.upload import upload_dataset
 
 REGISTRY_PATH = Path(__file__).parent / "registry.json"
 RAW_DATA_DIR = Path(__file__).parent / "data/raw"
@@ -26,6 +34,28 @@ def list_loras():
     for entry in registry:
         print(f"{entry['name']:<20} {entry['provider']:<15} {entry['base_model']:<40} {entry['trained_at']:<25}")
 
+def list_jobs(attach: bool, poll_interval: float):
+    """Prints the SFT jobs launched from this machine; with `attach`, waits for the unfinished ones."""
+    manager = sft_job_manager(fireworks_client(), poll_interval=poll_interval)
+    if attach:
+        asyncio.run(manager.run())
+    if not manager.jobs:
+        print("No SFT jobs have been launched.")
+        return
+    print(f"{'Name':<40} {'Job ID':<25} {'Status':<15} {'Updated At':<25}")
+    print("-" * 105)
+    for name, job in manager.jobs.items():
+        print(f"{name:<40} {job['job_id'] or '':<25} {job['status']:<15} {job.get('updated_at', ''):<25}")
+
+def _parse_grid(values: list[str]) -> dict:
+    grid = {}
+    for value in values:
+        key, _, options = value.partition("=")
+        if not options:
+            raise SystemExit(f"Expected --grid PARAM=VALUE,VALUE..., got '{value}'.")
+        grid[key.replace("-", "_")] = options.split(",")
+    return grid
+
 def stage_files(dataset_name: str, source_files: list[Path]):
     """Copies source files to the specified dataset directory."""
     dataset_dir = RAW_DATA_DIR / dataset_name
@@ -39,6 +69,47 @@ def stage_files(dataset_name: str, source_files: list[Path]):
         shutil.copy(source_file, destination)
         print(f"Copied '{source_file}' to '{destination}'")
 
+def _open_processed(dataset_name: str) -> jsonl_dataset:
+    path = PROCESSED_DIR / f"{dataset_name}.jsonl"
+    try:
+        return jsonl_dataset(path)
+    except FileNotFoundError:
+        print(f"Dataset '{dataset_name}' has not been built; run 'build {dataset_name}' first.")
+        sys.exit(1)
+
+def preview_dataset(dataset_name: str, indices: list[int], sample: int, seed: int, width: int):
+    """Prints chosen, randomly sampled or the first few examples of a built dataset."""
+    with _open_processed(dataset_name) as dataset:
+        print(f"Dataset '{dataset_name}': {len(dataset)} examples in {len(dataset.files)} file(s).")
+        if not indices:
+            indices = dataset.sample(sample, seed).tolist() if sample else list(range(min(5, len(dataset))))
+        for i in indices:
+            example = dataset[i]
+            print(f"#{i} [{example.meta.get('source', '')}]")
+            for message in example.messages:
+                content = " ".join(str(message.get("content", "")).split())
+                print(f"  {message.get('role')}: {content[:width]}{'...' if len(content) > width else ''}")
+
+def split_dataset(dataset_name: str, validation: float, seed: int, sample: int):
+    """Writes stratified <name>_train.jsonl and <name>_val.jsonl next to a built dataset."""
+    with _open_processed(dataset_name) as dataset:
+        indices = dataset.sample(sample, seed) if sample else None
+        train, val = dataset.split(validation, seed, indices)
+        for suffix, part in (("train", train), ("val", val)):
+            output_path = PROCESSED_DIR / f"{dataset_name}_{suffix}.jsonl"
+            write_jsonl(dataset.take(part), output_path)
+            print(f"Wrote {len(part)} examples to {output_path}")
+        sources = dataset.sources()
+        print(f"Stratified over {len(set(sources[train]) | set(sources[val]))} sources.")
+
+def upload(dataset_name: str, dataset_id: str, workers: int, part_mb: float):
+    """Uploads a built dataset to Fireworks, resuming an interrupted upload."""
+    path = PROCESSED_DIR / f"{dataset_name}.jsonl"
+    if not path.exists() and read_manifest(path) is None:
+        print(f"Dataset '{dataset_name}' has not been built; run 'build {dataset_name}' first.")
+        sys.exit(1)
+    upload_dataset(path, dataset_id or dataset_name, fireworks_client(), workers=workers, part_bytes=int(part_mb * 1e6))
+
 def main():
     parser = argparse.ArgumentParser(description="LoRA Fine-tuning CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -51,28 +122,80 @@ def main():
     # Build command
     build_parser = subparsers.add_parser("build", help="Build a dataset from a directory of raw files.")
     build_parser.add_argument("dataset_name", type=str, help="Name of the dataset directory in src/lora/data/raw.")
+    build_parser.add_argument("--workers", type=int, default=1, help="Processes converting files (and page ranges of large PDFs) in parallel.")
+    build_parser.add_argument("--no-cache", action="store_true", help="Reconvert every file instead of reusing cached conversions.")
+    build_parser.add_argument("--no-dedup", action="store_true", help="Keep duplicate examples.")
+    build_parser.add_argument("--near-dup-threshold", type=float, default=0.8, help="Estimated Jaccard similarity above which examples count as near duplicates; 1 keeps only exact-duplicate removal.")
+    build_parser.add_argument("--shard-mb", type=float, help="Split the output into shards of at most this many MB of JSONL.")
+    build_parser.add_argument("--shard-tokens", type=int, help="Split the output into shards of at most this many tokens.")
+    build_parser.add_argument("--compression", choices=["gzip", "zstd"], help="Compress the output files.")
+    build_parser.add_argument("--max-context-length", type=int, help="Tokens an example may have (default: MAX_CONTEXT_LENGTH).")
+
+    # Validate command
+    validate_parser = subparsers.add_parser("validate", help="Check every example of a raw dataset and report statistics, without building it.")
+    validate_parser.add_argument("dataset_name", type=str, help="Name of the dataset directory in src/lora/data/raw.")
+    validate_parser.add_argument("--max-context-length", type=int, help="Tokens an example may have (default: MAX_CONTEXT_LENGTH).")
+    validate_parser.add_argument("--max-errors", type=int, default=100, help="Errors listed with their location; all are counted.")
+    validate_parser.add_argument("--workers", type=int, default=1, help="Processes converting files in parallel.")
+    validate_parser.add_argument("--report", type=Path, help="Also write the report as JSON to this path.")
+
+    # Preview command
+    preview_parser = subparsers.add_parser("preview", help="Show examples of a built dataset.")
+    preview_parser.add_argument("dataset_name", type=str, help="Name of a dataset in src/lora/data/processed.")
+    preview_parser.add_argument("indices", type=int, nargs="*", help="Example numbers to show (default: the first 5).")
+    preview_parser.add_argument("--sample", type=int, default=0, help="Show this many examples chosen at random.")
+    preview_parser.add_argument("--seed", type=int)
+    preview_parser.add_argument("--width", type=int, default=200, help="Characters shown per message.")
+
+    # Split command
+    split_parser = subparsers.add_parser("split", help="Split a built dataset into train and validation files, stratified by source.")
+    split_parser.add_argument("dataset_name", type=str, help="Name of a dataset in src/lora/data/processed.")
+    split_parser.add_argument("--validation", type=float, default=0.1, help="Share of each source's examples to hold out.")
+    split_parser.add_argument("--seed", type=int, default=0)
+    split_parser.add_argument("--sample", type=int, default=0, help="Split a random subsample of this many examples.")
+
+    # Upload command
+    upload_parser = subparsers.add_parser("upload", help="Upload a built dataset to Fireworks; rerun to resume an interrupted upload.")
+    upload_parser.add_argument("dataset_name", type=str, help="Name of a dataset in src/lora/data/processed.")
+    upload_parser.add_argument("--dataset-id", type=str, help="Fireworks dataset id (default: the dataset name).")
+    upload_parser.add_argument("--workers", type=int, default=4, help="Parts uploaded at once.")
+    upload_parser.add_argument("--part-mb", type=float, default=64, help="Largest part uploaded in one request, in MB.")
 
     # List command
     list_parser = subparsers.add_parser("list", help="List all registered LoRA models.")
 
-    # Train command
-    train_parser = subparsers.add_parser("train", help="Launch a LoRA training job.")
-    train_parser.add_argument("--name", type=str, required=True, help="A unique name for the LoRA model in the registry.")
-    train_parser.add_argument("--dataset_name", type=str, required=True, help="Name of the dataset directory to use.")
+    # Training and LoRA parameters, shared by train and sweep
+    training_args = argparse.ArgumentParser(add_help=False)
+    training_args.add_argument("--name", type=str, required=True, help="A unique name for the LoRA model in the registry.")
+    training_args.add_argument("--dataset_name", type=str, required=True, help="Name of the dataset directory to use.")
     # TrainingParams
-    train_parser.add_argument("--base_model", type=str, required=True)
-    train_parser.add_argument("--output_model", type=str, required=True)
-    train_parser.add_argument("--learning_rate", type=float, default=1e-4)
-    train_parser.add_argument("--epochs", type=int, default=1)
-    train_parser.add_argument("--batch_size", type=str, default="max")
-    train_parser.add_argument("--early_stop", action="store_true")
-    train_parser.add_argument("--max_context_length", type=int)
-    train_parser.add_argument("--turbo", action="store_true")
+    training_args.add_argument("--base_model", type=str, required=True)
+    training_args.add_argument("--output_model", type=str, required=True)
+    training_args.add_argument("--learning_rate", type=float, default=1e-4)
+    training_args.add_argument("--epochs", type=int, default=1)
+    training_args.add_argument("--batch_size", type=str, default="max")
+    training_args.add_argument("--early_stop", action="store_true")
+    training_args.add_argument("--max_context_length", type=int)
+    training_args.add_argument("--turbo", action="store_true")
     # LoRAParams
-    train_parser.add_argument("--r", type=int, default=8)
-    train_parser.add_argument("--alpha", type=int, default=8)
-    train_parser.add_argument("--dropout", type=float, default=0.0)
-    train_parser.add_argument("--target_modules", nargs="+", default=["q_proj", "k_proj", "v_proj", "o_proj", "up_proj", "down_proj", "gate_proj"])
+    training_args.add_argument("--r", type=int, default=8)
+    training_args.add_argument("--alpha", type=int, default=8)
+    training_args.add_argument("--dropout", type=float, default=0.0)
+    training_args.add_argument("--target_modules", nargs="+", default=["q_proj", "k_proj", "v_proj", "o_proj", "up_proj", "down_proj", "gate_proj"])
+
+    # Train command
+    subparsers.add_parser("train", parents=[training_args], help="Launch a LoRA training job.")
+
+    # Sweep command
+    sweep_parser = subparsers.add_parser("sweep", parents=[training_args], help="Launch one LoRA training job per combination of parameter values, concurrently.")
+    sweep_parser.add_argument("--grid", action="append", default=[], metavar="PARAM=VALUE,VALUE", help="Values to sweep for a training or LoRA parameter; repeat for a grid.")
+    sweep_parser.add_argument("--max-concurrent", type=int, default=4, help="Jobs running on Fireworks at once.")
+    sweep_parser.add_argument("--poll-interval", type=float, default=30, help="Seconds between status checks of a changing job; doubles while it doesn't change.")
+
+    # Jobs command
+    jobs_parser = subparsers.add_parser("jobs", help="List launched SFT jobs, or reattach to the unfinished ones.")
+    jobs_parser.add_argument("--attach", action="store_true", help="Wait for unfinished jobs and register them as they complete.")
+    jobs_parser.add_argument("--poll-interval", type=float, default=30)
 
     args = parser.parse_args()
 
@@ -80,11 +203,52 @@ def main():
         stage_files(args.dataset_name, args.source_files)
     elif args.command == "build":
         dataset_dir = RAW_DATA_DIR / args.dataset_name
-        build_dataset(dataset_dir)
-        print(f"Dataset '{args.dataset_name}' built successfully.")
+        started = time.perf_counter()
+        try:
+            output_path = build_dataset(
+                dataset_dir,
+                workers=args.workers,
+                verbose=True,
+                use_cache=not args.no_cache,
+                dedup=not args.no_dedup,
+                near_duplicate_threshold=args.near_dup_threshold if args.near_dup_threshold < 1 else None,
+                shard_bytes=int(args.shard_mb * 1e6) if args.shard_mb else None,
+                shard_tokens=args.shard_tokens,
+                compression=args.compression,
+                max_context_length=args.max_context_length,
+            )
+        except ValidationError as e:
+            print(f"Dataset '{args.dataset_name}' is invalid: {e}")
+            sys.exit(1)
+        print(f"Dataset '{args.dataset_name}' built successfully in {time.perf_counter() - started:.1f}s: {output_path}")
+    elif args.command == "validate":
+        try:
+            report = validate_dataset(
+                RAW_DATA_DIR / args.dataset_name,
+                max_context_length=args.max_context_length,
+                max_errors=args.max_errors,
+                workers=args.workers,
+            )
+        except FileNotFoundError as e:
+            print(e)
+            sys.exit(1)
+        print(report.summary())
+        if args.report:
+            report.write(args.report)
+            print(f"Report written to {args.report}")
+        if report.error_count:
+            sys.exit(1)
+    elif args.command == "preview":
+        preview_dataset(args.dataset_name, args.indices, args.sample, args.seed, args.width)
+    elif args.command == "split":
+        split_dataset(args.dataset_name, args.validation, args.seed, args.sample)
+    elif args.command == "upload":
+        upload(args.dataset_name, args.dataset_id, args.workers, args.part_mb)
     elif args.command == "list":
         list_loras()
-    elif args.command == "train":
+    elif args.command == "jobs":
+        list_jobs(args.attach, args.poll_interval)
+    elif args.command in ("train", "sweep"):
         training_params = TrainingParams(
             base_model=args.base_model,
             dataset_id=args.dataset_name,
@@ -102,7 +266,24 @@ def main():
             dropout=args.dropout,
             target_modules=args.target_modules,
         )
-        train_lora(args.name, args.dataset_name, training_params, lora_params)
+        if args.command == "train":
+            train_lora(args.name, args.dataset_name, training_params, lora_params)
+            return
+        try:
+            jobs = sweep_lora(
+                args.name,
+                args.dataset_name,
+                training_params,
+                lora_params,
+                _parse_grid(args.grid),
+                max_concurrent=args.max_concurrent,
+                poll_interval=args.poll_interval,
+            )
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        for name, job in jobs.items():
+            print(f"{name}: {job['status']}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
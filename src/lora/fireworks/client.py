@@ -1,11 +1,109 @@
+import base64
+import json
+import os
+import re
 import subprocess
 from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import httpx
+
 from .config_schema import TrainingParams, LoRAParams
 
+def _model_id(model: str) -> str:
+    """The <id> of "accounts/<account>/models/<id>" or "<account>/<id>"."""
+    return model.rsplit("/", 1)[-1]
+
+def _with_status(job: dict) -> dict:
+    """Adds the job's state under "status", lowercase without the JOB_STATE_ prefix."""
+    state = job.get("state") if isinstance(job.get("state"), str) else job.get("status")
+    job["status"] = str(state or "unknown").lower().removeprefix("job_state_")
+    return job
+
 class fireworks_client:
-    def _run_command(self, cmd: list[str]):
+    """
+    Fireworks control-plane client: firectl for jobs, and the REST datasets
+    API (`api_base`/accounts/<account>) for uploads. The account and key
+    default to the FIREWORKS_ACCOUNT_ID and FIREWORKS_API_KEY environment
+    variables.
+    """
+    def __init__(
+        self,
+        api_base: str = "https://api.fireworks.ai/v1",
+        account_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: float = 300.0,
+    ):
+        self.api_base = api_base.rstrip("/")
+        self.account_id = account_id
+        self.api_key = api_key
+        self.timeout = timeout
+        self._http: Optional[httpx.Client] = None
+
+    @property
+    def http(self) -> httpx.Client:
+        if self._http is None:
+            self._http = httpx.Client(timeout=httpx.Timeout(self.timeout, connect=10.0))
+        return self._http
+
+    def _url(self, path: str) -> str:
+        account_id = self.account_id or os.getenv("FIREWORKS_ACCOUNT_ID")
+        if not account_id:
+            raise ValueError("Fireworks account not set. Please set the FIREWORKS_ACCOUNT_ID environment variable.")
+        return f"{self.api_base}/accounts/{account_id}/{path}"
+
+    def _headers(self) -> dict:
+        api_key = self.api_key or os.getenv("FIREWORKS_API_KEY")
+        if not api_key:
+            raise ValueError("Fireworks API key not set. Please set the FIREWORKS_API_KEY environment variable.")
+        return {"Authorization": f"Bearer {api_key}"}
+
+    def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        response = self.http.request(method, self._url(path), headers=self._headers(), **kwargs)
+        response.raise_for_status()
+        return response
+
+    def get_dataset(self, dataset_id: str) -> Optional[dict]:
+        """The dataset resource, or None if there is no dataset with this id."""
         try:
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
+            return self._request("GET", f"datasets/{dataset_id}").json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+
+    def create_dataset_record(self, dataset_id: str, example_count: int, display_name: str) -> dict:
+        """Creates an empty user-uploaded dataset for files to be uploaded into."""
+        body = {
+            "datasetId": dataset_id,
+            "dataset": {"displayName": display_name, "exampleCount": str(example_count), "userUploaded": {}},
+        }
+        return self._request("POST", "datasets", json=body).json()
+
+    def delete_dataset(self, dataset_id: str):
+        self._request("DELETE", f"datasets/{dataset_id}")
+
+    def upload_urls(self, dataset_id: str, sizes: Dict[str, int]) -> Dict[str, str]:
+        """Signed URLs to PUT each of the named files (of the given sizes) to."""
+        response = self._request("POST", f"datasets/{dataset_id}:getUploadEndpoint", json={"filenameToSize": sizes})
+        return response.json()["filenameToSignedUrls"]
+
+    def put_file(self, url: str, body: Iterable[bytes], size: int, md5: bytes):
+        """Uploads one file to a signed URL; the storage service checks it against `md5`."""
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(size),
+            "Content-MD5": base64.b64encode(md5).decode(),
+        }
+        self.http.put(url, content=body, headers=headers).raise_for_status()
+
+    def validate_upload(self, dataset_id: str):
+        """Marks the uploaded files complete; the dataset becomes ready."""
+        self._request("POST", f"datasets/{dataset_id}:validateUpload", json={})
+
+    def _run_command(self, cmd: list[str]) -> subprocess.CompletedProcess:
+        try:
+            return subprocess.run(cmd, check=True, capture_output=True, text=True)
         except subprocess.CalledProcessError as e:
             print(f"Error executing command: {' '.join(cmd)}")
             print(f"Stderr: {e.stderr}")
@@ -15,9 +113,10 @@ class fireworks_client:
         cmd = ["firectl", "create", "dataset", dataset_id, str(dataset_path)]
         self._run_command(cmd)
 
-    def launch_sft(self, p: TrainingParams, lora: LoRAParams):
+    def launch_sft(self, p: TrainingParams, lora: LoRAParams) -> str:
+        """Creates a supervised fine-tuning job and returns its id."""
         cmd = [
-            "firectl", "create", "sftj",
+            "firectl", "create", "sftj", "--output", "json",
             "--base-model", p.base_model,
             "--dataset", p.dataset_id,
             "--output-model", p.output_model,
@@ -35,13 +134,36 @@ class fireworks_client:
             cmd += ["--max-context-length", str(p.max_context_length)]
         if p.turbo:
             cmd.append("--turbo")
-        
-        self._run_command(cmd)
 
-    def get_sft_job_status(self, job_id: str):
-        cmd = ["firectl", "get", "sftj", job_id]
         result = self._run_command(cmd)
-        # This assumes the output is JSON, which may need adjustment
-        # based on the actual output of `firectl`.
-        import json
-        return json.loads(result.stdout)
\ No newline at end of file
+        try:
+            name = json.loads(result.stdout)["name"]
+        except (ValueError, KeyError, TypeError):
+            # Text output: "Name: accounts/<account>/supervisedFineTuningJobs/<id>"
+            match = re.search(r"supervisedFineTuningJobs/([\w-]+)", result.stdout)
+            if not match:
+                raise ValueError(f"No job id in the output of {' '.join(cmd[:3])}: {result.stdout[:200]!r}")
+            name = match.group(0)
+        return name.rsplit("/", 1)[-1]
+
+    def get_sft_job_status(self, job_id: str) -> dict:
+        """
+        The job as firectl reports it, with its state under "status"
+        normalised to lowercase without the JOB_STATE_ prefix ("running",
+        "completed", "failed", ...).
+        """
+        result = self._run_command(["firectl", "get", "sftj", job_id, "--output", "json"])
+        return _with_status(json.loads(result.stdout))
+
+    def find_sft_job(self, output_model: str) -> Optional[dict]:
+        """
+        The fine-tuning job writing `output_model`, as get_sft_job_status
+        reports it plus its id under "job_id", or None if there is none.
+        """
+        result = self._run_command(["firectl", "list", "sftj", "--output", "json"])
+        listed = json.loads(result.stdout or "[]")
+        jobs = listed if isinstance(listed, list) else listed.get("supervisedFineTuningJobs") or listed.get("jobs") or []
+        for job in jobs:
+            if _model_id(job.get("outputModel", "")) == _model_id(output_model):
+                return {**_with_status(job), "job_id": job["name"].rsplit("/", 1)[-1]}
+        return None
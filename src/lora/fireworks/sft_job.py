@@ -1,13 +1,22 @@
-import time
+import asyncio
+import itertools
 import json
+import os
+import re
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
 from .client import fireworks_client
 from .config_schema import TrainingParams, LoRAParams
 
 REGISTRY_PATH = Path(__file__).parent.parent / "registry.json"
+# Jobs launched by sft_job_manager, so a restarted CLI can reattach to them.
+JOBS_PATH = Path(__file__).parent.parent / "jobs.json"
 
-def _update_lora_registry(lora_name: str, provider: str, params: TrainingParams):
+# Job states after which nothing changes. "launch_failed" is local: firectl refused the job.
+TERMINAL_STATES = {"completed", "failed", "cancelled", "expired", "launch_failed"}
+
+def _update_lora_registry(lora_name: str, provider: str, params: TrainingParams, registry_path: Path = REGISTRY_PATH):
     """Adds a new entry to the LoRA registry."""
     entry = {
         "name": lora_name,
@@ -16,40 +25,231 @@ def _update_lora_registry(lora_name: str, provider: str, params: TrainingParams)
         "base_model": params.base_model,
         "trained_at": datetime.utcnow().isoformat(),
     }
-    
+
     registry = []
-    if REGISTRY_PATH.exists():
-        with REGISTRY_PATH.open("r") as f:
+    if registry_path.exists():
+        with registry_path.open("r") as f:
             registry = json.load(f)
-            
+
     registry.append(entry)
-    
-    with REGISTRY_PATH.open("w") as f:
+
+    with registry_path.open("w") as f:
         json.dump(registry, f, indent=2)
-    
+
     print(f"Successfully added '{lora_name}' to the registry.")
 
+class sft_spec(NamedTuple):
+    name: str  # registry name of the LoRA
+    training: TrainingParams
+    lora: LoRAParams
+
+def _slug(value: Any) -> str:
+    return re.sub(r"[^a-z0-9.-]+", "-", str(value).lower()).replace(".", "p").strip("-")
+
+def sweep(name: str, training: TrainingParams, lora: LoRAParams, grid: Dict[str, List[Any]]) -> List[sft_spec]:
+    """
+    One spec per combination of `grid` values, e.g. {"learning_rate": [1e-4,
+    2e-4], "r": [8, 16]} gives four. Keys are TrainingParams or LoRAParams
+    fields; each combination is named `<name>-<key>-<value>...` and gets an
+    output model with the same suffix.
+    """
+    unknown = [key for key in grid if key not in TrainingParams.model_fields and key not in LoRAParams.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown parameters in the sweep: {', '.join(unknown)}")
+    specs = []
+    for values in itertools.product(*grid.values()):
+        update = dict(zip(grid, values))
+        suffix = "-".join(f"{_slug(key)}-{_slug(value)}" for key, value in update.items())
+        training_update = {key: value for key, value in update.items() if key in TrainingParams.model_fields}
+        lora_update = {key: value for key, value in update.items() if key in LoRAParams.model_fields}
+        if suffix:
+            training_update["output_model"] = f"{training.output_model}-{suffix}"
+        specs.append(sft_spec(
+            f"{name}-{suffix}" if suffix else name,
+            TrainingParams(**{**training.model_dump(), **training_update}),
+            LoRAParams(**{**lora.model_dump(), **lora_update}),
+        ))
+    return specs
+
+class sft_job_manager:
+    """
+    Runs supervised fine-tuning jobs concurrently: at most `max_concurrent`
+    are on Fireworks at a time, and one loop polls all of them. Each job is
+    polled on its own interval, starting at `poll_interval` and doubling up
+    to `max_poll_interval` while its state doesn't change, so long training
+    runs cost a few calls an hour. firectl calls run in threads.
+
+    Every job, with its parameters and last state, is saved to `state_path`
+    as it changes, and marked "launching" before firectl is asked to create
+    it. A new manager (a restarted CLI) reattaches to the jobs still running
+    rather than launching them again; a job interrupted while launching is
+    looked up by its output model and only launched if it doesn't exist.
+    Each completed job is added to the registry exactly once.
+    """
+    def __init__(
+        self,
+        client: fireworks_client,
+        state_path: Path = JOBS_PATH,
+        registry_path: Path = REGISTRY_PATH,
+        max_concurrent: int = 4,
+        poll_interval: float = 30.0,
+        max_poll_interval: float = 600.0,
+    ):
+        self.client = client
+        self.state_path = state_path
+        self.registry_path = registry_path
+        self.max_concurrent = max_concurrent
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.jobs: Dict[str, dict] = {}
+        try:
+            with state_path.open("r") as f:
+                self.jobs = json.load(f)["jobs"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save(self):
+        tmp_path = self.state_path.with_name(f".{self.state_path.name}.tmp")
+        with tmp_path.open("w") as f:
+            json.dump({"jobs": self.jobs}, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def _set(self, name: str, **fields):
+        self.jobs[name].update(fields, updated_at=datetime.utcnow().isoformat())
+        self._save()
+
+    def add(self, specs: Iterable[sft_spec]) -> List[str]:
+        """
+        Records specs to launch and returns their names. A name that already
+        completed or is still running is kept as it is; a failed one is
+        launched again.
+        """
+        names = []
+        for spec in specs:
+            job = self.jobs.get(spec.name)
+            if job is not None and (job["status"] == "completed" or job["status"] not in TERMINAL_STATES):
+                print(f"'{spec.name}' is already {job['status']} (job {job['job_id']}); not launching it again.")
+            else:
+                self.jobs[spec.name] = {
+                    "job_id": None,
+                    "status": "pending",
+                    "training": spec.training.model_dump(),
+                    "lora": spec.lora.model_dump(),
+                }
+            names.append(spec.name)
+        if names:
+            self._save()
+        return names
+
+    def unfinished(self) -> List[str]:
+        return [name for name, job in self.jobs.items() if job["status"] not in TERMINAL_STATES or self._unregistered(name)]
+
+    def _unregistered(self, name: str) -> bool:
+        return self.jobs[name]["status"] == "completed" and not self.jobs[name].get("registered")
+
+    async def run(self, specs: Iterable[sft_spec] = (), names: Optional[List[str]] = None) -> Dict[str, dict]:
+        """
+        Launches `specs` and waits until they and the jobs in `names` are
+        finished; with neither, waits for every unfinished job in the state
+        file. Returns the state of those jobs.
+        """
+        names = list(dict.fromkeys(self.add(specs) + list(names or []))) or self.unfinished()
+        return await self._watch(names)
+
+    async def _watch(self, names: List[str]) -> Dict[str, dict]:
+        loop = asyncio.get_running_loop()
+        # A launch interrupted before firectl answered may still have created the job.
+        launching = [name for name in names if self.jobs[name]["status"] == "launching"]
+        found = await asyncio.gather(
+            *(asyncio.to_thread(self.client.find_sft_job, self.jobs[name]["training"]["output_model"]) for name in launching),
+            return_exceptions=True,
+        )
+        for name, job in zip(launching, found):
+            if isinstance(job, BaseException):
+                print(f"Looking up the interrupted launch of '{name}' failed: {job}; it is left for the next run.")
+            elif job is None:
+                print(f"'{name}' was not created before the interruption; launching it.")
+                self._set(name, status="pending")
+            else:
+                print(f"Found '{name}' as SFT job {job['job_id']} ({job['status']}).")
+                self._set(name, job_id=job["job_id"], status=job["status"])
+        for name in names:
+            if self._unregistered(name):
+                self._register(name)
+        pending = [name for name in names if self.jobs[name]["status"] == "pending"]
+        # Next poll time and current interval of every job on Fireworks.
+        active = {
+            name: [loop.time(), self.poll_interval]
+            for name in names
+            if self.jobs[name]["job_id"] and self.jobs[name]["status"] not in TERMINAL_STATES
+        }
+        if active:
+            print(f"Reattached to {len(active)} running job(s): {', '.join(active)}")
+
+        while pending or active:
+            launches = pending[: max(self.max_concurrent - len(active), 0)]
+            del pending[: len(launches)]
+            for name in launches:
+                self._set(name, status="launching")
+            results = await asyncio.gather(*(asyncio.to_thread(self._launch, name) for name in launches), return_exceptions=True)
+            for name, result in zip(launches, results):
+                if isinstance(result, BaseException):
+                    print(f"Launching '{name}' failed: {result}")
+                    self._set(name, status="launch_failed", error=str(result))
+                else:
+                    print(f"Launched '{name}' as SFT job {result}.")
+                    self._set(name, job_id=result, status="launched", launched_at=datetime.utcnow().isoformat())
+                    active[name] = [loop.time() + self.poll_interval, self.poll_interval]
+
+            due = [name for name, (at, _) in active.items() if at <= loop.time()]
+            results = await asyncio.gather(
+                *(asyncio.to_thread(self.client.get_sft_job_status, self.jobs[name]["job_id"]) for name in due),
+                return_exceptions=True,
+            )
+            for name, result in zip(due, results):
+                self._update(name, result, active, loop.time())
+
+            if active and not (pending and len(active) < self.max_concurrent):
+                await asyncio.sleep(max(0.0, min(at for at, _ in active.values()) - loop.time()))
+        return {name: self.jobs[name] for name in names}
+
+    def _launch(self, name: str) -> str:
+        job = self.jobs[name]
+        return self.client.launch_sft(TrainingParams(**job["training"]), LoRAParams(**job["lora"]))
+
+    def _update(self, name: str, result: Any, active: Dict[str, list], now: float):
+        job, interval = self.jobs[name], active[name][1]
+        if isinstance(result, BaseException):
+            # A failed poll is retried later; the job itself is unaffected.
+            print(f"Polling '{name}' (job {job['job_id']}) failed: {result}")
+            interval = min(interval * 2, self.max_poll_interval)
+        elif result.get("status") != job["status"]:
+            print(f"'{name}' (job {job['job_id']}): {result.get('status')}")
+            self._set(name, status=result.get("status"))
+            interval = self.poll_interval
+        else:
+            interval = min(interval * 2, self.max_poll_interval)
+
+        if job["status"] in TERMINAL_STATES:
+            del active[name]
+            if job["status"] == "completed":
+                self._register(name)
+        else:
+            active[name] = [now + interval, interval]
+
+    def _register(self, name: str):
+        _update_lora_registry(name, "fireworks", TrainingParams(**self.jobs[name]["training"]), self.registry_path)
+        self._set(name, registered=True)
+
 def run_sft_job(
     lora_name: str,
     training_params: TrainingParams,
     lora_params: LoRAParams,
     client: fireworks_client,
-):
+) -> dict:
     """
     Launches and monitors a Supervised Fine-Tuning (SFT) job on Fireworks.ai.
     """
-    print("Launching SFT job...")
-    job_id = client.launch_sft(training_params, lora_params)
-    print(f"SFT job launched with ID: {job_id}")
-
-    while True:
-        status = client.get_sft_job_status(job_id)
-        print(f"Job status: {status.get('status')}")
-        if status.get("status") == "completed":
-            print("Job completed successfully.")
-            _update_lora_registry(lora_name, "fireworks", training_params)
-            break
-        elif status.get("status") in ["failed", "cancelled"]:
-            print(f"Job failed or was cancelled. Status: {status.get('status')}")
-            break
-        time.sleep(60)
\ No newline at end of file
+    manager = sft_job_manager(client, max_concurrent=1)
+    jobs = asyncio.run(manager.run([sft_spec(lora_name, training_params, lora_params)]))
+    return jobs[lora_name]
@@ -1,14 +1,259 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.llm.retry import backoff_delay, is_retryable
+from ..builder.packer import read_manifest
+from ..builder.reader import jsonl_dataset
 from .client import fireworks_client
 
+# Files larger than this are uploaded in parts cut at line boundaries.
+PART_BYTES = 64 << 20
+# Bytes read per block while hashing and uploading.
+_READ_BYTES = 1 << 20
+
+class _part(NamedTuple):
+    name: str  # file name in the remote dataset
+    path: Path
+    start: int
+    end: int
+    examples: int
+
+def _manifest(dataset_path: Path) -> Optional[dict]:
+    manifest = read_manifest(dataset_path)
+    if manifest is None and dataset_path.suffix in (".gz", ".zst"):
+        # An unsharded compressed output, e.g. demo.jsonl.gz, has demo.manifest.json.
+        manifest = read_manifest(dataset_path.with_suffix(""))
+    return manifest
+
+def _data_files(dataset_path: Path) -> Tuple[List[Path], Dict[str, int]]:
+    """The files to upload, and the example count the manifest gives for each file it still matches."""
+    manifest = _manifest(dataset_path)
+    if manifest is None:
+        return [dataset_path], {}
+    files = [dataset_path.with_name(entry["path"]) for entry in manifest["files"]] if not dataset_path.exists() else [dataset_path]
+    examples = {}
+    for entry in manifest["files"]:
+        path = dataset_path.with_name(entry["path"])
+        if path.exists() and path.stat().st_size == entry["size"]:
+            examples[entry["path"]] = entry["examples"]
+    return files, examples
+
+def plan_parts(files: List[Path], part_bytes: int = PART_BYTES, examples: Optional[Dict[str, int]] = None) -> List[_part]:
+    """
+    Cuts each file into byte ranges of at most `part_bytes` that start on a
+    line (a single longer line gets a part to itself). Uses the reader's
+    offset index, so the files are not scanned again if it exists.
+    Compressed files go up whole, with their example count from `examples`
+    (file name to count, as in the build manifest).
+    """
+    parts: List[_part] = []
+    for path in files:
+        size = path.stat().st_size
+        if path.suffix in (".gz", ".zst"):
+            # Compressed files can't be cut on lines; each goes up whole.
+            parts.append(_part(path.name, path, 0, size, (examples or {}).get(path.name, 0)))
+            continue
+        with jsonl_dataset(path) as dataset:
+            starts = np.array(dataset.files[0].spans[:, 0], dtype=np.int64)
+        cuts = [0]
+        while size - cuts[-1] > part_bytes:
+            i = int(np.searchsorted(starts, cuts[-1] + part_bytes, side="right")) - 1
+            cut = int(starts[i])
+            if cut <= cuts[-1]:
+                cut = int(starts[i + 1]) if i + 1 < len(starts) else size
+            cuts.append(cut)
+        if cuts[-1] != size:
+            cuts.append(size)
+        ranges = list(zip(cuts, cuts[1:])) or [(0, 0)]
+        for i, (start, end) in enumerate(ranges):
+            name = path.name if len(ranges) == 1 else f"{path.stem}.part{i:04d}{path.suffix}"
+            examples = int(np.searchsorted(starts, end) - np.searchsorted(starts, start))
+            parts.append(_part(name, path, start, end, examples))
+    return parts
+
+def _read_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with path.open("rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(_READ_BYTES, remaining))
+            if not block:
+                raise IOError(f"{path.name} is shorter than expected; was it rewritten during the upload?")
+            remaining -= len(block)
+            yield block
+
+def _hash_part(part: _part) -> Tuple[str, str]:
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    for block in _read_range(part.path, part.start, part.end):
+        sha256.update(block)
+        md5.update(block)
+    return sha256.hexdigest(), md5.hexdigest()
+
+def journal_path(dataset_path: Path, dataset_id: str) -> Path:
+    return dataset_path.with_name(f"{dataset_path.stem}.{dataset_id}.upload.json")
+
+class _journal:
+    """
+    Local record of an upload: the parts with their checksums, and which
+    parts the remote dataset already has. Saved after every finished part,
+    so an interrupted upload resumes with the parts still missing. It is
+    only reused while the files, part size and dataset id are unchanged.
+    """
+    def __init__(self, path: Path, key: dict):
+        self.path = path
+        self.state = {"key": key, "parts": [], "content_hash": None, "uploaded": []}
+        try:
+            with path.open("r") as f:
+                saved = json.load(f)
+            if saved.get("key") == key:
+                self.state = saved
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with tmp_path.open("w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+def _checksums(parts: List[_part], journal: _journal, workers: int) -> List[dict]:
+    """sha256 and md5 of every part, from the journal or by reading the parts (in parallel)."""
+    if [p["name"] for p in journal.state["parts"]] == [part.name for part in parts]:
+        return journal.state["parts"]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = list(pool.map(_hash_part, parts))
+    records = [
+        {"name": part.name, "size": part.end - part.start, "examples": part.examples, "sha256": sha256, "md5": md5}
+        for part, (sha256, md5) in zip(parts, hashes)
+    ]
+    journal.state.update(
+        parts=records,
+        content_hash=hashlib.sha256("".join(f"{r['name']} {r['sha256']}\n" for r in records).encode()).hexdigest(),
+        uploaded=[],
+    )
+    journal.save()
+    return records
+
+def _upload_part(client: fireworks_client, part: _part, url: str, md5: str, max_retries: int) -> float:
+    """PUTs one part, retrying transient failures; returns the seconds taken."""
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            client.put_file(url, _read_range(part.path, part.start, part.end), part.end - part.start, bytes.fromhex(md5))
+            return time.perf_counter() - start
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            time.sleep(backoff_delay(attempt, e, 0.5, 30.0))
+            attempt += 1
+
 def upload_dataset(
-    dataset_path: Path, 
-    dataset_id: str, 
-    client: fireworks_client
-):
+    dataset_path: Path,
+    dataset_id: str,
+    client: fireworks_client,
+    workers: int = 4,
+    part_bytes: int = PART_BYTES,
+    max_retries: int = 3,
+) -> bool:
     """
-    Uploads a dataset to Fireworks.ai.
+    Uploads a processed dataset (a JSONL file, or the shards of its
+    manifest) to Fireworks as `dataset_id`. Returns False if there was
+    nothing to do.
+
+    The files are cut into parts of at most `part_bytes` at line
+    boundaries and up to `workers` parts are uploaded at once, each with its
+    MD5 for the storage service to check. The remote dataset records the
+    sha256 of the content, so an upload of content it already holds is
+    skipped. A local journal next to the dataset remembers which parts were
+    uploaded; after an interruption, running the upload again sends only the
+    parts still missing.
     """
-    print(f"Creating dataset '{dataset_id}' from '{dataset_path}'...")
-    client.create_dataset(dataset_path, dataset_id)
-    print("Dataset created successfully.")
\ No newline at end of file
+    dataset_path = Path(dataset_path)
+    if dataset_path.name.endswith(".manifest.json"):
+        dataset_path = dataset_path.with_name(dataset_path.name[: -len(".manifest.json")] + ".jsonl")
+    files, examples = _data_files(dataset_path)
+    key = {
+        "dataset_id": dataset_id,
+        "part_bytes": part_bytes,
+        "files": {f.name: [f.stat().st_size, f.stat().st_mtime_ns] for f in files},
+    }
+    journal = _journal(journal_path(dataset_path, dataset_id), key)
+    parts = plan_parts(files, part_bytes, examples)
+    records = _checksums(parts, journal, workers)
+    display_name = f"sha256:{journal.state['content_hash']}"
+    total_bytes = sum(r["size"] for r in records)
+
+    remote = client.get_dataset(dataset_id)
+    if remote is not None and remote.get("displayName") == display_name and remote.get("state") == "READY":
+        print(f"Dataset '{dataset_id}' already holds this content ({total_bytes / 1e6:.1f} MB); skipping upload.")
+        journal.remove()
+        return False
+    if remote is not None and remote.get("displayName") != display_name:
+        if remote.get("state") == "READY":
+            raise ValueError(f"Dataset '{dataset_id}' already exists with different content; upload under a new dataset id.")
+        # An unfinished upload of other content: start over.
+        client.delete_dataset(dataset_id)
+        remote = None
+    if remote is None:
+        client.create_dataset_record(dataset_id, sum(r["examples"] for r in records), display_name)
+        journal.state["uploaded"] = []
+        journal.save()
+
+    uploaded = set(journal.state["uploaded"])
+    pending = [(part, record) for part, record in zip(parts, records) if part.name not in uploaded]
+    if uploaded:
+        print(f"Resuming upload of '{dataset_id}': {len(uploaded)} of {len(parts)} parts already uploaded.")
+    urls = client.upload_urls(dataset_id, {part.name: record["size"] for part, record in pending}) if pending else {}
+
+    started = time.perf_counter()
+    sent = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_upload_part, client, part, urls[part.name], record["md5"], max_retries): (part, record)
+            for part, record in pending
+        }
+        error: Optional[BaseException] = None
+        try:
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    part, record = futures.pop(future)
+                    if future.cancelled():
+                        continue
+                    if future.exception() is not None:
+                        # Stop queueing parts, but record the ones already in flight that finish.
+                        error = error or future.exception()
+                        for other in futures:
+                            other.cancel()
+                        continue
+                    journal.state["uploaded"].append(part.name)
+                    journal.save()
+                    sent += record["size"]
+                    print(
+                        f"[{len(journal.state['uploaded'])}/{len(parts)}] {part.name}: "
+                        f"{record['size'] / 1e6:.1f} MB in {future.result():.2f}s "
+                        f"({record['size'] / 1e6 / max(future.result(), 1e-9):.1f} MB/s)"
+                    )
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        if error is not None:
+            raise error
+
+    client.validate_upload(dataset_id)
+    journal.remove()
+    elapsed = time.perf_counter() - started
+    print(f"Uploaded {sent / 1e6:.1f} MB to dataset '{dataset_id}' in {elapsed:.1f}s ({sent / 1e6 / max(elapsed, 1e-9):.1f} MB/s).")
+    return True
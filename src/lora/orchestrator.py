@@ -1,33 +1,149 @@
+import asyncio
 from pathlib import Path
-from .builder import validate_examples, write_jsonl
-from .builder.converters import convert_file
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.core.schema import Example
+from .builder import validate_stream, validation_report, write_jsonl
+from .builder.cache import build_cache
+from .builder.dedup import deduplicator
+from .builder.packer import manifest_path, read_manifest
+from .builder.validators import MAX_CONTEXT_LENGTH, MAX_REPORTED_ERRORS
+from .builder.parallel import cache_version, convert_files
 from .fireworks.client import fireworks_client
 from .fireworks.config_schema import TrainingParams, LoRAParams
-from .fireworks.sft_job import run_sft_job
+from .fireworks.sft_job import run_sft_job, sft_job_manager, sweep
 from .fireworks.upload import upload_dataset
 
-def build_dataset(dataset_dir: Path) -> Path:
+PROCESSED_DIR = Path(__file__).parent / "data/processed"
+
+def _raw_files(dataset_dir: Path) -> List[Path]:
+    return sorted(p for p in dataset_dir.iterdir() if p.is_file())
+
+def iter_examples(dataset_dir: Path, workers: int = 1, verbose: bool = False, max_context_length: Optional[int] = None) -> Iterator[Tuple[str, Example]]:
+    """Streams (location, example) pairs from every raw file in `dataset_dir`, in file name order."""
+    return convert_files(_raw_files(dataset_dir), workers=workers, verbose=verbose, max_tokens=max_context_length or MAX_CONTEXT_LENGTH)
+
+def build_dataset(
+    dataset_dir: Path,
+    output_dir: Optional[Path] = None,
+    workers: int = 1,
+    verbose: bool = False,
+    use_cache: bool = True,
+    dedup: bool = True,
+    near_duplicate_threshold: Optional[float] = 0.8,
+    shard_bytes: Optional[int] = None,
+    shard_tokens: Optional[int] = None,
+    compression: Optional[str] = None,
+    max_context_length: Optional[int] = None,
+) -> Path:
     """
     Processes raw files from a specific dataset directory, validates them,
     and packs them into a JSONL file in the 'processed' directory.
+
+    Examples stream from the converters through validation into the writer
+    one at a time, so memory use does not grow with the dataset. Validation
+    goes on past errors and reports the first ones (see validation_report)
+    when the stream ends; nothing is written in place unless every example
+    passed. Text is chunked to, and every example must fit in,
+    `max_context_length` tokens (MAX_CONTEXT_LENGTH by default). With
+    `workers` > 1 files are converted by a process pool; the output is the
+    same as with one worker.
+
+    With `dedup`, exact duplicates and (unless `near_duplicate_threshold` is
+    None) near duplicates of earlier examples are dropped on the way.
+
+    `shard_bytes`, `shard_tokens` and `compression` are passed to
+    write_jsonl, which also writes a manifest of the files with their
+    checksums. Returns the output file, or the manifest when the output is
+    sharded.
+
+    Converted files are cached in a 'cache' directory next to the output
+    directory, so a rebuild only converts new and changed files, and returns
+    straight away if no file changed since the last build.
     """
     if not dataset_dir.is_dir():
         raise FileNotFoundError(f"Dataset directory not found: {dataset_dir}")
 
-    all_examples = []
-    for raw_file in dataset_dir.iterdir():
-        if raw_file.is_file():
-            all_examples.extend(convert_file(raw_file))
-    
-    validate_examples(all_examples)
-    
-    processed_dir = Path(__file__).parent / "data/processed"
-    processed_dir.mkdir(exist_ok=True)
-    
-    output_path = processed_dir / f"{dataset_dir.name}.jsonl"
-    write_jsonl(all_examples, output_path)
-    
-    return output_path
+    output_dir = output_dir or PROCESSED_DIR
+    output_path = output_dir / f"{dataset_dir.name}.jsonl"
+    files = _raw_files(dataset_dir)
+    max_tokens = max_context_length or MAX_CONTEXT_LENGTH
+    deduplicate = deduplicator(near_duplicate_threshold) if dedup else None
+    written: List[Path] = []
+
+    def write(examples):
+        examples = validate_stream(examples, validation_report(max_tokens))
+        if deduplicate is not None:
+            examples = deduplicate.filter(examples)
+        written[:] = write_jsonl(
+            examples,
+            output_path,
+            shard_bytes=shard_bytes,
+            shard_tokens=shard_tokens,
+            compression=compression,
+            workers=workers,
+        )
+        if verbose and deduplicate is not None:
+            print(deduplicate.summary())
+
+    def result() -> Path:
+        return written[0] if len(written) == 1 else manifest_path(output_path)
+
+    if not use_cache:
+        write(convert_files(files, workers=workers, verbose=verbose, max_tokens=max_tokens))
+        return result()
+
+    cache = build_cache(output_dir.parent / "cache" / dataset_dir.name, cache_version(max_tokens=max_tokens))
+    keys = [cache.key(f) for f in files]
+    build_key = cache.build_key(keys + [
+        deduplicate.config_key() if deduplicate else "no-dedup",
+        f"pack:{shard_bytes}:{shard_tokens}:{compression}",
+        f"context:{max_tokens}",
+    ])
+    manifest = read_manifest(output_path)
+    if manifest is not None and cache.output_current(manifest_path(output_path), build_key):
+        written[:] = [output_path.with_name(entry["path"]) for entry in manifest["files"]]
+        if all(path.exists() for path in written):
+            cache.save()
+            if verbose:
+                print(f"No changes in {len(files)} files; {result().name} is up to date.")
+            return result()
+
+    try:
+        write(convert_files(files, workers=workers, verbose=verbose, cache=cache, max_tokens=max_tokens))
+        cache.record_output(manifest_path(output_path), build_key)
+    finally:
+        evicted = cache.evict(files, keys)
+        cache.save()
+    if verbose and evicted:
+        print(f"Evicted {evicted} cache entries for removed or changed files.")
+
+    return result()
+
+def validate_dataset(
+    dataset_dir: Path,
+    max_context_length: Optional[int] = None,
+    max_errors: int = MAX_REPORTED_ERRORS,
+    workers: int = 1,
+    verbose: bool = False,
+) -> validation_report:
+    """
+    Converts and validates every raw file in `dataset_dir` in one pass,
+    writing nothing but the build cache, and returns the report with all
+    errors counted and the first `max_errors` listed.
+    """
+    if not dataset_dir.is_dir():
+        raise FileNotFoundError(f"Dataset directory not found: {dataset_dir}")
+    files = _raw_files(dataset_dir)
+    max_tokens = max_context_length or MAX_CONTEXT_LENGTH
+    cache = build_cache(PROCESSED_DIR.parent / "cache" / dataset_dir.name, cache_version(max_tokens=max_tokens))
+    report = validation_report(max_tokens, max_errors)
+    try:
+        for _ in report.check(convert_files(files, workers=workers, verbose=verbose, cache=cache, max_tokens=max_tokens)):
+            pass
+    finally:
+        cache.save()
+    report.finish()
+    return report
 
 def train_lora(
     lora_name: str,
@@ -40,7 +156,7 @@ def train_lora(
     """
     # 1. Build dataset
     raw_data_dir = Path(__file__).parent / "data/raw"
-    dataset_path = build_dataset(raw_data_dir / dataset_name)
+    dataset_path = build_dataset(raw_data_dir / dataset_name, max_context_length=cfg.max_context_length)
     
     # 2. Initialize client
     fw_client = fireworks_client()
@@ -49,4 +165,25 @@ def train_lora(
     upload_dataset(dataset_path, cfg.dataset_id, fw_client)
     
     # 4. Launch and monitor SFT job
-    run_sft_job(lora_name, cfg, lora_cfg, fw_client)
\ No newline at end of file
+    run_sft_job(lora_name, cfg, lora_cfg, fw_client)
+
+def sweep_lora(
+    lora_name: str,
+    dataset_name: str,
+    cfg: TrainingParams,
+    lora_cfg: LoRAParams,
+    grid: Dict[str, List[Any]],
+    max_concurrent: int = 4,
+    poll_interval: float = 30.0,
+) -> Dict[str, dict]:
+    """
+    Builds and uploads the dataset once, then trains one LoRA per
+    combination of `grid` values concurrently (see sft_job_manager).
+    """
+    specs = sweep(lora_name, cfg, lora_cfg, grid)
+    raw_data_dir = Path(__file__).parent / "data/raw"
+    dataset_path = build_dataset(raw_data_dir / dataset_name, max_context_length=cfg.max_context_length)
+    fw_client = fireworks_client()
+    upload_dataset(dataset_path, cfg.dataset_id, fw_client)
+    manager = sft_job_manager(fw_client, max_concurrent=max_concurrent, poll_interval=poll_interval)
+    return asyncio.run(manager.run(specs))
\ No newline at end of file
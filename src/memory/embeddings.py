@@ -0,0 +1,56 @@
+import re
+import zlib
+from typing import Optional, Sequence
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+class hashing_embedder:
+    """
+    Local CPU embedder with no model download. Words and word bigrams are
+    hashed (crc32, so vectors are identical across processes) into `dim`
+    signed buckets with sublinear term weighting, then L2-normalised. It
+    captures lexical overlap, which is most of what recalling past turns needs.
+    """
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows, cols, signs = [], [], []
+        for i, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode())
+                rows.append(i)
+                cols.append(h % self.dim)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (rows, cols), signs)
+        np.copysign(np.log1p(np.abs(vectors)), vectors, out=vectors)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+class sentence_transformer_embedder:
+    """Wraps a sentence-transformers model (optional dependency), run on CPU in batches."""
+    def __init__(self, model: str = "sentence-transformers/all-MiniLM-L6-v2", batch_size: int = 64):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("The 'sentence_transformers' embedder requires the sentence-transformers package.") from e
+        self.model = SentenceTransformer(model, device="cpu")
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32, copy=False)
+
+def get_embedder(name: str = "hashing", dim: int = 384, model: Optional[str] = None, batch_size: int = 64):
+    if name == "hashing":
+        return hashing_embedder(dim)
+    elif name == "sentence_transformers":
+        return sentence_transformer_embedder(model, batch_size) if model else sentence_transformer_embedder(batch_size=batch_size)
+    else:
+        raise ValueError(f"Unsupported embedder: {name}")
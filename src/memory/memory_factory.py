@@ -1,9 +1,21 @@
+import warnings
+
 from omegaconf import DictConfig
-from src.memory.vector_memory import get_vector_memory
 
 def get_memory(cfg: DictConfig):
     backend = cfg.memory.backend
     if backend == "chroma":
+        # The old default; the Chroma store it named was never queried.
+        warnings.warn("memory.backend 'chroma' is deprecated; using 'vector' instead.", FutureWarning, stacklevel=2)
+        backend = "vector"
+    if backend == "vector":
+        from src.memory.vector_memory import get_vector_memory
         return get_vector_memory(cfg)
+    elif backend == "summary":
+        from src.memory.summary_memory import get_summary_memory
+        return get_summary_memory(cfg)
+    elif backend == "buffer":
+        from src.memory.vector_memory import get_buffer_memory
+        return get_buffer_memory(cfg)
     else:
-        raise ValueError(f"Unsupported memory backend: {backend}")
\ No newline at end of file
+        raise ValueError(f"Unsupported memory backend: {backend}")
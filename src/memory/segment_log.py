@@ -0,0 +1,415 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# crc32 of everything after it, payload length, key, kind
+_HEADER = struct.Struct("<IIQB")
+PUT, DELETE = 0, 1
+# One entry per record of a sealed segment, written next to it as <seq>.idx.
+_INDEX = np.dtype([("key", "<u8"), ("offset", "<u8"), ("length", "<u4"), ("kind", "u1")])
+
+class _segment:
+    """One segment file. The active segment grows; sealed ones are immutable and carry an index array."""
+    def __init__(self, directory: Path, seq: int):
+        self.seq = seq
+        self.path = directory / f"{seq:08d}.seg"
+        self.index_path = directory / f"{seq:08d}.idx"
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.size = os.fstat(self.fd).st_size
+        self.entries = np.empty(0, dtype=_INDEX)
+        self.mm: Optional[mmap.mmap] = None
+        self.dead = 0
+        # Active segments only: entries not yet in `entries`, and the PUTs
+        # among them by key, so lookups don't have to merge them.
+        self.pending: List[tuple] = []
+        self.pending_puts: Dict[int, tuple] = {}
+        self._puts: Optional[np.ndarray] = None
+        # Iterations reading this segment; a retired (compacted away) segment
+        # is closed when the last one ends.
+        self.readers = 0
+        self.retired = False
+
+    def puts(self) -> np.ndarray:
+        if self._puts is None:
+            self._puts = self.entries[self.entries["kind"] == PUT]
+        return self._puts
+
+    def read(self, offset: int, length: int) -> bytes:
+        if self.mm is not None:
+            return self.mm[offset : offset + length]
+        return os.pread(self.fd, length, offset)
+
+    def scan(self) -> int:
+        """Rebuilds the entries from the file, stopping at the first torn or corrupt record. Returns the valid length."""
+        data = self.read(0, self.size) if self.size else b""
+        entries = []
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            crc, length, key, kind = _HEADER.unpack_from(data, offset)
+            end = offset + _HEADER.size + length
+            if end > len(data) or zlib.crc32(data[offset + 4 : end]) != crc:
+                break
+            entries.append((key, offset, end - offset, kind))
+            offset = end
+        self.entries = np.array(entries, dtype=_INDEX)
+        self._puts = None
+        return offset
+
+    def seal(self, use_mmap: bool):
+        self.flush_pending()
+        os.fsync(self.fd)
+        tmp_path = self.index_path.with_suffix(".idx.tmp")
+        self.entries.tofile(tmp_path)
+        os.replace(tmp_path, self.index_path)
+        self.open_sealed(use_mmap)
+
+    def open_sealed(self, use_mmap: bool):
+        if use_mmap and self.size:
+            self.mm = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_READ)
+
+    def flush_pending(self):
+        if self.pending:
+            self.entries = np.concatenate([self.entries, np.array(self.pending, dtype=_INDEX)])
+            self.pending = []
+            self.pending_puts = {}
+            self._puts = None
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        os.close(self.fd)
+
+class segment_log:
+    """
+    Append-only, crash-safe record log split into fixed-size segments.
+
+    Every record is one write of a CRC-protected header plus payload, so an
+    append costs O(1) I/O. Keys are assigned in increasing order and never
+    reused. When the active segment passes `segment_bytes` it is sealed: fsynced,
+    given an `.idx` sidecar with the offset of every record, and (optionally)
+    memory-mapped for reads. Reopening a log loads only those sidecars and
+    rescans the active segment, truncating a torn tail, so no payload is read
+    up front. The list of live segments is kept in MANIFEST, replaced
+    atomically.
+
+    Deletes append tombstones. Sealed segments whose dead bytes pass
+    `compact_ratio` are rewritten without them, in a background thread by
+    default.
+    """
+    def __init__(
+        self,
+        path: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        use_mmap: bool = True,
+        compact_ratio: float = 0.5,
+        background: bool = True,
+        sync: bool = False,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.use_mmap = use_mmap
+        self.compact_ratio = compact_ratio
+        self.background = background
+        self.sync = sync
+        self.compactions = 0
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compacting: Optional[threading.Thread] = None
+
+        manifest = self._read_manifest()
+        self.next_key = manifest.get("next_key", 0)
+        self._next_seq = manifest.get("next_seq", 0)
+        self._segments: List[_segment] = []
+        for seq in manifest.get("segments", []):
+            segment = _segment(self.path, seq)
+            if segment.index_path.exists():
+                segment.entries = np.fromfile(segment.index_path, dtype=_INDEX)
+                segment.open_sealed(self.use_mmap)
+            self._segments.append(segment)
+        self._remove_orphans()
+
+        if not self._segments or self._segments[-1].index_path.exists():
+            self._segments.append(self._new_segment())
+            self._write_manifest()
+        active = self._segments[-1]
+        valid = active.scan()
+        if valid < active.size:
+            os.ftruncate(active.fd, valid)
+            active.size = valid
+
+        self.deleted = set()
+        for segment in self._segments:
+            tombstones = segment.entries[segment.entries["kind"] == DELETE]["key"]
+            self.deleted.update(tombstones.tolist())
+            if len(segment.entries):
+                self.next_key = max(self.next_key, int(segment.entries["key"].max()) + 1)
+        self.live = 0
+        deleted = np.fromiter(self.deleted, dtype=np.uint64, count=len(self.deleted))
+        for segment in self._segments:
+            puts = segment.puts()
+            dead = np.isin(puts["key"], deleted)
+            segment.dead = int(puts["length"][dead].sum())
+            self.live += len(puts) - int(dead.sum())
+
+    def _read_manifest(self) -> dict:
+        manifest_path = self.path / "MANIFEST"
+        if not manifest_path.exists():
+            return {}
+        with manifest_path.open("r") as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        tmp_path = self.path / "MANIFEST.tmp"
+        with tmp_path.open("w") as f:
+            json.dump({"segments": [s.seq for s in self._segments], "next_key": self.next_key, "next_seq": self._next_seq}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path / "MANIFEST")
+        directory = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def _remove_orphans(self):
+        """Deletes segment files a crash left behind (e.g. an unfinished compaction)."""
+        live = {s.seq for s in self._segments}
+        for file in self.path.iterdir():
+            stem = file.name.split(".", 1)[0]
+            if stem.isdigit() and (int(stem) not in live or file.suffix == ".tmp"):
+                file.unlink()
+
+    def _new_segment(self) -> _segment:
+        segment = _segment(self.path, self._next_seq)
+        self._next_seq += 1
+        return segment
+
+    def _write(self, records: List[Tuple[int, int, bytes]]):
+        """Appends (key, kind, payload) records to the active segment in one write."""
+        active = self._segments[-1]
+        chunks = []
+        offset = active.size
+        for key, kind, payload in records:
+            body = _HEADER.pack(0, len(payload), key, kind)[4:] + payload
+            chunks.append(struct.pack("<I", zlib.crc32(body)) + body)
+            active.pending.append((key, offset, 4 + len(body), kind))
+            if kind == PUT:
+                active.pending_puts[key] = active.pending[-1]
+            offset += 4 + len(body)
+        os.pwrite(active.fd, b"".join(chunks), active.size)
+        active.size = offset
+        if self.sync:
+            os.fsync(active.fd)
+        if active.size >= self.segment_bytes:
+            active.seal(self.use_mmap)
+            self._segments.append(self._new_segment())
+            self._write_manifest()
+            self._maybe_compact()
+
+    def append(self, payload: bytes) -> int:
+        return self.append_many([payload])[0]
+
+    def append_many(self, payloads: Iterable[bytes]) -> range:
+        with self._lock:
+            start = self.next_key
+            records = [(start + i, PUT, bytes(payload)) for i, payload in enumerate(payloads)]
+            self.next_key = start + len(records)
+            self.live += len(records)
+            self._write(records)
+            return range(start, self.next_key)
+
+    def delete(self, keys: Iterable[int]):
+        with self._lock:
+            present = []
+            for key in keys:
+                located = None if key in self.deleted else self._locate(key)
+                if located is not None:
+                    located[0].dead += int(located[1]["length"])
+                    present.append(key)
+            if not present:
+                return
+            keys = present
+            self.deleted.update(keys)
+            self.live -= len(keys)
+            self._write([(key, DELETE, b"") for key in keys])
+            self._maybe_compact()
+
+    def _locate(self, key: int):
+        """The segment holding PUT `key` and its index entry, or None."""
+        for segment in reversed(self._segments):
+            if key in segment.pending_puts:
+                return segment, np.array(segment.pending_puts[key], dtype=_INDEX)[()]
+            puts = segment.puts()
+            if len(puts) and puts["key"][0] <= key:
+                i = int(np.searchsorted(puts["key"], key))
+                if i < len(puts) and puts["key"][i] == key:
+                    return segment, puts[i]
+                return None
+        return None
+
+    def get(self, key: int) -> Optional[bytes]:
+        with self._lock:
+            if key in self.deleted:
+                return None
+            located = self._locate(key)
+            if located is None:
+                return None
+            segment, entry = located
+            record = segment.read(int(entry["offset"]), int(entry["length"]))
+        if zlib.crc32(record[4:]) != _HEADER.unpack_from(record)[0]:
+            raise ValueError(f"Corrupt record {key} in {segment.path}")
+        return bytes(record[_HEADER.size :])
+
+    def items(self, start: int = 0) -> Iterator[Tuple[int, bytes]]:
+        """Live (key, payload) pairs with key >= start, in key order."""
+        with self._lock:
+            segments = list(self._segments)
+            for segment in segments:
+                segment.flush_pending()
+                # Keeps a concurrent compaction from closing it under us.
+                segment.readers += 1
+        try:
+            for segment in segments:
+                puts = segment.puts()
+                for entry in puts[np.searchsorted(puts["key"], start) :]:
+                    key = int(entry["key"])
+                    if key not in self.deleted:
+                        record = segment.read(int(entry["offset"]), int(entry["length"]))
+                        yield key, bytes(record[_HEADER.size :])
+        finally:
+            with self._lock:
+                for segment in segments:
+                    segment.readers -= 1
+                    if segment.retired and not segment.readers:
+                        segment.close()
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        return self.items()
+
+    def keys(self) -> np.ndarray:
+        """All live keys, sorted, read from the segment indexes only."""
+        with self._lock:
+            for segment in self._segments:
+                segment.flush_pending()
+            keys = np.concatenate([s.puts()["key"] for s in self._segments])
+            if self.deleted:
+                keys = keys[~np.isin(keys, np.fromiter(self.deleted, dtype=np.uint64, count=len(self.deleted)))]
+            return keys
+
+    def __len__(self) -> int:
+        return self.live
+
+    def _maybe_compact(self):
+        if not any(self._needs_compaction(s) for s in self._segments[:-1]):
+            return
+        if not self.background:
+            return
+        if self._compacting is None or not self._compacting.is_alive():
+            self._compacting = threading.Thread(target=self.compact, name="segment-compaction", daemon=True)
+            self._compacting.start()
+
+    def _needs_compaction(self, segment: _segment) -> bool:
+        return segment.size > 0 and segment.dead / segment.size >= self.compact_ratio
+
+    def compact(self) -> int:
+        """Rewrites sealed segments past compact_ratio without their dead records. Returns the bytes reclaimed."""
+        reclaimed = 0
+        with self._compact_lock:
+            with self._lock:
+                candidates = [s for s in self._segments[:-1] if self._needs_compaction(s)]
+            for old in candidates:
+                reclaimed += self._rewrite(old)
+        return reclaimed
+
+    def _rewrite(self, old: _segment) -> int:
+        with self._lock:
+            deleted = set(self.deleted)
+            new = self._new_segment()
+        entries = []
+        chunks = []
+        offset = 0
+        for entry in old.entries:
+            key, kind = int(entry["key"]), int(entry["kind"])
+            if kind == PUT and key in deleted:
+                continue
+            if kind == DELETE:
+                # A PUT always precedes its tombstone, so once the PUT is only
+                # in this segment (and being dropped) the tombstone can go too.
+                with self._lock:
+                    located = self._locate(key)
+                if located is None or located[0] is old:
+                    continue
+            record = old.read(int(entry["offset"]), int(entry["length"]))
+            chunks.append(record)
+            entries.append((key, offset, len(record), kind))
+            offset += len(record)
+        os.pwrite(new.fd, b"".join(chunks), 0)
+        new.size = offset
+        new.entries = np.array(entries, dtype=_INDEX)
+        new.seal(self.use_mmap)
+
+        with self._lock:
+            if self.deleted:
+                puts = new.puts()
+                new.dead = int(puts["length"][np.isin(puts["key"], np.fromiter(self.deleted, dtype=np.uint64))].sum())
+            self._segments[self._segments.index(old)] = new
+            self._write_manifest()
+            # Keys whose PUT and tombstone are both gone need no tracking.
+            self.deleted -= {int(k) for k in old.entries["key"][old.entries["kind"] == DELETE] if self._locate(int(k)) is None}
+            self._retire(old)
+            self.compactions += 1
+            return old.size - new.size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "bytes": sum(s.size for s in self._segments),
+                "dead_bytes": sum(s.dead for s in self._segments),
+                "live": len(self),
+                "compactions": self.compactions,
+            }
+
+    def clear(self):
+        """Drops every record. Keys keep increasing, so they are never reused."""
+        self.wait_for_compaction()
+        with self._lock:
+            old = self._segments
+            self._segments = [self._new_segment()]
+            self.deleted = set()
+            self.live = 0
+            self._write_manifest()
+            for segment in old:
+                self._retire(segment)
+
+    def _retire(self, segment: _segment):
+        """Removes a segment's files; it is closed now, or by the last iteration still reading it."""
+        segment.path.unlink()
+        segment.index_path.unlink(missing_ok=True)
+        segment.retired = True
+        if not segment.readers:
+            segment.close()
+
+    def wait_for_compaction(self):
+        if self._compacting is not None:
+            self._compacting.join()
+
+    def flush(self):
+        with self._lock:
+            os.fsync(self._segments[-1].fd)
+
+    def close(self):
+        self.wait_for_compaction()
+        with self._lock:
+            self.flush()
+            for segment in self._segments:
+                segment.close()
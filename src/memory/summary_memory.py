@@ -0,0 +1,249 @@
+import hashlib
+import importlib
+import threading
+import time
+import warnings
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.memory import BaseMemory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from omegaconf import DictConfig, OmegaConf
+from pydantic import PrivateAttr
+
+from src.llm.llm_factory import PROVIDERS
+from src.llm.retry import backoff_delay
+
+SUMMARY_PROMPT = (
+    "Summarise the following part of a conversation between a user and an AI assistant in at most {words} words. "
+    "Keep facts, names, numbers, decisions and open questions; drop pleasantries. Reply with the summary only."
+)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Shared pool that runs summarisation off the request path."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory-summary")
+        return _executor
+
+class summariser:
+    """Summarises text with an llm, memoising results by content hash."""
+    def __init__(self, llm, words: int = 120, max_tokens: Optional[int] = None, cache_entries: int = 1024):
+        self.llm = llm
+        self.words = words
+        self.max_tokens = max_tokens or words * 2
+        self.cache_entries = cache_entries
+        self.hits = 0
+        self.calls = 0
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def summarise(self, text: str) -> str:
+        key = hashlib.sha256(f"{self.words}\0{text}".encode()).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        messages = [
+            {"role": "system", "content": SUMMARY_PROMPT.format(words=self.words)},
+            {"role": "user", "content": text},
+        ]
+        summary = self.llm.chat(messages, max_tokens=self.max_tokens).strip()
+        with self._lock:
+            self.calls += 1
+            self._cache[key] = summary
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return summary
+
+def _format_turns(turns: List[Tuple[str, str]]) -> str:
+    return "\n".join(f"User: {user}\nAssistant: {answer}" for user, answer in turns)
+
+class summary_memory(BaseMemory):
+    """
+    Conversation memory that keeps the last `recent_turns` turns verbatim and
+    rolls older ones into a hierarchy of summaries.
+
+    Every `chunk_turns` turns that fall out of the recent window become one
+    level-0 summary. When a level holds `fan_in` summaries they are merged into
+    one summary on the next level, up to `max_levels`. The top level merges
+    into itself, so the history sent with each request is at most
+    max_levels * fan_in summaries plus the recent turns, however long the
+    session runs.
+
+    Summaries are produced on a background pool by the (usually cheaper)
+    summariser llm. Requests never wait for them: turns that are still being
+    summarised are sent verbatim until their summary is ready, at most the
+    newest `max_unsummarised` of them. If summarising fails it is retried
+    with backoff, and until it succeeds turns beyond that window are dropped.
+    """
+    summariser: Any
+    recent_turns: int = 4
+    chunk_turns: int = 4
+    fan_in: int = 4
+    max_levels: int = 3
+    max_unsummarised: int = 16
+    retry_backoff: float = 5.0
+    retry_backoff_max: float = 300.0
+    memory_key: str = "chat_history"
+    input_key: str = "input"
+    output_key: str = "output"
+    return_messages: bool = True
+
+    _recent: deque = PrivateAttr(default_factory=deque)
+    _unsummarised: List[Tuple[str, str]] = PrivateAttr(default_factory=list)
+    _levels: List[List[str]] = PrivateAttr(default_factory=list)
+    _job: Optional[Future] = PrivateAttr(default=None)
+    _running: bool = PrivateAttr(default=False)
+    _failures: int = PrivateAttr(default=0)
+    _retry_at: float = PrivateAttr(default=0.0)
+    _dropped: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            summaries = [summary for level in reversed(self._levels) for summary in level]
+            waiting = len(self._unsummarised)
+            turns = self._unsummarised[max(0, waiting - self.max_unsummarised) :] + list(self._recent)
+
+        if not self.return_messages:
+            parts = ["Summary of the earlier conversation:\n" + "\n".join(summaries)] if summaries else []
+            parts.append(_format_turns(turns).replace("User:", "Human:").replace("Assistant:", "AI:"))
+            return {self.memory_key: "\n".join(p for p in parts if p)}
+
+        messages = []
+        if summaries:
+            messages.append(SystemMessage(content="Summary of the earlier conversation:\n" + "\n".join(summaries)))
+        for user, answer in turns:
+            messages.extend([HumanMessage(content=user), AIMessage(content=answer)])
+        return {self.memory_key: messages}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        with self._lock:
+            self._recent.append((str(inputs[self.input_key]), str(outputs[self.output_key])))
+            while len(self._recent) > self.recent_turns:
+                self._unsummarised.append(self._recent.popleft())
+            if self._failures and not self._running:
+                # Summaries are failing: keep only the turns that are still sent.
+                excess = len(self._unsummarised) - self.max_unsummarised
+                if excess > 0:
+                    del self._unsummarised[:excess]
+                    self._dropped += excess
+            if not self._running and time.monotonic() >= self._retry_at and self._next_task() is not None:
+                self._running = True
+                self._job = _get_executor().submit(self._summarise_pending)
+
+    def _next_task(self):
+        """The oldest piece of work: (texts, source level or None for raw turns), or None."""
+        if len(self._unsummarised) >= self.chunk_turns:
+            return [_format_turns(self._unsummarised[: self.chunk_turns])], None
+        for i, level in enumerate(self._levels):
+            if len(level) >= self.fan_in:
+                return level[: self.fan_in], i
+        return None
+
+    def _summarise_pending(self):
+        while True:
+            with self._lock:
+                task = self._next_task()
+                if task is None:
+                    self._running = False
+                    return
+            texts, level = task
+            try:
+                summary = self.summariser.summarise("\n\n".join(texts))
+            except Exception as e:
+                # The turns stay verbatim; a turn saved after the backoff retries.
+                with self._lock:
+                    self._running = False
+                    self._retry_at = time.monotonic() + backoff_delay(self._failures, e, self.retry_backoff, self.retry_backoff_max)
+                    self._failures += 1
+                    first = self._failures == 1
+                if first:
+                    warnings.warn(f"Conversation summary failed: {e}; retrying with backoff")
+                return
+            with self._lock:
+                self._failures, self._retry_at = 0, 0.0
+                if level is None:
+                    del self._unsummarised[: self.chunk_turns]
+                    target = 0
+                else:
+                    del self._levels[level][: self.fan_in]
+                    target = min(level + 1, self.max_levels - 1)
+                while len(self._levels) <= target:
+                    self._levels.append([])
+                # The top level merges into itself; the merged summary is its oldest.
+                if target == level:
+                    self._levels[target].insert(0, summary)
+                else:
+                    self._levels[target].append(summary)
+
+    def wait(self, timeout: Optional[float] = None):
+        """Blocks until pending summaries are done (for tests and shutdown)."""
+        job = self._job
+        if job is not None:
+            job.result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "recent": len(self._recent),
+                "unsummarised": len(self._unsummarised),
+                "summaries": [len(level) for level in self._levels],
+                "summary_failures": self._failures,
+                "dropped_turns": self._dropped,
+                "summary_calls": self.summariser.calls,
+                "summary_cache_hits": self.summariser.hits,
+            }
+
+    def clear(self) -> None:
+        self.wait()
+        with self._lock:
+            self._recent.clear()
+            self._unsummarised.clear()
+            self._levels.clear()
+            self._failures, self._retry_at = 0, 0.0
+
+_summarisers: Dict[tuple, summariser] = {}
+_summarisers_lock = threading.Lock()
+
+def get_summariser(cfg: DictConfig) -> summariser:
+    """
+    The process-wide summariser for `memory.summary`, backed by the configured
+    provider with the summary model and the response cache switched on.
+    """
+    summary_cfg = cfg.memory.get("summary") or {}
+    provider = cfg.llm.provider
+    settings = OmegaConf.to_container(cfg.llm[provider], resolve=True)
+    if summary_cfg.get("model"):
+        settings["model"] = summary_cfg.model
+    settings.update(streaming=False, cache_responses=True, hedge=False)
+    words = summary_cfg.get("words", 120)
+    key = (provider, tuple(sorted((k, str(v)) for k, v in settings.items())), words)
+    with _summarisers_lock:
+        if key not in _summarisers:
+            module_name, class_name = PROVIDERS[provider]
+            llm = getattr(importlib.import_module(module_name), class_name)(**settings)
+            _summarisers[key] = summariser(llm, words=words)
+        return _summarisers[key]
+
+def get_summary_memory(cfg: DictConfig) -> summary_memory:
+    summary_cfg = cfg.memory.get("summary") or {}
+    return summary_memory(
+        summariser=get_summariser(cfg),
+        recent_turns=summary_cfg.get("recent_turns", cfg.memory.k),
+        chunk_turns=summary_cfg.get("chunk_turns", 4),
+        fan_in=summary_cfg.get("fan_in", 4),
+        max_levels=summary_cfg.get("max_levels", 3),
+        max_unsummarised=summary_cfg.get("max_unsummarised", 16),
+    )
@@ -0,0 +1,373 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.memory.segment_log import segment_log
+
+# Rows written between checkpoints of the vector matrix; at most this many are
+# replayed from the log after a crash.
+_CHECKPOINT_ROWS = 65536
+
+class vector_store:
+    """
+    Store of unit vectors and their documents with an IVF index.
+
+    In RAM by default. With a `path`, every entry is appended to a
+    segment_log (`path/log`: vector bytes plus the JSON document), which is the
+    durable copy and is compacted in the background as entries are deleted.
+    Vectors are also kept in one float32 matrix memory-mapped from
+    `path/vectors.f32` (grown by doubling), so searches never decode the log
+    and reopening a large store does not load it: only rows written after the
+    last checkpoint are replayed from the log. Row i holds the entry with id
+    (and log key) base + i; in RAM ids are numbered the same way.
+
+    Below `min_train` live vectors a search scores every vector exactly. Past
+    that, spherical k-means splits them into ~sqrt(n) lists, and a search only
+    scores the lists of the `nprobe` nearest centroids. The index is retrained
+    when the store has grown 4x since the last training; vectors added in
+    between are assigned to the nearest existing centroid. Training runs on a
+    background thread, started by add() or on reopening, and searches use
+    the exact scan or the previous lists until it is done. With
+    `max_entries` the oldest entries are deleted as new ones arrive.
+
+    Once the deleted rows at the front make up half the matrix, the live
+    rows are moved down over them and base advances, so a capped store
+    reuses its rows instead of growing; ids don't change.
+    """
+    def __init__(
+        self,
+        dim: int,
+        path: Optional[str] = None,
+        nprobe: int = 16,
+        min_train: int = 4096,
+        max_entries: Optional[int] = None,
+        segment_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.dim = dim
+        self.path = Path(path) if path else None
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.max_entries = max_entries
+        self.count = 0
+        self._live_count = 0
+        self._base = 0
+        self._oldest = 0
+        self._lock = threading.RLock()
+
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._tails: List[List[int]] = []
+        self._tail_size = 0
+        self._trained_count = 0
+        self._training: Optional[threading.Thread] = None
+        # Bumped by clear(), so a training started before it is discarded.
+        self._generation = 0
+
+        if self.path is None:
+            self._vectors = np.zeros((1024, dim), dtype=np.float32)
+            self._live = np.zeros(1024, dtype=bool)
+            self._documents: List[Optional[str]] = []
+            return
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._log = segment_log(str(self.path / "log"), segment_bytes=segment_bytes)
+        meta = self._read_meta()
+        self._base = meta.get("base", 0)
+        checkpoint = meta.get("rows", 0)
+        vectors_path = self.path / "vectors.f32"
+        matrix_rows = vectors_path.stat().st_size // (dim * 4) if vectors_path.exists() else 0
+        if meta.get("dim", dim) != dim or self._base > self._log.next_key:
+            self._base = 0
+            checkpoint = None
+        if checkpoint is None or self._base + checkpoint > self._log.next_key or checkpoint > matrix_rows:
+            # The matrix doesn't match the log; rebuild it from the log.
+            vectors_path.unlink(missing_ok=True)
+            checkpoint = 0
+        self.count = self._log.next_key - self._base
+        self._vectors = self._map(max(1024, self.count))
+        self._live = np.zeros(len(self._vectors), dtype=bool)
+        keys = self._log.keys()
+        self._live[(keys[keys >= self._base] - self._base).astype(np.int64)] = True
+        self._live_count = int(self._live.sum())
+        for key, payload in self._log.items(start=self._base + checkpoint):
+            self._vectors[key - self._base] = np.frombuffer(payload, dtype=np.float32, count=dim)
+        self._oldest = int(np.argmax(self._live[: self.count])) if self._live_count else self.count
+        self._checkpoint()
+        self._maybe_train()
+
+    def _read_meta(self) -> dict:
+        meta_path = self.path / "vectors.json"
+        if not meta_path.exists():
+            return {}
+        with meta_path.open("r") as f:
+            return json.load(f)
+
+    def _checkpoint(self, rows: Optional[int] = None):
+        """Flushes the matrix and records how many rows (by default all) are durable."""
+        self._vectors.flush()
+        tmp_path = self.path / "vectors.json.tmp"
+        with tmp_path.open("w") as f:
+            json.dump({"dim": self.dim, "base": self._base, "rows": self.count if rows is None else rows}, f)
+        os.replace(tmp_path, self.path / "vectors.json")
+
+    def _map(self, capacity: int) -> np.ndarray:
+        vectors_path = self.path / "vectors.f32"
+        needed = capacity * self.dim * 4
+        with open(vectors_path, "ab+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size < needed:
+                f.truncate(needed)
+            else:
+                capacity = size // (self.dim * 4)
+        return np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _reserve(self, needed: int):
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        if self.path is None:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[: self.count] = self._vectors[: self.count]
+            self._vectors = grown
+        else:
+            self._vectors.flush()
+            del self._vectors
+            self._vectors = self._map(capacity)
+        live = np.zeros(capacity, dtype=bool)
+        live[: self.count] = self._live[: self.count]
+        self._live = live
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    @property
+    def next_id(self) -> int:
+        """The id the next added entry gets; ids only ever increase."""
+        return self._base + self.count
+
+    def add(self, vectors: np.ndarray, documents: Sequence[str]) -> range:
+        """Appends rows of `vectors` (assumed unit length) with their documents; returns their ids."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) != len(documents):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(documents)} documents")
+        with self._lock:
+            start = self.count
+            if self.path is None:
+                self._documents.extend(documents)
+            else:
+                # The log is written first; the matrix rows can be rebuilt from it.
+                self._log.append_many(v.tobytes() + json.dumps(d).encode() for v, d in zip(vectors, documents))
+            self._reserve(start + len(vectors))
+            self._vectors[start : start + len(vectors)] = vectors
+            self._live[start : start + len(vectors)] = True
+            self.count = start + len(vectors)
+            self._live_count += len(vectors)
+            if self.path is not None and start // _CHECKPOINT_ROWS != self.count // _CHECKPOINT_ROWS:
+                self._checkpoint()
+            if self._centroids is not None:
+                self._assign_tail(start, self.count)
+            ids = range(self._base + start, self.next_id)
+            while self.max_entries is not None and len(self) > self.max_entries:
+                oldest = self._base + self._oldest
+                self.delete(range(oldest, oldest + len(self) - self.max_entries))
+            self._maybe_train()
+            return ids
+
+    def delete(self, ids: Iterable[int]):
+        """Removes entries; their rows are skipped by searches and their log records compacted away."""
+        with self._lock:
+            rows = [i - self._base for i in ids if self._base <= i < self.next_id and self._live[i - self._base]]
+            if self.path is None:
+                for row in rows:
+                    self._documents[row] = None
+            else:
+                self._log.delete(self._base + row for row in rows)
+            self._live[rows] = False
+            self._live_count -= len(rows)
+            while self._oldest < self.count and not self._live[self._oldest]:
+                self._oldest += 1
+            # Not while training, which reads rows by their current position.
+            if self._oldest >= 1024 and 2 * self._oldest >= self.count and self._training is None:
+                self._reclaim()
+
+    def _reclaim(self):
+        """Moves the live rows down over the deleted ones before them; called with the lock held."""
+        dropped, kept = self._oldest, self.count - self._oldest
+        if self.path is not None:
+            # Until the rows are moved and checkpointed, a reopen rebuilds them from the log.
+            self._checkpoint(rows=0)
+        # No overlap: at least half the rows are dropped.
+        self._vectors[:kept] = self._vectors[dropped : self.count]
+        self._live[:kept] = self._live[dropped : self.count]
+        self._live[kept : self.count] = False
+        if self.path is None:
+            self._documents = self._documents[dropped:]
+        if self._centroids is not None:
+            self._lists = [ids[ids >= dropped] - dropped for ids in self._lists]
+            self._tails = [[i - dropped for i in tail if i >= dropped] for tail in self._tails]
+            self._tail_size = sum(len(tail) for tail in self._tails)
+        self._base += dropped
+        self.count = kept
+        self._oldest = 0
+        if self.path is not None:
+            self._checkpoint()
+
+    def document(self, i: int) -> str:
+        if self.path is None:
+            with self._lock:
+                document = self._documents[i - self._base] if self._base <= i < self.next_id else None
+            if document is None:
+                raise KeyError(i)
+            return document
+        payload = self._log.get(i)
+        if payload is None:
+            raise KeyError(i)
+        return json.loads(payload[self.dim * 4 :])
+
+    def _assign_tail(self, start: int, end: int):
+        lists = np.argmax(self._vectors[start:end] @ self._centroids.T, axis=1)
+        for i, list_id in enumerate(lists.tolist(), start=start):
+            self._tails[list_id].append(i)
+        self._tail_size += end - start
+
+    def _train(self, vectors: np.ndarray, live: np.ndarray, generation: int):
+        """Runs on the training thread: fits without the lock, then installs the lists under it."""
+        try:
+            centroids, lists = self._fit(vectors, live)
+        finally:
+            with self._lock:
+                self._training = None
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._centroids = centroids
+            self._lists = lists
+            self._tails = [[] for _ in lists]
+            self._tail_size = 0
+            self._trained_count = len(live)
+            # Rows added while training go into the new tails.
+            trained_up_to = int(live[-1]) + 1 if len(live) else 0
+            if trained_up_to < self.count:
+                self._assign_tail(trained_up_to, self.count)
+
+    @staticmethod
+    def _fit(vectors: np.ndarray, live: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Spherical k-means over the rows `live` of `vectors`; returns the centroids and each one's ids."""
+        n = len(live)
+        nlist = int(min(4096, max(16, np.sqrt(n))))
+        rng = np.random.default_rng(0)
+        sample = vectors[np.sort(rng.choice(live, size=min(n, nlist * 64), replace=False))]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(10):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        assignment = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 65536):
+            rows = live[start : start + 65536]
+            assignment[start : start + len(rows)] = np.argmax(vectors[rows] @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        return centroids, [live[order[bounds[j] : bounds[j + 1]]] for j in range(nlist)]
+
+    def _maybe_train(self):
+        """Starts a background training if the store has outgrown the index; called with the lock held."""
+        live = len(self)
+        if live < self.min_train or self._training is not None:
+            return
+        if self._centroids is None or live >= 4 * self._trained_count:
+            # Reads go through this array even if add() remaps a larger one meanwhile.
+            snapshot = (self._vectors, np.flatnonzero(self._live[: self.count]), self._generation)
+            self._training = threading.Thread(target=self._train, args=snapshot, daemon=True, name="vector-index-train")
+            self._training.start()
+        elif self._tail_size > len(self._lists) * 64:
+            self._lists = [np.concatenate([ids, np.asarray(tail, dtype=ids.dtype)]) for ids, tail in zip(self._lists, self._tails)]
+            self._tails = [[] for _ in self._lists]
+            self._tail_size = 0
+
+    def wait_for_index(self, timeout: Optional[float] = None) -> bool:
+        """Waits for a training in progress; returns False if it is still running after `timeout`."""
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+            return not training.is_alive()
+        return True
+
+    def search(self, query: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        """Ids and cosine scores of the (approximately) k nearest live vectors, best first."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            if self._centroids is None or len(self) < self.min_train:
+                ids = np.flatnonzero(self._live[: self.count])
+                scores = self._vectors[ids] @ query
+            else:
+                nprobe = min(self.nprobe, len(self._lists))
+                probe = np.argpartition(self._centroids @ query, -nprobe)[-nprobe:]
+                # Sorted ids read the (possibly memory-mapped) matrix in order.
+                ids = np.sort(np.concatenate([self._lists[j] for j in probe] + [np.asarray(self._tails[j], dtype=np.int64) for j in probe]))
+                ids = ids[self._live[ids]]
+                scores = self._vectors[ids] @ query
+            base = self._base
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(base + int(ids[i]), float(scores[i])) for i in top]
+
+    def nbytes(self) -> dict:
+        index = 0
+        if self._centroids is not None:
+            index = self._centroids.nbytes + sum(ids.nbytes for ids in self._lists) + self._tail_size * 8
+        return {
+            "vectors": self.count * self.dim * 4,
+            "index": index,
+            "documents": self._log.stats()["bytes"] if self.path else sum(len(d) for d in self._documents if d),
+        }
+
+    def stats(self) -> dict:
+        stats = {"entries": len(self), "rows": self.count, **self.nbytes()}
+        if self.path is not None:
+            stats["log"] = self._log.stats()
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._centroids = None
+            self._lists, self._tails, self._tail_size, self._trained_count = [], [], 0, 0
+            if self.path is None:
+                self._documents = []
+                self._base += self.count
+            else:
+                self._log.clear()
+                self._base = self._log.next_key
+            self.count = 0
+            self._live_count = 0
+            self._oldest = 0
+            self._live[:] = False
+            if self.path is not None:
+                self._checkpoint()
+
+    def flush(self):
+        with self._lock:
+            if self.path is not None:
+                self._log.flush()
+                self._checkpoint()
+
+    def close(self):
+        self.wait_for_index()
+        if self.path is not None:
+            self.flush()
+            self._log.close()
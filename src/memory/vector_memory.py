@@ -1,23 +1,111 @@
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+import json
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.memory import BaseMemory
+from langchain_core.messages import AIMessage, HumanMessage
 from omegaconf import DictConfig
 
+from src.core.interfaces import memory
+from src.memory.embeddings import get_embedder
+from src.memory.vector_index import vector_store
+
+class vector_memory(memory):
+    """Embeds texts in batches and recalls the most relevant ones from a vector_store."""
+    def __init__(self, embedder, store: vector_store, k: int = 5, batch_size: int = 256):
+        self.embedder = embedder
+        self.store = store
+        self.k = k
+        self.batch_size = batch_size
+
+    def add(self, text: str):
+        self.add_many([text])
+
+    def add_many(self, texts: Sequence[str], documents: Optional[Sequence[str]] = None):
+        """Indexes `texts`; `documents` (default: the texts) are what recall returns."""
+        documents = texts if documents is None else documents
+        for start in range(0, len(texts), self.batch_size):
+            end = start + self.batch_size
+            self.store.add(self.embedder.embed(texts[start:end]), documents[start:end])
+
+    def recall(self, query: str, k: Optional[int] = None) -> List[str]:
+        hits = self.store.search(self.embedder.embed([query])[0], k or self.k)
+        return [self.store.document(i) for i, _ in hits]
+
+class retrieval_memory(BaseMemory):
+    """
+    LangChain memory backed by vector_memory: each finished turn is indexed,
+    and the `k` past turns most relevant to the new input are loaded as chat
+    history, oldest first.
+    """
+    vectors: Any
+    k: int = 5
+    memory_key: str = "chat_history"
+    input_key: str = "input"
+    output_key: str = "output"
+    return_messages: bool = True
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        query = str(inputs.get(self.input_key, ""))
+        turns = [json.loads(d) for d in self.vectors.recall(query, self.k)] if query else []
+        turns.sort(key=lambda turn: turn["turn"])
+        if not self.return_messages:
+            return {self.memory_key: "\n".join(f"Human: {t['input']}\nAI: {t['output']}" for t in turns)}
+        messages = []
+        for turn in turns:
+            messages.extend([HumanMessage(content=turn["input"]), AIMessage(content=turn["output"])])
+        return {self.memory_key: messages}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        user, answer = str(inputs[self.input_key]), str(outputs[self.output_key])
+        document = json.dumps({"turn": self.vectors.store.next_id, "input": user, "output": answer})
+        self.vectors.add_many([f"{user}\n{answer}"], [document])
+
+    def clear(self) -> None:
+        self.vectors.store.clear()
+
+_stores: Dict[tuple, vector_store] = {}
+_stores_lock = threading.Lock()
+
+def get_vector_store(dim: int, path: Optional[str] = None, **settings) -> vector_store:
+    """A new in-memory store, or the process-wide store persisted at `path`."""
+    if path is None:
+        return vector_store(dim, **settings)
+    with _stores_lock:
+        store = _stores.get((path, dim))
+        if store is None:
+            store = vector_store(dim, path, **settings)
+            _stores[(path, dim)] = store
+        return store
+
 def get_vector_memory(cfg: DictConfig):
-    # Note: This is a simple implementation. For production, you'd want a more robust setup.
-    # For example, you might want to use a different embeddings model.
-    embeddings = OpenAIEmbeddings()
-    vectorstore = Chroma(
-        persist_directory=cfg.memory.persist_path,
-        embedding_function=embeddings
+    memory_cfg = cfg.memory
+    embedder = get_embedder(
+        memory_cfg.get("embedder", "hashing"),
+        dim=memory_cfg.get("dim", 384),
+        model=memory_cfg.get("model"),
+        batch_size=memory_cfg.get("batch_size", 64),
     )
+    store = get_vector_store(
+        embedder.dim,
+        memory_cfg.get("persist_path"),
+        nprobe=memory_cfg.get("nprobe", 16),
+        max_entries=memory_cfg.get("max_entries"),
+        segment_bytes=memory_cfg.get("segment_bytes", 64 * 1024 * 1024),
+    )
+    return retrieval_memory(vectors=vector_memory(embedder, store, k=memory_cfg.k), k=memory_cfg.k)
+
+def get_buffer_memory(cfg: DictConfig):
+    from langchain.memory import ConversationBufferWindowMemory
+
     return ConversationBufferWindowMemory(
         k=cfg.memory.k,
         memory_key="chat_history",
         return_messages=True,
         input_key="input",
         output_key="output",
-        # This is where you would integrate the vectorstore if you were using one
-        # for retrieval, e.g. with VectorStoreRetrieverMemory.
-        # For now, we'll just use a simple buffer.
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,217 @@
+"""
+A local stand-in for the Fireworks inference API, used by the tests and benchmarks.
+
+It speaks just enough of the OpenAI-compatible `/chat/completions` endpoint for
+`fireworks_chat`: plain JSON responses, SSE streaming, and HTTP/1.1 keep-alive.
+It also serves the datasets API under `/v1/accounts/<account>/datasets` used by
+the LoRA upload (create, get, delete, getUploadEndpoint, validateUpload) and
+accepts the signed-URL PUTs, checking each file's Content-MD5.
+"""
+import base64
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._datasets("GET")
+
+    def do_DELETE(self):
+        self._datasets("DELETE")
+
+    def do_PUT(self):
+        match = re.fullmatch(r"/upload/([^/]+)/([^/]+)", self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        with self.server.lock:
+            step = self.server.upload_script.pop(0) if self.server.upload_script else {}
+        if step.get("disconnect"):
+            # Read part of the body, then drop the connection, as a failed network would.
+            self.rfile.read(length // 2)
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        body = self.rfile.read(length)
+        time.sleep(step.get("delay", 0.0))
+        if step.get("status"):
+            self._error(step["status"], {})
+            return
+        if base64.b64decode(self.headers.get("Content-MD5", "")) != hashlib.md5(body).digest():
+            self._error(400, {})
+            return
+        dataset = self.server.datasets.get(match.group(1)) if match else None
+        if dataset is None or match.group(2) not in dataset["expected"]:
+            self._error(404, {})
+            return
+        with self.server.lock:
+            dataset["files"][match.group(2)] = body
+            self.server.puts.append(match.group(2))
+        self._send(200, {})
+
+    def _datasets(self, method: str, body=None):
+        match = re.fullmatch(r"/v1/accounts/[^/]+/datasets(?:/([^/:]+))?(?::(\w+))?", self.path)
+        if not match:
+            self._error(404, {})
+            return
+        dataset_id, action = match.groups()
+        datasets = self.server.datasets
+        with self.server.lock:
+            if method == "POST" and dataset_id is None:
+                if body["datasetId"] in datasets:
+                    self._error(409, {})
+                    return
+                datasets[body["datasetId"]] = {**body["dataset"], "state": "UPLOADING", "files": {}, "expected": {}}
+                self._send(200, self._resource(body["datasetId"]))
+                return
+            dataset = datasets.get(dataset_id)
+            if dataset is None:
+                self._error(404, {})
+            elif method == "GET":
+                self._send(200, self._resource(dataset_id))
+            elif method == "DELETE":
+                del datasets[dataset_id]
+                self._send(200, {})
+            elif action == "getUploadEndpoint":
+                dataset["expected"].update(body["filenameToSize"])
+                urls = {name: f"{self.server.api_base}/upload/{dataset_id}/{name}" for name in body["filenameToSize"]}
+                self._send(200, {"filenameToSignedUrls": urls})
+            elif action == "validateUpload":
+                complete = all(len(dataset["files"].get(name, b"")) == size for name, size in dataset["expected"].items())
+                if not complete:
+                    self._error(400, {})
+                    return
+                dataset["state"] = "READY"
+                self._send(200, {})
+            else:
+                self._error(404, {})
+
+    def _resource(self, dataset_id: str) -> dict:
+        dataset = self.server.datasets[dataset_id]
+        return {"name": f"datasets/{dataset_id}", **{k: v for k, v in dataset.items() if k not in ("files", "expected")}}
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.startswith("/v1/accounts/"):
+            length = int(self.headers.get("Content-Length", 0))
+            self._datasets("POST", json.loads(self.rfile.read(length) or b"{}"))
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests.append(body)
+
+        with self.server.lock:
+            self.server.inflight += 1
+            self.server.max_inflight = max(self.server.max_inflight, self.server.inflight)
+            step = self.server.script.pop(0) if self.server.script else {}
+        try:
+            time.sleep(step.get("delay", self.server.delay))
+            if step.get("status"):
+                self._error(step["status"], step.get("headers", {}))
+                return
+            messages = body.get("messages", [])
+            content = self.server.reply(messages)
+
+            if body.get("stream"):
+                self._stream(content)
+            else:
+                self._json(content)
+        finally:
+            with self.server.lock:
+                self.server.inflight -= 1
+
+    def _error(self, status: int, headers: dict):
+        payload = json.dumps({"error": {"message": f"scripted {status}"}}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _json(self, content: str):
+        payload = json.dumps({
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": len(content.split()), "total_tokens": 1 + len(content.split())},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, content: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in content.split(" "):
+            event = {"choices": [{"index": 0, "delta": {"content": token + " "}}]}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+class fake_fireworks(ThreadingHTTPServer):
+    daemon_threads = True
+
+    request_queue_size = 1024
+
+    def __init__(self, reply=None, delay: float = 0.0, script=None):
+        super().__init__(("127.0.0.1", 0), _handler)
+        self.reply = reply or (lambda messages: f"echo {messages[-1]['content']}" if messages else "echo")
+        self.delay = delay
+        # Per-request overrides consumed in arrival order, e.g.
+        # {"status": 429, "headers": {"Retry-After": "0"}} or {"delay": 1.0}.
+        self.script = list(script or [])
+        self.requests = []
+        # Datasets API state, and per-PUT overrides like {"status": 500} or {"disconnect": True}.
+        self.datasets = {}
+        self.upload_script = []
+        self.puts = []
+        self.connections = 0
+        self.inflight = 0
+        self.max_inflight = 0
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def handle_error(self, request, client_address):
+        # Clients hang up mid-response on purpose (cancelled hedges, early exits).
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
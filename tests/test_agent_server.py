@@ -0,0 +1,86 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from omegaconf import OmegaConf
+
+from fake_fireworks import fake_fireworks
+from src.agent.server import agent_pool, make_server, serve_in_thread
+from src.cli.chat import run_remote
+
+# The concurrent requests in the test below only get past this if both are
+# inside an agent at the same time.
+_both_running = threading.Barrier(2, timeout=10)
+
+class _stub_agent:
+    def __init__(self):
+        self.memory = None
+        self.agent_executor = SimpleNamespace(memory=None)
+
+    def run(self, task, callbacks=None):
+        if task.startswith("q"):
+            _both_running.wait()
+        for callback in callbacks or []:
+            callback.on_llm_new_token(task)
+        self.memory.append(task)
+        return f"{len(self.memory)}:{task}"
+
+@pytest.fixture
+def stub_server():
+    server = make_server(agent_pool(_stub_agent, list, workers=2), port=0)
+    serve_in_thread(server)
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_sessions_are_isolated_and_requests_run_concurrently(stub_server):
+    server, address = stub_server
+    tokens = []
+    assert run_remote(address, "hello", session="a", on_token=tokens.append) == "1:hello"
+    assert tokens == ["hello"]
+    assert run_remote(address, "again", session="a") == "2:again"
+    assert run_remote(address, "other", session="b") == "1:other"
+
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(run_remote(address, f"q{i}", session=f"s{i}"))) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == ["1:q0", "1:q1"]
+    assert server.pool.stats() == {"workers": 2, "idle": 2, "sessions": 4}
+
+def test_react_agent_over_unix_socket(tmp_path, monkeypatch):
+    from src.agent.react_agent import react_agent
+    from src.memory.memory_factory import get_memory
+
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test")
+
+    def reply(messages):
+        if "Observation:" in messages[-1]["content"].split("Question:")[-1]:
+            return "I now know the final answer\nFinal Answer: done"
+        return "I should look.\nAction: list_directory\nAction Input: ."
+
+    with fake_fireworks(reply=reply) as fireworks:
+        cfg = OmegaConf.load("config/settings.yaml")
+        cfg.llm.fireworks.api_base = fireworks.api_base
+        cfg.agent.tools = ["list_directory"]
+        cfg.agent.tool_cache.path = None
+        cfg.memory.persist_path = None
+        cfg.debug = False
+
+        socket_path = str(tmp_path / "agent.sock")
+        server = make_server(agent_pool(lambda: react_agent(cfg, with_memory=False), lambda: get_memory(cfg), workers=1), socket_path=socket_path)
+        serve_in_thread(server)
+        try:
+            tokens = []
+            assert run_remote(f"unix:{socket_path}", "what files?", session="s", on_token=tokens.append) == "done"
+            assert "Action: list_directory" in "".join(tokens)
+            history = server.pool._session("s").memory.load_memory_variables({"input": "what files?"})["chat_history"]
+            assert [m.content for m in history] == ["what files?", "done"]
+            # Workers hold no memory of their own between requests.
+            (idle,) = server.pool._idle.queue
+            assert idle.memory is None and idle.agent_executor.memory is None
+        finally:
+            server.shutdown()
+            server.server_close()
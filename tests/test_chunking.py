@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+from src.core.tokens import count_tokens_batch
+from src.lora.builder.chunking import LINE_BREAKS, c_blocks, python_blocks, token_chunker
+
+def _words(n: int, start: int = 0) -> str:
+    return " ".join(f"w{i}" for i in range(start, start + n))
+
+def test_oversize_paragraphs_are_cut_at_sentences_then_tokens():
+    sentences = [_words(30, i * 30) + "." for i in range(10)]
+    paragraph = " ".join(sentences) + " " + _words(200, 1000)
+    chunks = list(token_chunker(max_tokens=64).chunk([("doc.md:3", "intro"), ("doc.md:5", paragraph)]))
+
+    assert all(tokens <= 64 for tokens in count_tokens_batch([text for _, text in chunks]))
+    assert {location for location, _ in chunks} == {"doc.md:3", "doc.md:5"}
+    assert chunks[0][1] == "intro\n\n" + sentences[0] + " " + sentences[1]
+    assert chunks[1][1] == sentences[2] + " " + sentences[3]
+    assert " ".join(text for _, text in chunks).split() == ("intro " + paragraph).split()
+
+def test_overlap_repeats_trailing_pieces():
+    paragraphs = [(f"notes.md:{i}", _words(10, i * 10)) for i in range(6)]
+    chunks = [text for _, text in token_chunker(max_tokens=40, overlap=20).chunk(paragraphs)]
+    assert chunks[0].split("\n\n")[-2:] == chunks[1].split("\n\n")[:2]
+    with pytest.raises(ValueError):
+        token_chunker(max_tokens=40, overlap=30)
+
+def test_python_blocks_keep_decorators_and_comments_with_their_function():
+    source = "import os\n\n# helper\n@cache\ndef f():\n    return 1\n\nclass C:\n    def g(self):\n        pass\n"
+    blocks = list(python_blocks(io.StringIO(source), "m.py"))
+    assert [location for location, _ in blocks] == ["m.py:1", "m.py:3", "m.py:8"]
+    assert blocks[1][1] == "# helper\n@cache\ndef f():\n    return 1\n\n"
+
+    chunks = list(token_chunker(max_tokens=12, separator="", breaks=LINE_BREAKS).chunk(blocks))
+    assert [location for location, _ in chunks] == ["m.py:1", "m.py:3", "m.py:8"]
+
+def test_c_blocks_split_after_top_level_definitions():
+    source = '#include <x.h>\n\n/* add */\nint add(int a, int b) {\n  const char *s = "}";\n  return a + b;\n}\n\nstruct P { int x; };\n'
+    blocks = [text for _, text in c_blocks(io.StringIO(source), "m.cpp")]
+    assert blocks == ["#include <x.h>\n\n", '/* add */\nint add(int a, int b) {\n  const char *s = "}";\n  return a + b;\n}\n\n', "struct P { int x; };\n"]
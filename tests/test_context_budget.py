@@ -0,0 +1,47 @@
+from langchain_core.agents import AgentAction
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain.agents.format_scratchpad import format_log_to_str
+
+from src.agent.context_budget import context_budget
+from src.core.tokens import count_tokens
+
+def _steps(*observations):
+    return [
+        (AgentAction(tool="file_read", tool_input=f"f{i}", log=f"Thought: read f{i}\nAction: file_read\nAction Input: f{i}"), o)
+        for i, o in enumerate(observations)
+    ]
+
+def test_small_scratchpad_matches_langchain_format():
+    steps = _steps("short", "also short")
+    budget = context_budget()
+
+    assert budget.format_scratchpad(steps) == format_log_to_str(steps)
+    assert budget.tokens_saved == 0
+
+def test_large_observation_is_truncated():
+    big = " ".join(f"word{i}" for i in range(5000))
+    budget = context_budget(max_observation_tokens=100)
+
+    scratchpad = budget.format_scratchpad(_steps(big))
+
+    assert "tokens truncated" in scratchpad
+    assert "word0" in scratchpad and "word4999" in scratchpad
+    assert budget.tokens_saved > 0
+    assert count_tokens(scratchpad) < 200
+
+def test_old_observations_collapse_to_fit_budget():
+    observation = "line one\n" + "filler " * 300
+    budget = context_budget(max_tokens=800, max_observation_tokens=1000, keep_recent_steps=1)
+
+    scratchpad = budget.format_scratchpad(_steps(observation, observation, observation, observation))
+
+    assert scratchpad.count("older observation elided") >= 2
+    assert scratchpad.endswith(f"Observation: {observation}\nThought: ")
+    assert budget.reset() > 0
+    assert budget.tokens_saved == 0
+
+def test_trim_history_keeps_most_recent_messages():
+    history = [HumanMessage(content="old " * 100), AIMessage(content="older reply " * 100), HumanMessage(content="latest")]
+    budget = context_budget(max_tokens=50)
+
+    assert budget.trim_history(history) == history[-1:]
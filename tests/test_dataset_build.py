@@ -0,0 +1,216 @@
+import json
+
+import pytest
+
+from src.lora.builder import ValidationError, write_jsonl
+from src.lora.builder.converters import convert_file
+from src.lora.builder.parallel import convert_files
+from src.lora.orchestrator import build_dataset
+from src.core.schema import Example
+
+def _conversation(i: int) -> dict:
+    return {"messages": [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}]}
+
+def _make_pdf(path, pages):
+    """A minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>"
+    out, offsets = b"%PDF-1.4\n", []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    path = tmp_path / "raw" / "demo"
+    path.mkdir(parents=True)
+    (path / "b.csv").write_text("user,assistant\nhi,hello\n\"multi\nline\",ok\nbye,later\n")
+    (path / "a.json").write_text("[\n" + ",\n".join(json.dumps(_conversation(i), indent=1) for i in range(3)) + "\n]\n")
+    (path / "c.md").write_text("# Title\n\nFirst paragraph.\n\nSecond\nparagraph.\n")
+    return path
+
+def test_build_streams_every_file_in_name_order(dataset_dir, tmp_path):
+    output = build_dataset(dataset_dir, output_dir=tmp_path / "processed")
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["messages"][0]["content"] for row in rows[:6]] == ["q0", "q1", "q2", "hi", "multi\nline", "bye"]
+    assert rows[6]["messages"][0]["content"] == "# Title\n\nFirst paragraph.\n\nSecond\nparagraph."
+    assert rows[6]["meta"] == {"source": "c.md"}
+
+def test_converters_are_lazy(dataset_dir):
+    examples = convert_file(dataset_dir / "a.json")
+    assert not isinstance(examples, list)
+    assert next(examples).messages[1]["content"] == "a0"
+
+def test_json_items_spanning_many_blocks(tmp_path, monkeypatch):
+    from src.lora.builder import converters
+
+    monkeypatch.setattr(converters, "_READ_CHARS", 7)
+    rows = [
+        {"messages": [{"role": "user", "content": 'brackets ]}[{ and "quotes" \\ ' * 20}, {"role": "assistant", "content": "a"}]},
+        _conversation(1),
+    ]
+    path = tmp_path / "big.json"
+    path.write_text("[\n" + ",\n".join(json.dumps(row) for row in rows) + "\n]")
+    assert [(location, example.messages) for location, example in converters._from_json(path)] == [
+        ("big.json:2", rows[0]["messages"]),
+        ("big.json:3", rows[1]["messages"]),
+    ]
+
+    # An item that never ends is rejected once it passes the size limit, not decoded again and again.
+    monkeypatch.setattr(converters, "_MAX_JSON_ITEM", 100)
+    path.write_text('[{"messages": "' + "x" * 1000)
+    with pytest.raises(ValidationError, match=r"^big\.json:1: JSON item is larger than 100 characters"):
+        list(converters._from_json(path))
+
+def test_errors_name_file_and_line_and_keep_previous_output(dataset_dir, tmp_path):
+    output = build_dataset(dataset_dir, output_dir=tmp_path / "processed")
+    before = output.read_text()
+
+    (dataset_dir / "d.jsonl").write_text(
+        json.dumps(_conversation(0)) + "\n\n" + json.dumps({"messages": [{"role": "assistant", "content": "x"}]}) + "\n"
+    )
+    with pytest.raises(ValidationError, match=r"^d\.jsonl:3: Invalid starting role: assistant"):
+        build_dataset(dataset_dir, output_dir=tmp_path / "processed")
+    assert output.read_text() == before
+    assert sorted(p.name for p in output.parent.iterdir()) == ["demo.jsonl", "demo.manifest.json"]
+
+    (dataset_dir / "d.jsonl").unlink()
+    (dataset_dir / "a.json").write_text('[\n  {"messages": []},\n  {"messages": [}\n]')
+    with pytest.raises(ValidationError, match=r"^a\.json:2: Example has no messages"):
+        build_dataset(dataset_dir, output_dir=tmp_path / "processed")
+
+def test_sharded_writes_replace_stale_shards(tmp_path):
+    output = tmp_path / "out.jsonl"
+    examples = [Example(**_conversation(i)) for i in range(5)]
+    assert [p.name for p in write_jsonl(iter(examples), output, shard_size=2)] == ["out_0.jsonl", "out_1.jsonl", "out_2.jsonl"]
+    assert [p.name for p in write_jsonl(iter(examples[:4]), output, shard_size=2)] == ["out_0.jsonl", "out_1.jsonl"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.manifest.json", "out_0.jsonl", "out_1.jsonl"]
+    assert len((tmp_path / "out_1.jsonl").read_text().splitlines()) == 2
+
+def test_unsharded_output_streams_with_workers(tmp_path, monkeypatch):
+    from src.lora.builder import packer
+
+    buffered = []
+    class _recorded(packer._shard_file):
+        def __init__(self, path, compression, level, buffer):
+            super().__init__(path, compression, level, buffer)
+            buffered.append(buffer)
+    monkeypatch.setattr(packer, "_shard_file", _recorded)
+
+    examples = [Example(**_conversation(i)) for i in range(100)]
+    write_jsonl(iter(examples), tmp_path / "out.jsonl", compression="gzip", workers=4)
+    assert buffered == [False]
+    # Shards still go to the pool.
+    write_jsonl(iter(examples), tmp_path / "sharded.jsonl", shard_size=40, workers=4)
+    assert buffered == [False, True, True, True]
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_byte_shards_are_balanced_compressed_and_checksummed(tmp_path, compression):
+    import gzip
+    import hashlib
+
+    from src.lora.builder.packer import read_manifest
+
+    if compression == "gzip":
+        decompress = gzip.decompress
+    else:
+        zstandard = pytest.importorskip("zstandard")
+        decompress = lambda raw: zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+
+    examples = [Example(messages=[{"role": "user", "content": "x" * (i % 50)}], meta={"i": i}) for i in range(1000)]
+    plain = tmp_path / "plain" / "out.jsonl"
+    write_jsonl(iter(examples), plain)
+    packed = tmp_path / "packed" / "out.jsonl"
+    paths = write_jsonl(iter(examples), packed, shard_bytes=8000, compression=compression, workers=3)
+
+    manifest = read_manifest(packed)
+    assert [entry["path"] for entry in manifest["files"]] == [p.name for p in paths]
+    assert paths[0].name == "out_0.jsonl" + (".gz" if compression == "gzip" else ".zst")
+    assert manifest["examples"] == 1000 and manifest["bytes"] == plain.stat().st_size
+    assert all(entry["bytes"] <= 8000 for entry in manifest["files"])
+    assert all(entry["bytes"] > 7900 for entry in manifest["files"][:-1])
+
+    data = b""
+    for path, entry in zip(paths, manifest["files"]):
+        raw = path.read_bytes()
+        assert hashlib.sha256(raw).hexdigest() == entry["sha256"] and len(raw) == entry["size"]
+        data += decompress(raw)
+    assert data == plain.read_bytes()
+
+    write_jsonl(iter(examples[:10]), packed)
+    assert sorted(p.name for p in packed.parent.iterdir()) == ["out.jsonl", "out.manifest.json"]
+
+def test_parallel_conversion_matches_serial(dataset_dir, capsys):
+    _make_pdf(dataset_dir / "e.pdf", [f"page {i} text" for i in range(5)])
+    files = sorted(dataset_dir.iterdir())
+    serial = list(convert_files(files, workers=1, pages_per_task=2))
+    parallel = list(convert_files(files, workers=2, pages_per_task=2, verbose=True))
+    assert parallel == serial
+    assert [location for location, _ in serial if location.startswith("e.pdf")] == ["e.pdf:page 1", "e.pdf:page 3", "e.pdf:page 5"]
+    out = capsys.readouterr().out
+    assert "[4/4] e.pdf: 3 examples in" in out and "(3 parts)" in out
+
+def test_worker_errors_keep_their_location(dataset_dir, tmp_path):
+    (dataset_dir / "d.jsonl").write_text('{"messages": [}\n')
+    with pytest.raises(ValidationError, match=r"^d\.jsonl:1: Invalid JSON"):
+        build_dataset(dataset_dir, output_dir=tmp_path / "processed", workers=2)
+
+def test_rebuild_only_converts_changed_files(dataset_dir, tmp_path, monkeypatch):
+    from src.lora.builder import parallel
+
+    converted = []
+    iter_unit = parallel.iter_unit
+    monkeypatch.setattr(parallel, "iter_unit", lambda unit, max_tokens: converted.append(unit[0].name) or iter_unit(unit, max_tokens))
+    output = build_dataset(dataset_dir, output_dir=tmp_path / "processed")
+    assert converted == ["a.json", "b.csv", "c.md"]
+
+    converted.clear()
+    mtime = output.stat().st_mtime_ns
+    assert build_dataset(dataset_dir, output_dir=tmp_path / "processed") == output
+    assert converted == [] and output.stat().st_mtime_ns == mtime
+
+    (dataset_dir / "b.csv").unlink()
+    (dataset_dir / "c.md").write_text("Changed.\n")
+    (dataset_dir / "d.jsonl").write_text(json.dumps(_conversation(9)) + "\n")
+    build_dataset(dataset_dir, output_dir=tmp_path / "processed")
+    assert converted == ["c.md", "d.jsonl"]
+    assert output.read_text() == build_dataset(dataset_dir, output_dir=tmp_path / "fresh", use_cache=False).read_text()
+    assert len(list((tmp_path / "cache" / "demo").glob("*.jsonl.gz"))) == 3
+
+def test_context_limit_reaches_the_chunkers(tmp_path):
+    from src.core.tokens import count_tokens
+
+    dataset_dir = tmp_path / "raw" / "notes"
+    dataset_dir.mkdir(parents=True)
+    (dataset_dir / "notes.md").write_text("\n\n".join(f"Paragraph {i}. " + "Some words about it. " * 20 for i in range(80)))
+
+    output = build_dataset(dataset_dir, output_dir=tmp_path / "processed", max_context_length=1024)
+    small = [json.loads(line)["messages"][0]["content"] for line in output.read_text().splitlines()]
+    assert len(small) > 3 and all(count_tokens(text) <= 1024 for text in small)
+
+    # The cached chunks were cut for 1024 tokens; the default limit converts again.
+    output = build_dataset(dataset_dir, output_dir=tmp_path / "processed")
+    assert len(output.read_text().splitlines()) < len(small)
+
+def test_cache_version_names_the_tokenizer(monkeypatch):
+    from types import SimpleNamespace
+
+    from src.core import tokens
+    from src.lora.builder.parallel import cache_version
+
+    monkeypatch.setattr(tokens, "_encoding_loaded", True)
+    monkeypatch.setattr(tokens, "_encoding", None)
+    fallback = cache_version()
+    monkeypatch.setattr(tokens, "_encoding", SimpleNamespace(name="cl100k_base"))
+    assert fallback.endswith(".regex") and cache_version() == fallback[: -len("regex")] + "cl100k_base"
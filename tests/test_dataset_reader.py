@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from src.core.schema import Example
+from src.lora.builder import jsonl_dataset, write_jsonl
+from src.lora.builder.reader import index_path
+
+def _examples(n: int, sources: int = 3):
+    return [
+        Example(messages=[{"role": "user", "content": f"q{i} \"meta\":{{}} é"}], meta={"source": f"s{i % sources}.md", "i": i})
+        for i in range(n)
+    ]
+
+def test_random_access_reuses_the_index_until_the_file_changes(tmp_path):
+    path = tmp_path / "d.jsonl"
+    examples = _examples(50)
+    write_jsonl(iter(examples), path)
+    with jsonl_dataset(path) as dataset:
+        assert len(dataset) == 50
+        assert dataset[7] == examples[7] and dataset[-1] == examples[-1]
+        assert list(dataset) == examples
+        with pytest.raises(IndexError):
+            dataset[50]
+    assert index_path(path).exists()
+
+    built = index_path(path).stat().st_mtime_ns
+    with jsonl_dataset(path) as dataset:
+        assert dataset[30] == examples[30]
+    assert index_path(path).stat().st_mtime_ns == built
+
+    # Rewritten with blank lines and CRLF: the stale index is rebuilt.
+    path.write_bytes(b"\r\n".join(path.read_bytes().splitlines()[:3]) + b"\r\n\r\n\n")
+    os.utime(path, ns=(built + 10**9, built + 10**9))
+    with jsonl_dataset(path) as dataset:
+        assert list(dataset) == examples[:3]
+
+def test_sharded_dataset_reads_through_the_manifest(tmp_path):
+    path = tmp_path / "d.jsonl"
+    examples = _examples(25)
+    write_jsonl(iter(examples), path, shard_size=10)
+    with jsonl_dataset(path) as dataset:
+        assert len(dataset) == 25 and len(dataset.files) == 3
+        assert [dataset[i] for i in (0, 9, 10, 24)] == [examples[i] for i in (0, 9, 10, 24)]
+        assert list(dataset.take(dataset.sample(25, seed=1))) == examples
+
+    write_jsonl(iter(examples), tmp_path / "z.jsonl", compression="gzip")
+    with pytest.raises(ValueError, match="compressed"):
+        jsonl_dataset(tmp_path / "z.jsonl")
+
+def test_split_is_stratified_by_source(tmp_path):
+    path = tmp_path / "d.jsonl"
+    write_jsonl(iter(_examples(100, sources=4)), path)
+    with jsonl_dataset(path) as dataset:
+        assert dataset.sources()[:5].tolist() == ["s0.md", "s1.md", "s2.md", "s3.md", "s0.md"]
+        train, val = dataset.split(validation=0.2, seed=3)
+        assert len(train) == 80 and len(val) == 20
+        assert sorted(set(train) | set(val)) == list(range(100))
+        assert [sum(1 for i in val if i % 4 == s) for s in range(4)] == [5, 5, 5, 5]
+        assert dataset.split(validation=0.2, seed=3)[1].tolist() == val.tolist()
+
+        subset = dataset.sample(40, seed=0)
+        train, val = dataset.split(validation=0.25, indices=subset)
+        assert sorted(train.tolist() + val.tolist()) == subset.tolist()
+        for s in range(4):
+            assert sum(1 for i in val if i % 4 == s) == round(0.25 * sum(1 for i in subset if i % 4 == s))
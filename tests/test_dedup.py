@@ -0,0 +1,40 @@
+import random
+
+from src.core.schema import Example
+from src.lora.builder.dedup import deduplicator, hash_set, optimal_bands
+
+def _example(text: str, source: str = "a.md") -> Example:
+    return Example(messages=[{"role": "user", "content": text}], meta={"source": source})
+
+def _document(rng: random.Random, words: int = 300) -> str:
+    return " ".join(f"w{rng.randrange(5000)}" for _ in range(words))
+
+def test_exact_and_near_duplicates_are_dropped():
+    rng = random.Random(0)
+    documents = [_document(rng) for _ in range(20)]
+    edited = documents[3].split()
+    edited[150] = "changed"
+    stream = [_example(d) for d in documents] + [_example(documents[5], source="copy.md"), _example(" ".join(edited))]
+
+    dedup = deduplicator(threshold=0.8)
+    kept = list(dedup.filter(stream))
+    assert [e.messages[0]["content"] for e in kept] == documents
+    assert dedup.stats["exact"] == 1 and dedup.stats["near"] == 1
+    assert dedup.stats["exact_tokens"] > 0 and "Removed 1 exact and 1 near duplicates of 22 examples" in dedup.summary()
+
+    exact_only = deduplicator(threshold=None)
+    assert len(list(exact_only.filter(stream))) == 21
+
+def test_bands_suit_the_threshold():
+    bands, rows = optimal_bands(0.8, 128)
+    assert bands * rows <= 128
+    # Pairs at the threshold are likely candidates, pairs well below it are not.
+    assert 1 - (1 - 0.9**rows) ** bands > 0.85 and 1 - (1 - 0.5**rows) ** bands < 0.1
+
+def test_hash_set_grows_and_keeps_every_key():
+    rng = random.Random(1)
+    keys = list({rng.getrandbits(64) | 2 for _ in range(10_000)})
+    table = hash_set(capacity=16)
+    assert all(table.add(key) for key in keys)
+    assert not table.add(keys[42]) and len(table) == len(keys)
+    assert all(key in table for key in keys) and (1 << 64) - 5 not in table
@@ -0,0 +1,258 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.llm import transport
+from src.llm.fireworks_provider import fireworks_chat
+from fake_fireworks import fake_fireworks
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    with fake_fireworks() as server:
+        yield server
+    transport.close_clients()
+
+def test_generate_reuses_pooled_connection(server):
+    chat = fireworks_chat(model="test-model", api_base=server.api_base)
+    other = fireworks_chat(model="other-model", api_base=server.api_base)
+
+    assert chat.invoke([HumanMessage(content="one")]).content == "echo one"
+    assert other.invoke([HumanMessage(content="two")]).content == "echo two"
+    assert chat.client is other.client
+    assert server.connections == 1
+
+def test_stream_uses_pooled_client(server):
+    chat = fireworks_chat(model="test-model", api_base=server.api_base, streaming=True)
+
+    assert chat.invoke([HumanMessage(content="a b c")]).content == "echo a b c "
+    assert chat.invoke([HumanMessage(content="again")]).content == "echo again "
+    assert server.requests[0]["stream"] is True
+    assert server.connections == 1
+
+def test_close_clients_resets_pool(server):
+    chat = fireworks_chat(model="test-model", api_base=server.api_base)
+    client = chat.client
+    transport.close_clients()
+
+    assert client.is_closed
+    assert chat.client is not client
+
+def test_async_generate_runs_concurrently_on_one_loop(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    with fake_fireworks(delay=0.05) as server:
+        chat = fireworks_chat(model="test-model", api_base=server.api_base, max_concurrency=8)
+
+        async def run():
+            results = await asyncio.gather(*[chat.ainvoke([HumanMessage(content=str(i))]) for i in range(32)])
+            await transport.aclose_clients()
+            return results
+
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+
+    assert [r.content for r in results] == [f"echo {i}" for i in range(32)]
+    assert server.max_inflight == 8
+    # 32 requests of 50ms at 8-way concurrency, not 32 sequential round-trips.
+    assert elapsed < 32 * 0.05
+
+def test_astream_yields_chunks(server):
+    chat = fireworks_chat(model="test-model", api_base=server.api_base)
+
+    async def run():
+        chunks = [chunk.content async for chunk in chat.astream([HumanMessage(content="x y")])]
+        await transport.aclose_clients()
+        return chunks
+
+    assert asyncio.run(run()) == ["echo ", "x ", "y "]
+
+def test_chat_batch_reports_results_in_order(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    with fake_fireworks(delay=0.02) as server:
+        chat = fireworks_chat(model="test-model", api_base=server.api_base)
+        conversations = [[{"role": "user", "content": f"q{i}"}] for i in range(20)]
+
+        results = list(chat.chat_batch(conversations, max_concurrency=5, ordered=True))
+
+    assert [r.index for r in results] == list(range(20))
+    assert [r.content for r in results] == [f"echo q{i}" for i in range(20)]
+    assert all(r.error is None and r.latency > 0 and r.completion_tokens == 2 for r in results)
+    assert server.max_inflight <= 5
+
+def test_chat_batch_unordered_yields_every_result(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    with fake_fireworks() as server:
+        chat = fireworks_chat(model="test-model", api_base=server.api_base)
+        conversations = [[("user", f"q{i}")] for i in range(10)]
+
+        results = list(chat.chat_batch(conversations, max_concurrency=3))
+
+    assert sorted(r.index for r in results) == list(range(10))
+
+def test_chat_batch_cancels_outstanding_requests_when_stopped_early(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    # The first request answers at once; the rest would take 2s each.
+    with fake_fireworks(delay=2.0, script=[{"delay": 0.0}]) as server:
+        chat = fireworks_chat(model="test-model", api_base=server.api_base)
+        conversations = [[("user", f"q{i}")] for i in range(12)]
+
+        start = time.perf_counter()
+        for result in chat.chat_batch(conversations, max_concurrency=4):
+            break
+        elapsed = time.perf_counter() - start
+
+    assert result.error is None
+    # Closing the generator cancelled the in-flight requests and never sent the rest.
+    assert elapsed < 1.5
+    assert len(server.requests) < len(conversations)
+
+def test_chat_batch_waits_for_a_slow_consumer(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    with fake_fireworks() as server:
+        chat = fireworks_chat(model="test-model", api_base=server.api_base)
+        conversations = [[("user", f"q{i}")] for i in range(40)]
+
+        results = chat.chat_batch(conversations, max_concurrency=2)
+        first = [next(results)]
+        time.sleep(0.5)
+        # A couple of results are queued and a couple in flight; the rest wait for the consumer.
+        assert len(server.requests) <= 6
+        rest = list(results)
+
+    assert sorted(r.index for r in first + rest) == list(range(40))
+
+def test_response_cache_serves_repeat_calls_and_replays_streams(server, tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    chat = fireworks_chat(model="test-model", api_base=server.api_base, temperature=0, cache_responses=True, cache_path=cache_path)
+    streaming = fireworks_chat(model="test-model", api_base=server.api_base, temperature=0, cache_responses=True, cache_path=cache_path, streaming=True)
+    messages = [HumanMessage(content="cached question")]
+
+    assert chat.invoke(messages).content == "echo cached question"
+    assert chat.invoke(messages).content == "echo cached question"
+    chunks = [chunk.content for chunk in streaming.stream(messages)]
+
+    assert len(server.requests) == 1
+    assert chunks == ["echo ", "cached ", "question"]
+    assert chat.cache_stats()["hits"] == 2
+    assert chat.cache_stats()["misses"] == 1
+
+def test_response_cache_tiers_ttl_and_eviction(tmp_path):
+    from src.llm.response_cache import response_cache
+
+    path = str(tmp_path / "cache.sqlite")
+    cache = response_cache(path, memory_entries=1, max_bytes=200)
+    cache.put("a", {"content": "x" * 50})
+    cache.put("b", {"content": "y" * 50})
+    assert cache.get("a") == {"content": "x" * 50}  # evicted from memory, served from disk
+    assert cache.stats()["disk_hits"] == 1
+
+    cache.put("c", {"content": "z" * 150})
+    assert cache.stats()["disk_bytes"] <= 200
+    cache.close()
+
+    reopened = response_cache(path, ttl=0)
+    assert reopened.get("c") is None  # expired
+
+def test_retries_honour_retry_after(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    script = [{"status": 429, "headers": {"Retry-After": "0"}}, {"status": 503}]
+    with fake_fireworks(script=script) as server:
+        chat = fireworks_chat(model="retry-model", api_base=server.api_base, retry_backoff=0.01)
+        result = chat.generate([[HumanMessage(content="hi")]])
+
+    assert result.generations[0][0].text == "echo hi"
+    assert result.llm_output["retries"] == 2
+    assert chat.request_stats()["retries"] == 2
+
+def test_non_retryable_errors_fail_fast(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    with fake_fireworks(script=[{"status": 400}]) as server:
+        chat = fireworks_chat(model="test-model", api_base=server.api_base)
+        with pytest.raises(httpx.HTTPStatusError):
+            chat.invoke([HumanMessage(content="hi")])
+    assert len(server.requests) == 1
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_hedged_request_beats_slow_replica(monkeypatch, streaming):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    with fake_fireworks(script=[{}, {"delay": 1.0}]) as server:
+        # Warm up the client first, so the primary attempt reaches the server (and its script) before the hedge.
+        fireworks_chat(model="warm-up", api_base=server.api_base).invoke([HumanMessage(content="warm up")])
+        chat = fireworks_chat(
+            model=f"hedge-model-{streaming}", api_base=server.api_base,
+            streaming=streaming, hedge=True, hedge_after=0.05,
+        )
+        started = time.perf_counter()
+        assert chat.invoke([HumanMessage(content="fast")]).content.strip() == "echo fast"
+        elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.5
+    assert len(server.requests) == 3
+    assert chat.request_stats()["hedge_wins"] == 1
+
+def test_async_hedge_and_retry(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    with fake_fireworks(script=[{"status": 502}, {"delay": 1.0}]) as server:
+        chat = fireworks_chat(model="async-hedge", api_base=server.api_base, hedge=True, hedge_after=0.3, retry_backoff=0.01)
+
+        async def run():
+            result = await chat.agenerate([[HumanMessage(content="x")]])
+            await transport.aclose_clients()
+            return result
+
+        result = asyncio.run(run())
+
+    assert result.generations[0][0].text == "echo x"
+    assert result.llm_output["retries"] == 1
+    assert result.llm_output["hedged"] is True
+
+def test_cancelling_during_the_hedge_delay_cancels_the_attempt(monkeypatch):
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-key")
+    chat = fireworks_chat(model="hedge-cancel", api_base="http://unused", hedge=True, hedge_after=5.0)
+    cancelled = []
+
+    async def attempt():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def discard(result):
+        pass
+
+    async def run():
+        call = asyncio.ensure_future(chat._ahedged(attempt, discard))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        await asyncio.sleep(0)
+        # Checked before asyncio.run cancels whatever is left over.
+        assert cancelled == [True]
+
+    asyncio.run(run())
+
+def test_sse_decoder_handles_split_frames_and_multiline_data():
+    from src.llm.sse import sse_decoder
+
+    body = b': keep-alive\r\n\r\ndata: {"a":\r\ndata: 1}\r\n\r\nevent: x\ndata: [DONE]\n\n'
+    decoder = sse_decoder()
+    events = []
+    for i in range(len(body)):
+        events.extend(decoder.feed(body[i:i + 1]))
+
+    assert events == [b'{"a":\n1}', b"[DONE]"]
+
+def test_iter_content_stops_at_done_and_rejects_malformed_events():
+    from src.llm.sse import DONE, iter_content
+
+    stream = [b'data: {"choices":[{"delta":{"content":"hi"}}]}\n\ndata: {"choices":[]}\n\n', b"data: [DONE]\n\n", b"trailing"]
+    assert list(iter_content(stream)) == ["hi", DONE]
+
+    with pytest.raises(ValueError, match="Malformed"):
+        list(iter_content([b"data: {not json\n\n"]))
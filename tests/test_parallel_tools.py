@@ -0,0 +1,100 @@
+import json
+import time
+
+import pytest
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+from langchain_core.tools import Tool
+
+from src.agent.parallel_tools import PARALLEL_TOOL_NAME, parallel_react_output_parser, parallel_tools, timed_tool
+
+def _slow_tool(name: str, delay: float) -> Tool:
+    def run(query: str) -> str:
+        time.sleep(delay)
+        return f"{name}:{query}"
+    return Tool(name=name, description=f"{name} tool", func=run)
+
+def test_parser_bundles_multiple_actions():
+    text = (
+        "I need both.\nAction: web_search\nAction Input: python gil\n"
+        "Action: file_read\nAction Input: \"README.md\"\n"
+    )
+    action = parallel_react_output_parser().parse(text)
+
+    assert action.tool == PARALLEL_TOOL_NAME
+    assert json.loads(action.tool_input) == [
+        {"tool": "web_search", "tool_input": "python gil"},
+        {"tool": "file_read", "tool_input": "README.md"},
+    ]
+
+def test_parser_ends_inputs_at_thoughts_and_blank_lines():
+    text = (
+        "Action: list_directory\nAction Input: src\nThought: also read\n"
+        "Action: read_file\nAction Input: README.md\n\nObservation: x"
+    )
+    action = parallel_react_output_parser().parse(text)
+    assert json.loads(action.tool_input) == [
+        {"tool": "list_directory", "tool_input": "src"},
+        {"tool": "read_file", "tool_input": "README.md"},
+    ]
+
+def test_parser_single_action_and_final_answer():
+    parser = parallel_react_output_parser()
+
+    single = parser.parse("Thought: x\nAction: web_search\nAction Input: q")
+    assert isinstance(single, AgentAction) and single.tool == "web_search" and single.tool_input == "q"
+
+    final = parser.parse("I now know the final answer\nFinal Answer: 42")
+    assert isinstance(final, AgentFinish) and final.return_values["output"] == "42"
+
+    with pytest.raises(OutputParserException):
+        parser.parse("no idea")
+
+def test_dispatcher_runs_calls_concurrently_with_timeouts():
+    runner = parallel_tools.from_tools(
+        [_slow_tool("a", 0.3), _slow_tool("b", 0.3), _slow_tool("slow", 2.0)],
+        max_workers=4,
+        tool_timeouts={"slow": 0.5},
+    )
+    calls = [
+        {"tool": "a", "tool_input": "1"},
+        {"tool": "b", "tool_input": "2"},
+        {"tool": "slow", "tool_input": "3"},
+        {"tool": "missing", "tool_input": "4"},
+    ]
+
+    started = time.perf_counter()
+    observation = runner.run(json.dumps(calls))
+    elapsed = time.perf_counter() - started
+
+    assert observation.splitlines() == [
+        "[1] a(1): a:1",
+        "[2] b(2): b:2",
+        "[3] slow(3): timed out after 0.5s",
+        "[4] missing(4): missing is not a valid tool, try one of [a, b, slow].",
+    ]
+    assert elapsed < 1.0
+
+def test_timeouts_count_from_when_a_call_gets_a_worker():
+    runner = parallel_tools.from_tools([_slow_tool("a", 0.3)], max_workers=1, tool_timeout=0.5)
+    calls = [{"tool": "a", "tool_input": str(i)} for i in range(3)]
+
+    # Queued behind each other, but each call finishes within its own 0.5s.
+    assert runner.run(json.dumps(calls)).splitlines() == ["[1] a(0): a:0", "[2] a(1): a:1", "[3] a(2): a:2"]
+
+def test_timed_out_calls_do_not_hold_workers():
+    runner = parallel_tools.from_tools([_slow_tool("hang", 5.0), _slow_tool("a", 0.0)], max_workers=1, tool_timeout=0.2)
+
+    started = time.perf_counter()
+    # The first call gives its worker back when it times out, so the second gets its own 0.2s.
+    assert runner.run(json.dumps([{"tool": "hang", "tool_input": "1"}, {"tool": "hang", "tool_input": "2"}, {"tool": "a", "tool_input": "z"}])).splitlines() == [
+        "[1] hang(1): timed out after 0.2s",
+        "[2] hang(2): timed out after 0.2s",
+        "[3] a(z): a:z",
+    ]
+    # The hung calls were abandoned; the next step runs at once.
+    assert runner.run(json.dumps([{"tool": "a", "tool_input": "x"}, {"tool": "a", "tool_input": "y"}])) == "[1] a(x): a:x\n[2] a(y): a:y"
+    assert time.perf_counter() - started < 1.0
+
+    single = timed_tool.wrap(_slow_tool("hang", 5.0), runner.timeout_for("hang"))
+    assert single.name == "hang" and single.run("q") == "hang timed out after 0.2s"
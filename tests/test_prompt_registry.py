@@ -0,0 +1,25 @@
+import pytest
+from langchain_core.prompts import PromptTemplate
+
+from src.agent import prompt_registry
+from src.agent.prompt_registry import load_prompt, refresh
+
+def test_vendored_react_prompt_loads_offline():
+    prompt = load_prompt("hwchase17/react")
+    assert set(prompt.input_variables) == {"agent_scratchpad", "input", "tool_names", "tools"}
+    assert load_prompt("hwchase17/react") is prompt
+
+def test_refresh_records_hash_and_rejects_tampering(tmp_path, monkeypatch):
+    from langchain import hub
+    monkeypatch.setattr(hub, "pull", lambda name: PromptTemplate.from_template("Question: {input}"))
+
+    digests = refresh(["someone/prompt"], prompts_dir=tmp_path)
+    assert load_prompt("someone/prompt", tmp_path).template == "Question: {input}"
+    assert digests["someone/prompt"] == prompt_registry._sha256("Question: {input}")
+
+    (tmp_path / "someone__prompt.txt").write_text("Question: {input}!")
+    load_prompt.cache_clear()
+    with pytest.raises(ValueError):
+        load_prompt("someone/prompt", tmp_path)
+    with pytest.raises(KeyError):
+        load_prompt("missing/prompt", tmp_path)
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from src.memory.segment_log import segment_log
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "log")
+
+def _records(n: int, start: int = 0):
+    return [f"record-{i}".encode() * 8 for i in range(start, start + n)]
+
+def test_sealed_segments_reopen_from_their_indexes(log_path):
+    log = segment_log(log_path, segment_bytes=2048, background=False)
+    for payload in _records(100):
+        log.append(payload)
+    sealed = len(log._segments) - 1
+    log.close()
+
+    reopened = segment_log(log_path, segment_bytes=2048, background=False)
+    assert sealed > 1 and all(s.index_path.exists() for s in reopened._segments[:-1])
+    assert len(reopened) == 100
+    assert reopened.get(0) == _records(1)[0] and reopened.get(99) == _records(1, 99)[0]
+    assert [key for key, _ in reopened.items(start=95)] == [95, 96, 97, 98, 99]
+
+def test_torn_tail_is_truncated_on_recovery(log_path):
+    log = segment_log(log_path, background=False)
+    log.append_many(_records(3))
+    active = log._segments[-1].path
+    log.close()
+    with open(active, "ab") as f:
+        f.write(b"\x13\x37half a record")
+
+    recovered = segment_log(log_path, background=False)
+    assert len(recovered) == 3
+    assert recovered.append(b"next") == 3
+    assert recovered.get(3) == b"next"
+
+def test_compaction_drops_deleted_records(log_path):
+    log = segment_log(log_path, segment_bytes=2048, background=False)
+    log.append_many(_records(40))
+    log.append_many(_records(40, 40))
+    before = log.stats()["bytes"]
+    log.delete(range(0, 30))
+    assert log.get(5) is None
+
+    assert log.compact() > 0
+    assert log.stats()["bytes"] < before and log.stats()["dead_bytes"] == 0
+    log.close()
+
+    reopened = segment_log(log_path, segment_bytes=2048, background=False)
+    assert len(reopened) == 50 and reopened.get(5) is None and reopened.get(30) == _records(1, 30)[0]
+    assert reopened.append(b"x") == 80  # keys are never reused
+    assert sorted(os.listdir(log_path)) == sorted(
+        [f"{s.seq:08d}.seg" for s in reopened._segments] + [f"{s.seq:08d}.idx" for s in reopened._segments[:-1]] + ["MANIFEST"]
+    )
+
+def test_background_compaction(log_path):
+    log = segment_log(log_path, segment_bytes=1024, compact_ratio=0.5)
+    log.append_many(_records(30))
+    log.append(b"seal")  # the batch sealed the first segment
+    log.delete(range(0, 30))
+    log.wait_for_compaction()
+    assert log.compactions >= 1 and len(log) == 1
+
+def test_iteration_survives_compaction_and_gets_skip_the_merge(log_path):
+    log = segment_log(log_path, segment_bytes=2048, background=False)
+    log.append_many(_records(40))
+    log.append_many(_records(40, 40))
+    log.delete(range(10, 40))
+
+    items = log.items()
+    assert next(items)[0] == 0
+    old = log._segments[0]
+    assert log.compact() > 0 and not old.path.exists()
+    # The compacted segment stays readable until the iteration ends.
+    assert [key for key, _ in items] == list(range(1, 10)) + list(range(40, 80))
+    assert old.retired and old.readers == 0
+
+    key = log.append(b"fresh")
+    assert log.get(key) == b"fresh" and log._segments[-1].pending
+    log.close()
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import threading
+
+from src.lora.fireworks.config_schema import LoRAParams, TrainingParams
+from src.lora.fireworks.sft_job import sft_job_manager, sft_spec, sweep
+
+class _fake_client:
+    """Jobs run for `polls` status calls, then finish in the scripted state."""
+    def __init__(self, polls: int = 3, outcomes=None):
+        self.polls = polls
+        self.outcomes = outcomes or {}
+        self.launched = []
+        self.status_calls = {}
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+        # Launches wait for `gate`; those for the output models in `lost` never reach Fireworks.
+        self.gate = threading.Event()
+        self.gate.set()
+        self.lost = set()
+
+    def launch_sft(self, training: TrainingParams, lora: LoRAParams) -> str:
+        self.gate.wait()
+        if training.output_model in self.lost:
+            raise ConnectionError("firectl was killed")
+        with self.lock:
+            job_id = f"job{len(self.launched)}"
+            self.launched.append((job_id, training, lora))
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        return job_id
+
+    def get_sft_job_status(self, job_id: str) -> dict:
+        with self.lock:
+            calls = self.status_calls[job_id] = self.status_calls.get(job_id, 0) + 1
+            if calls < self.polls:
+                return {"status": "running"}
+            if calls == self.polls:
+                self.running -= 1
+            return {"status": self.outcomes.get(job_id, "completed")}
+
+    def find_sft_job(self, output_model: str):
+        for job_id, training, _ in self.launched:
+            if training.output_model == output_model:
+                return {"job_id": job_id, "status": "running"}
+        return None
+
+def _params():
+    return (
+        TrainingParams(base_model="base", dataset_id="demo", output_model="acct/demo"),
+        LoRAParams(),
+    )
+
+def test_sweep_runs_jobs_concurrently_under_a_cap(tmp_path):
+    training, lora = _params()
+    specs = sweep("demo", training, lora, {"learning_rate": [1e-4, 2e-4], "r": ["8", "16"]})
+    assert [spec.name for spec in specs] == [
+        "demo-learning-rate-0p0001-r-8", "demo-learning-rate-0p0001-r-16",
+        "demo-learning-rate-0p0002-r-8", "demo-learning-rate-0p0002-r-16",
+    ]
+    assert specs[1].lora.r == 16 and specs[2].training.learning_rate == 2e-4
+    assert specs[3].training.output_model == "acct/demo-learning-rate-0p0002-r-16"
+
+    client = _fake_client(outcomes={"job1": "failed"})
+    manager = sft_job_manager(
+        client, state_path=tmp_path / "jobs.json", registry_path=tmp_path / "registry.json",
+        max_concurrent=2, poll_interval=0.01, max_poll_interval=0.02,
+    )
+    jobs = asyncio.run(manager.run(specs))
+    assert len(client.launched) == 4 and client.most_running == 2
+    assert [job["status"] for job in jobs.values()] == ["completed", "failed", "completed", "completed"]
+
+    registry = json.loads((tmp_path / "registry.json").read_text())
+    assert [entry["name"] for entry in registry] == [specs[0].name, specs[2].name, specs[3].name]
+    assert registry[2]["model_id"] == "acct/demo-learning-rate-0p0002-r-16"
+
+    # Running the sweep again relaunches only the failed job.
+    asyncio.run(manager.run(specs))
+    assert len(client.launched) == 5 and client.launched[4][2].r == 16
+    assert len(json.loads((tmp_path / "registry.json").read_text())) == 4
+
+def test_restarted_manager_reattaches_to_running_jobs(tmp_path):
+    training, lora = _params()
+    paths = dict(state_path=tmp_path / "jobs.json", registry_path=tmp_path / "registry.json")
+    client = _fake_client(polls=1000)
+
+    async def launch_then_stop():
+        manager = sft_job_manager(client, poll_interval=0.01, **paths)
+        task = asyncio.create_task(manager.run([sft_spec("a", training, lora), sft_spec("b", training, lora)]))
+        while sum(client.status_calls.values()) < 4:
+            await asyncio.sleep(0.01)
+        task.cancel()
+    asyncio.run(launch_then_stop())
+    state = json.loads((tmp_path / "jobs.json").read_text())["jobs"]
+    assert {name: job["status"] for name, job in state.items()} == {"a": "running", "b": "running"}
+
+    client.polls = 0
+    jobs = asyncio.run(sft_job_manager(client, poll_interval=0.01, **paths).run())
+    assert len(client.launched) == 2
+    assert {name: job["status"] for name, job in jobs.items()} == {"a": "completed", "b": "completed"}
+    assert [entry["name"] for entry in json.loads((tmp_path / "registry.json").read_text())] == ["a", "b"]
+    assert asyncio.run(sft_job_manager(client, **paths).run()) == {}
+
+def test_interrupted_launches_are_found_by_output_model(tmp_path):
+    training, lora = _params()
+    specs = [
+        sft_spec(name, TrainingParams(**{**training.model_dump(), "output_model": f"acct/{name}"}), lora) for name in ("a", "b")
+    ]
+    paths = dict(state_path=tmp_path / "jobs.json", registry_path=tmp_path / "registry.json")
+    client = _fake_client(polls=1)
+    client.gate.clear()
+
+    async def stop_while_launching():
+        task = asyncio.create_task(sft_job_manager(client, poll_interval=0.01, **paths).run(specs))
+        while not paths["state_path"].exists() or paths["state_path"].read_text().count('"launching"') < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        # The launch of "a" reaches Fireworks after the manager stopped; "b" never does.
+        client.lost = {"acct/b"}
+        client.gate.set()
+    asyncio.run(stop_while_launching())
+    state = json.loads((tmp_path / "jobs.json").read_text())["jobs"]
+    assert {name: job["status"] for name, job in state.items()} == {"a": "launching", "b": "launching"}
+    assert len(client.launched) == 1
+
+    client.lost = set()
+    jobs = asyncio.run(sft_job_manager(client, poll_interval=0.01, **paths).run())
+    assert [(job_id, training.output_model) for job_id, training, _ in client.launched] == [
+        ("job0", "acct/a"), ("job1", "acct/b"),
+    ]
+    assert {name: job["job_id"] for name, job in jobs.items()} == {"a": "job0", "b": "job1"}
+    assert {name: job["status"] for name, job in jobs.items()} == {"a": "completed", "b": "completed"}
@@ -0,0 +1,83 @@
+import threading
+import time
+import warnings
+
+from src.memory.summary_memory import summariser, summary_memory
+
+class _fake_llm:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def chat(self, messages, **kwargs):
+        self.release.wait()
+        time.sleep(self.delay)
+        self.calls += 1
+        return f"summary {self.calls}"
+
+def _turns(memory, n: int, start: int = 0):
+    for i in range(start, start + n):
+        memory.save_context({"input": f"question {i}"}, {"output": f"answer {i}"})
+
+def test_history_stays_bounded():
+    memory = summary_memory(summariser=summariser(_fake_llm()), recent_turns=2, chunk_turns=2, fan_in=2, max_levels=2)
+    sizes = []
+    for i in range(0, 60, 2):
+        _turns(memory, 2, i)
+        memory.wait()
+        sizes.append(len(memory.load_memory_variables({})["chat_history"]))
+
+    history = memory.load_memory_variables({})["chat_history"]
+    assert history[0].type == "system" and "summary" in history[0].content
+    assert [m.content for m in history[-2:]] == ["question 59", "answer 59"]
+    # 1 summary message + at most 2 recent + 1 pending turn (as Human/AI pairs).
+    assert max(sizes[5:]) <= 1 + 2 * 3
+    assert memory.stats()["summaries"][-1] <= 2
+
+def test_summaries_do_not_block_requests():
+    llm = _fake_llm()
+    llm.release.clear()
+    memory = summary_memory(summariser=summariser(llm), recent_turns=1, chunk_turns=1)
+    _turns(memory, 3)
+
+    started = time.perf_counter()
+    history = memory.load_memory_variables({})["chat_history"]
+    assert time.perf_counter() - started < 0.1
+    # Nothing is summarised yet, so the older turns are still sent verbatim.
+    assert [m.content for m in history[::2]] == ["question 0", "question 1", "question 2"]
+
+    llm.release.set()
+    memory.wait()
+    assert memory.load_memory_variables({})["chat_history"][0].content.startswith("Summary of the earlier conversation")
+
+def test_identical_chunks_hit_the_cache():
+    shared = summariser(_fake_llm())
+    for _ in range(2):
+        memory = summary_memory(summariser=shared, recent_turns=1, chunk_turns=2)
+        _turns(memory, 3)
+        memory.wait()
+    assert shared.calls == 1 and shared.hits == 1
+
+def test_failing_summaries_back_off_and_keep_the_history_bounded():
+    class failing_llm:
+        calls = 0
+
+        def chat(self, messages, **kwargs):
+            failing_llm.calls += 1
+            raise RuntimeError("summary model is down")
+
+    memory = summary_memory(summariser=summariser(failing_llm()), recent_turns=2, chunk_turns=2, max_unsummarised=4, retry_backoff=60)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        for i in range(50):
+            _turns(memory, 1, i)
+            memory.wait()
+
+    history = memory.load_memory_variables({})["chat_history"]
+    # 4 waiting turns + 2 recent ones, the newest, as Human/AI pairs.
+    assert len(history) == 2 * 6 and history[-1].content == "answer 49"
+    # Backoff is jittered from 0 to 60s, so a quick retry is possible but rare.
+    assert failing_llm.calls <= 2 and len(caught) == 1
+    assert memory.stats()["dropped_turns"] == 50 - 6
@@ -0,0 +1,60 @@
+import pytest
+from langchain_community.tools.file_management import FileSearchTool, ReadFileTool, WriteFileTool
+from langchain_core.tools import Tool
+
+from src.agent.tool_cache import cached_tool, invalidating_tool, tool_cache
+
+class _counting:
+    def __init__(self, tool):
+        self.tool = tool
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.tool(*args, **kwargs)
+
+@pytest.fixture
+def cache():
+    return tool_cache(ttl=60)
+
+def test_file_read_is_cached_until_the_file_changes(tmp_path, cache):
+    path = tmp_path / "notes.txt"
+    path.write_text("v1")
+    inner = ReadFileTool(root_dir=str(tmp_path))
+    reads = _counting(inner._run)
+    object.__setattr__(inner, "_run", reads)
+    tool = cached_tool(inner, "file_read", cache)
+
+    assert tool.run("notes.txt") == "v1"
+    assert tool.run({"file_path": "notes.txt"}) == "v1"
+    assert reads.calls == 1
+
+    path.write_text("version two")
+    assert tool.run("notes.txt") == "version two"
+    assert reads.calls == 2
+    assert cache.stats()["calls_saved"] == 1
+
+def test_writes_invalidate_file_search(tmp_path, cache):
+    (tmp_path / "a.py").write_text("")
+    search = cached_tool(FileSearchTool(root_dir=str(tmp_path)), "file_search", cache)
+    write = invalidating_tool(WriteFileTool(root_dir=str(tmp_path)), cache)
+
+    assert search.run({"dir_path": ".", "pattern": "*.py"}) == "a.py"
+    (tmp_path / "sub").mkdir()
+    write.run({"file_path": "sub/b.py", "text": ""})
+
+    assert sorted(search.run({"dir_path": ".", "pattern": "*.py"}).splitlines()) == ["a.py", "sub/b.py"]
+    assert cache.stats()["invalidations"] == 1
+
+def test_web_results_expire_after_ttl(cache, monkeypatch):
+    searches = _counting(lambda query: f"results for {query}")
+    tool = cached_tool(Tool(name="duckduckgo_search", description="search", func=searches), "web_search", cache)
+
+    tool.run("gil")
+    tool.run("gil")
+    assert searches.calls == 1
+
+    cache.ttl = -1
+    tool.run("other")
+    tool.run("other")
+    assert searches.calls == 3
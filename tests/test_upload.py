@@ -0,0 +1,75 @@
+import json
+
+import httpx
+import pytest
+from fake_fireworks import fake_fireworks
+
+from src.core.schema import Example
+from src.lora.builder import write_jsonl
+from src.lora.fireworks.client import fireworks_client
+from src.lora.fireworks.upload import journal_path, plan_parts, upload_dataset
+
+def _dataset(path, n: int = 300):
+    rows = [{"messages": [{"role": "user", "content": f"question {i} " * (i % 9 + 1)}, {"role": "assistant", "content": "a"}]} for i in range(n)]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return path
+
+def _client(server) -> fireworks_client:
+    return fireworks_client(api_base=server.api_base + "/v1", account_id="acct", api_key="k")
+
+def test_parallel_upload_in_line_aligned_parts(tmp_path):
+    path = _dataset(tmp_path / "demo.jsonl")
+    parts = plan_parts([path], part_bytes=4096)
+    assert len(parts) > 4 and sum(p.examples for p in parts) == 300
+    assert all(p.end - p.start <= 4096 for p in parts)
+
+    with fake_fireworks() as server:
+        # A transient failure is retried; the rest go up concurrently.
+        server.upload_script = [{"status": 503}]
+        assert upload_dataset(path, "demo", _client(server), workers=4, part_bytes=4096)
+        dataset = server.datasets["demo"]
+        assert dataset["state"] == "READY" and dataset["exampleCount"] == "300"
+        assert dataset["displayName"].startswith("sha256:")
+        assert b"".join(dataset["files"][p.name] for p in parts) == path.read_bytes()
+        assert all(dataset["files"][p.name].endswith(b"\n") for p in parts)
+        assert not journal_path(path, "demo").exists()
+
+        # The same content again is skipped without sending anything.
+        puts = len(server.puts)
+        assert not upload_dataset(path, "demo", _client(server), part_bytes=4096)
+        assert len(server.puts) == puts
+
+        # Different content can't silently replace a finished dataset.
+        _dataset(path, 200)
+        with pytest.raises(ValueError, match="different content"):
+            upload_dataset(path, "demo", _client(server), part_bytes=4096)
+
+def test_interrupted_upload_resumes_with_missing_parts(tmp_path):
+    path = _dataset(tmp_path / "demo.jsonl")
+    parts = plan_parts([path], part_bytes=4096)
+
+    with fake_fireworks() as server:
+        server.upload_script = [{}, {}, {"status": 400}]
+        with pytest.raises(httpx.HTTPStatusError):
+            upload_dataset(path, "demo", _client(server), workers=1, part_bytes=4096)
+        journal = json.loads(journal_path(path, "demo").read_text())
+        assert journal["uploaded"][:2] == [parts[0].name, parts[1].name] and parts[2].name not in journal["uploaded"]
+        assert sorted(journal["uploaded"]) == sorted(server.puts)
+        assert server.datasets["demo"]["state"] == "UPLOADING"
+
+        done = len(server.puts)
+        assert upload_dataset(path, "demo", _client(server), workers=2, part_bytes=4096)
+        assert sorted(server.puts) == sorted(p.name for p in parts) and len(server.puts[done:]) == len(parts) - done
+        assert server.datasets["demo"]["state"] == "READY"
+        assert not journal_path(path, "demo").exists()
+
+@pytest.mark.parametrize("shard_size", [None, 100])
+def test_compressed_output_reports_its_example_count(tmp_path, shard_size):
+    rows = [{"messages": [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": "a"}]} for i in range(300)]
+    written = write_jsonl(iter([Example(**row) for row in rows]), tmp_path / "demo.jsonl", shard_size=shard_size, compression="gzip")
+    dataset_path = written[0] if len(written) == 1 else tmp_path / "demo.manifest.json"
+
+    with fake_fireworks() as server:
+        assert upload_dataset(dataset_path, "demo", _client(server))
+        dataset = server.datasets["demo"]
+        assert dataset["exampleCount"] == "300" and sorted(dataset["files"]) == sorted(p.name for p in written)
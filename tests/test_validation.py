@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from src.core.schema import Example
+from src.lora.builder import ValidationError, validate_stream, validation_report
+from src.lora.orchestrator import build_dataset
+
+def _pair(i: int, roles=("user", "assistant"), words: int = 3, source: str = "a.jsonl"):
+    messages = [{"role": role, "content": " ".join(["w"] * words)} for role in roles]
+    return f"{source}:{i + 1}", Example(messages=messages)
+
+def test_report_collects_errors_and_statistics_in_one_pass(tmp_path):
+    pairs = [_pair(i, words=i % 7 + 1) for i in range(20)]
+    pairs[2] = _pair(2, roles=("assistant", "user"))
+    pairs[5] = _pair(5, words=200)
+    pairs[8] = _pair(8, roles=("user", "user"))
+    pairs[9] = _pair(9, roles=("assistant",))
+    pairs += [_pair(i, roles=("user",), source="b.md") for i in range(5)]
+
+    report = validation_report(max_context_length=100, max_errors=3)
+    valid = [location for location, _ in report.check(iter(pairs))]
+    report.finish()
+    assert len(valid) == 21 and "a.jsonl:3" not in valid
+
+    result = report.to_dict()
+    assert result["examples"] == 25 and result["valid"] == 21
+    assert result["errors"]["total"] == 4
+    assert result["errors"]["by_kind"] == {"Invalid starting role": 2, "Example is too long": 1, "Consecutive roles found": 1}
+    assert [e["location"] for e in result["errors"]["first"]] == ["a.jsonl:3", "a.jsonl:6", "a.jsonl:9"]
+    assert result["tokens"]["over_max_context_length"] == 1 and result["tokens"]["max"] == 400
+    assert sum(result["tokens"]["histogram"]["counts"]) == 25
+    assert result["role_patterns"]["user assistant"] == 17 and result["role_patterns"]["user"] == 5
+    assert result["sources"]["a.jsonl"]["errors"] == 4 and result["sources"]["b.md"] == {"examples": 5, "tokens": 15, "errors": 0}
+
+    report.write(tmp_path / "report.json")
+    assert json.loads((tmp_path / "report.json").read_text())["valid"] == 21
+    assert "Errors by kind:" in report.summary()
+
+    with pytest.raises(ValidationError, match=r"^a\.jsonl:3: Invalid starting role: assistant\n(  a\.jsonl:\d: .*\n){2}4 errors in total\.$"):
+        report.raise_for_errors()
+
+def test_build_reports_every_bad_example_before_failing(tmp_path):
+    dataset_dir = tmp_path / "raw" / "demo"
+    dataset_dir.mkdir(parents=True)
+    rows = [{"messages": [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": "a"}]} for i in range(10)]
+    rows[1]["messages"].reverse()
+    rows[6]["messages"][0]["content"] = "x " * 50
+    (dataset_dir / "a.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    with pytest.raises(ValidationError) as error:
+        build_dataset(dataset_dir, output_dir=tmp_path / "processed", max_context_length=20)
+    assert str(error.value).splitlines() == [
+        "a.jsonl:2: Invalid starting role: assistant",
+        "  a.jsonl:7: Example is too long: 51 tokens, over the max context length of 20.",
+        "2 errors in total.",
+    ]
+    assert not (tmp_path / "processed" / "demo.jsonl").exists()
+
+    examples = validate_stream(iter([_pair(0), _pair(1)]))
+    with pytest.raises(ValidationError, match="Requires at least 3 examples, found 2"):
+        list(examples)
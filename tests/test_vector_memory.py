@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from src.memory.embeddings import hashing_embedder
+from src.memory.vector_index import vector_store
+from src.memory.vector_memory import retrieval_memory, vector_memory
+
+def _clustered(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(64, dim))
+    vectors = centers[rng.integers(0, 64, n)] + 0.5 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def test_recall_finds_the_relevant_turn():
+    memory = vector_memory(hashing_embedder(), vector_store(384))
+    memory.add_many([
+        "The GIL serialises Python bytecode across threads",
+        "Bake the bread at 220 degrees for 30 minutes",
+        "Use a process pool for CPU bound work in Python",
+    ])
+    assert memory.recall("why are python threads slow? the gil", k=1) == ["The GIL serialises Python bytecode across threads"]
+    assert np.allclose(hashing_embedder().embed(["same text"]), hashing_embedder().embed(["same text"]))
+
+def test_ivf_matches_exact_search(tmp_path):
+    vectors = _clustered(20000, 32)
+    store = vector_store(32, str(tmp_path), nprobe=8, min_train=1000)
+    store.add(vectors[:15000], [str(i) for i in range(15000)])
+    # Training runs in the background; searches meanwhile are exact.
+    assert store.search(vectors[3], 1)[0][0] == 3
+    assert store.wait_for_index(timeout=30) and store._centroids is not None
+    store.add(vectors[15000:], [str(i) for i in range(15000, 20000)])
+
+    queries = _clustered(50, 32, seed=1)
+    found = 0
+    for query in queries:
+        exact = set(np.argsort(vectors @ query)[-10:])
+        found += len(exact & {i for i, _ in store.search(query, 10)})
+    assert found / (10 * len(queries)) > 0.9
+    assert store.search(vectors[19999], 1)[0][0] == 19999
+
+def test_store_reopens_and_rebuilds_vectors_from_the_log(tmp_path):
+    vectors = _clustered(50, 8)
+    store = vector_store(8, str(tmp_path), max_entries=40)
+    store.add(vectors, [str(i) for i in range(50)])
+    assert len(store) == 40 and store.search(vectors[5], 1)[0][0] != 5
+    store.close()
+
+    # Losing the matrix (or its checkpoint) only costs a replay of the log.
+    (tmp_path / "vectors.f32").unlink()
+    reopened = vector_store(8, str(tmp_path), max_entries=40)
+    assert len(reopened) == 40
+    assert [reopened.document(i) for i, _ in reopened.search(vectors[30], 1)] == ["30"]
+    assert reopened.add(vectors[:1], ["new"]) == range(50, 51)
+
+def test_retrieval_memory_loads_relevant_turns_in_order():
+    memory = retrieval_memory(vectors=vector_memory(hashing_embedder(), vector_store(384)), k=2)
+    for question, answer in [("capital of france", "Paris"), ("best pasta shape", "rigatoni"), ("capital of italy", "Rome")]:
+        memory.save_context({"input": question}, {"output": answer})
+
+    history = memory.load_memory_variables({"input": "what is the capital of spain"})["chat_history"]
+    assert [m.content for m in history] == ["capital of france", "Paris", "capital of italy", "Rome"]
+
+def test_chroma_backend_is_an_alias_of_vector():
+    from omegaconf import OmegaConf
+
+    from src.memory.memory_factory import get_memory
+
+    cfg = OmegaConf.load("config/settings.yaml")
+    cfg.memory.backend = "chroma"
+    cfg.memory.persist_path = None
+    with pytest.warns(FutureWarning, match="deprecated"):
+        memory = get_memory(cfg)
+    assert isinstance(memory, retrieval_memory)
+
+@pytest.mark.parametrize("persist", [False, True])
+def test_capped_store_stays_the_same_size(tmp_path, persist):
+    vectors = _clustered(30000, 8)
+    store = vector_store(8, str(tmp_path) if persist else None, max_entries=1000, segment_bytes=64 * 1024)
+    sizes = []
+    for start in range(0, len(vectors), 1000):
+        store.add(vectors[start : start + 1000], [str(i) for i in range(start, start + 1000)])
+        rows = (tmp_path / "vectors.f32").stat().st_size // 32 if persist else len(store._documents)
+        sizes.append((len(store._vectors), len(store._live), store.count <= 3000, rows <= 4096))
+    # Deleted rows are reclaimed: after warming up, nothing grows.
+    assert set(sizes[3:]) == {(4096, 4096, True, True)}
+    assert len(store) == 1000 and store.next_id == len(vectors)
+    assert store.search(vectors[29999], 1)[0][0] == 29999 and store.document(29999) == "29999"
+    with pytest.raises(KeyError):
+        store.document(5)
+
+    if persist:
+        store._log.wait_for_compaction()
+        assert store.stats()["log"]["bytes"] < 2 * store.stats()["log"]["live"] * (8 * 4 + 8) + 4 * 64 * 1024
+        store.close()
+        reopened = vector_store(8, str(tmp_path), max_entries=1000)
+        assert len(reopened) == 1000 and reopened.document(reopened.search(vectors[29000], 1)[0][0]) == "29000"